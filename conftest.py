@@ -0,0 +1,120 @@
+import json
+import os
+import random
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# the packages import each other as top-level tools, utils, evaluation and agents
+ROOT = os.path.dirname(os.path.abspath(__file__))
+for directory in ("tools", "utils", "evaluation", "agents"):
+    path = os.path.join(ROOT, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# tests load their small tables from CSV every time unless they ask for snapshots
+os.environ["TRIPTIDE_SNAPSHOT"] = "0"
+
+STATES = {
+    "Texas": ["Austin", "Dallas", "Houston", "San Antonio"],
+    "California": ["Los Angeles", "San Diego", "Fresno"],
+    "New York": ["New York", "Buffalo", "Albany"],
+}
+CITIES = [city for cities in STATES.values() for city in cities]
+HOUSE_RULES = ["No parties", "No smoking", "No children under 10", "No pets", "No visitors"]
+CUISINES = ["Italian", "Chinese", "Mexican", "Pizza", "Cafe", "Seafood", "Indian", "BBQ", "Desserts", "Bakery"]
+SUBCATEGORIES = ["Museums", "Parks", "Zoos", "Landmarks", "Beaches", "Theaters"]
+
+
+def sample_tables(seed=0):
+    """Raw sandbox tables shaped like the CSVs the tools load, small and reproducible."""
+    rng = np.random.default_rng(seed)
+    pick = random.Random(seed)
+
+    flights = []
+    for i in range(800):
+        origin, destination = pick.sample(CITIES, 2)
+        dep, duration = int(rng.integers(0, 1440)), int(rng.integers(45, 400))
+        arr = (dep + duration) % 1440
+        flights.append({"Unnamed: 0": i, "Flight Number": f"F{i % 600:04d}", "Price": int(rng.integers(50, 900)),
+                        "DepTime": f"{dep // 60:02d}:{dep % 60:02d}", "ArrTime": f"{arr // 60:02d}:{arr % 60:02d}",
+                        "ActualElapsedTime": f"{duration // 60} hours {duration % 60} minutes",
+                        "FlightDate": f"2024-11-{rng.integers(1, 6):02d}", "OriginCityName": origin,
+                        "DestCityName": destination, "Distance": float(rng.integers(100, 3000))})
+
+    accommodations = []
+    for i in range(300):
+        rules = ", ".join(rule for rule in HOUSE_RULES if rng.random() < 0.4)
+        accommodations.append({"name": f"Stay {i} Cozy", "pricing": json.dumps({"price": f"${rng.integers(40, 600)}", "fee": None}),
+                               "roomType": pick.choice(["shared_room", "private_room", "entire_home"]),
+                               "house_rules": rules or "None", "max_occupancy": int(rng.integers(1, 9)),
+                               "rating": float(rng.integers(20, 50)) / 10, "City": pick.choice(CITIES),
+                               "minimum nights": int(rng.integers(1, 5))})
+
+    restaurants = [{"name": f"Resto {i}", "avg_cost": int(rng.integers(10, 120)),
+                    "cuisines": str(pick.sample(CUISINES, int(rng.integers(1, 4)))),
+                    "rating": float(rng.integers(20, 50)) / 10, "City": pick.choice(CITIES)} for i in range(400)]
+
+    attractions = []
+    for i in range(300):
+        city = pick.choice(CITIES)
+        base = CITIES.index(city)
+        attractions.append({"name": f"Sight {i}", "latitude": 30 + base + rng.random() * 0.3,
+                            "longitude": -100 + base + rng.random() * 0.3, "address": "addr",
+                            "visit_duration": "2 hours", "subcategories": str(pick.sample(SUBCATEGORIES, int(rng.integers(1, 3)))),
+                            "website": "http://x", "City": city})
+
+    events = [{"name": f"Show {i}", "url": "u",
+               "dateTitle": f"{rng.integers(1, 31):02d}-11-2024" if rng.random() > 0.05 else "TBA",
+               "streetAddress": "s", "segmentName": pick.choice(["Sports", "Music", "Arts & Theatre", "Film"]),
+               "city": pick.choice(CITIES)} for i in range(400)]
+
+    distances = [{"origin": origin, "destination": destination,
+                  "duration_min": float(rng.integers(30, 2000)) if rng.random() > 0.05 else np.nan,
+                  "distance_km": float(rng.integers(10, 3000))}
+                 for origin in CITIES for destination in CITIES if origin != destination]
+
+    return {
+        "flights": pd.DataFrame(flights),
+        "accommodations": pd.DataFrame(accommodations),
+        "restaurants": pd.DataFrame(restaurants),
+        "attractions": pd.DataFrame(attractions),
+        "events": pd.DataFrame(events),
+        "googleDistanceMatrix": pd.DataFrame(distances),
+    }
+
+
+@pytest.fixture(scope="session")
+def sandbox_csvs(tmp_path_factory):
+    """Name -> path of a sample CSV for every sandbox table."""
+    directory = tmp_path_factory.mktemp("sandbox")
+    paths = {}
+    for name, data in sample_tables().items():
+        paths[name] = str(directory / f"{name}.csv")
+        data.to_csv(paths[name], index=False)
+    return paths
+
+
+@pytest.fixture
+def sandbox_tools(sandbox_csvs):
+    """Name -> tool loaded from the sample CSVs, as the registry would build it."""
+    from tools.flights.apis import Flights
+    from tools.accommodations.apis import Accommodations
+    from tools.restaurants.apis import Restaurants
+    from tools.attractions.apis import Attractions
+    from tools.events.apis import Events
+    from tools.googleDistanceMatrix.apis import GoogleDistanceMatrix
+
+    flights_db = Flights(sandbox_csvs["flights"])
+    flights_db.load_db()
+    return {
+        "flights": Flights(sandbox_csvs["flights"]),
+        "flights_db": flights_db,
+        "accommodations": Accommodations(sandbox_csvs["accommodations"]),
+        "restaurants": Restaurants(sandbox_csvs["restaurants"]),
+        "attractions": Attractions(sandbox_csvs["attractions"]),
+        "events": Events(sandbox_csvs["events"]),
+        "googleDistanceMatrix": GoogleDistanceMatrix(path=sandbox_csvs["googleDistanceMatrix"]),
+    }
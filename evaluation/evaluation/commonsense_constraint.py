@@ -1,10 +1,6 @@
 from utils.func import get_valid_name_city,extract_before_parenthesis,extract_numbers_from_filenames
-from tools.flights.apis import Flights
-from tools.accommodations.apis import Accommodations
-from tools.restaurants.apis import Restaurants
-from tools.googleDistanceMatrix.apis import GoogleDistanceMatrix
-from tools.attractions.apis import Attractions
-from tools.events.apis import Events
+from tools.flights.times import parse_minutes
+from tools.sandbox.registry import registry
 import math
 import json
 import re   
@@ -12,18 +8,18 @@ import os
 import sys
 from tqdm import tqdm
 import argparse
-import pandas as pd
 
 sys.path.append(os.path.abspath(os.path.join(os.getcwd(), "..")))
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
-flight = Flights()
-accommodation = Accommodations()
-restaurants = Restaurants()
-googleDistanceMatrix = GoogleDistanceMatrix()
-attractions = Attractions()
-events = Events()
-pois = pd.read_csv('/ATP_database/all_poi_nearest_stops.csv')
+# Shared with hard_constraint and the rest of the process, each one loads on first use
+flight = registry.proxy("flights")
+accommodation = registry.proxy("accommodations")
+restaurants = registry.proxy("restaurants")
+googleDistanceMatrix = registry.proxy("googleDistanceMatrix")
+attractions = registry.proxy("attractions")
+events = registry.proxy("events")
+transit = registry.proxy("transit")
 
 city_state_set = open('/ATP_database/background/citySet_with_states_140.txt','r').read().split('\n')
 city_state_map = {x:y for x,y in [unit.split('\t') for unit in city_state_set]}
@@ -236,21 +232,16 @@ def is_valid_event(question, tested_data):
     return True, None
 
 def is_time_difference_valid(time1, time2, min_difference):
-    from datetime import datetime, timedelta
-    fmt = "%H:%M"
-    # Extract just the HH:MM part using regex or split
-    clean_time1 = re.match(r'\d{1,2}:\d{2}', time1)
-    if not clean_time1:
+    # Only the leading HH:MM part is used; anything that is not a clock time is invalid
+    minutes1 = parse_minutes(time1)
+    if minutes1 is None:
         return False  # or raise a more meaningful error
 
-    time1 = datetime.strptime(clean_time1.group(), fmt)
-    clean_time2 = re.match(r'\d{1,2}:\d{2}', time2)
-    if not clean_time2:
+    minutes2 = parse_minutes(time2)
+    if minutes2 is None:
         return False
 
-    time2 = datetime.strptime(clean_time2.group(), fmt)
-
-    return abs((time2 - time1).total_seconds()) / 60 >= min_difference
+    return abs(minutes2 - minutes1) >= min_difference
 
 def is_valid_poi_sequence(question, tested_data):
     current_accommodation = "abc"
@@ -556,7 +547,7 @@ def is_valid_information_in_sandbox(question, tested_data):
                     # raise ValueError("The transportation {} in day {} can not be parsed.".format(value,i+1))
                 # print(value)
                 try:
-                    if len(flight.data[(flight.data['Flight Number'] == value.split('Flight Number: ')[1].split(',')[0]) & (flight.data['OriginCityName']==org_city) & (flight.data['DestCityName']==dest_city)]) < 1:
+                    if len(flight.get_by_number(value.split('Flight Number: ')[1].split(',')[0], org_city, dest_city)) < 1:
                         return False, f"The flight number in day {i+1} is invalid in the sandbox."
                 except:
                     return False, f"Incorrect Flight format."
@@ -579,21 +570,21 @@ def is_valid_information_in_sandbox(question, tested_data):
 
         if 'breakfast' in unit and unit['breakfast'] and unit['breakfast'] != '-':
             name, city = get_valid_name_city(unit['breakfast'])
-            if len(restaurants.data[(restaurants.data['name'].astype(str).str.contains(re.escape(name))) & (restaurants.data['City'] == city)]) < 1:
+            if len(restaurants.find_by_name(name, city)) < 1:
                 return False, f"The breakfast in day {i+1} is invalid in the sandbox."
         elif 'breakfast' not in unit:
             return False, f"No Breakfast Info."
         
         if 'lunch' in unit and unit['lunch'] and unit['lunch'] != '-':
             name, city = get_valid_name_city(unit['lunch'])
-            if len(restaurants.data[(restaurants.data['name'].astype(str).str.contains(re.escape(name))) & (restaurants.data['City'] == city)]) < 1:
+            if len(restaurants.find_by_name(name, city)) < 1:
                 return False, f"The lunch in day {i+1} is invalid in the sandbox."
         elif 'lunch' not in unit:
             return False, f"No Lunch Info."
         
         if 'dinner' in unit and unit['dinner'] and unit['dinner'] != '-':
             name, city = get_valid_name_city(unit['dinner'])
-            if len(restaurants.data[(restaurants.data['name'].astype(str).str.contains(re.escape(name))) & (restaurants.data['City'] == city)]) < 1:
+            if len(restaurants.find_by_name(name, city)) < 1:
                 return False, f"The dinner in day {i+1} is invalid in the sandbox."
         elif 'dinner' not in unit:
             return False, f"No Dinner Info."
@@ -603,7 +594,7 @@ def is_valid_information_in_sandbox(question, tested_data):
             for attraction in attractions_list:
                 name, city = get_valid_name_city(attraction)
                 
-                if len(attractions.data[(attractions.data['name'].astype(str).str.contains(re.escape(name))) & (attractions.data['City'] == city)]) < 1:
+                if len(attractions.find_by_name(name, city)) < 1:
                     return False, f"The attraction {attraction} in day {i+1} is invalid in the sandbox."
         
 
@@ -614,14 +605,14 @@ def is_valid_information_in_sandbox(question, tested_data):
                 name = event.rsplit(',',1)[0].strip()
                 # city = question['dest'] 
                 city = event.rsplit(",",1)[-1].strip()
-                if len(events.data[(events.data['name'].astype(str).str.contains(re.escape(name))) & (events.data['city'] == city)]) < 1:
+                if len(events.find_by_name(name, city)) < 1:
                     return False, f"The event {event} in day {i+1} is invalid in the sandbox."
                 
         if 'accommodation' in unit and unit['accommodation'] and unit['accommodation'] != '-':
             name, city = get_valid_name_city(unit['accommodation'])
             # print(name,city)
             # print(accommodation.data[accommodation.data['NAME'].astype(str).str.contains(re.escape(name))])
-            if len(accommodation.data[(accommodation.data['name'].astype(str).str.contains(re.escape(name))) & (accommodation.data['City'] == city)]) < 1:
+            if len(accommodation.find_by_name(name, city)) < 1:
                 return False, f"The accommodation in day {i+1} is invalid in the sandbox."
         elif 'accommodation' not in unit:
             return False, f"No Accommodation Info."
@@ -647,34 +638,34 @@ def is_valid_information_in_sandbox(question, tested_data):
                         if question['days']==3:
                             if ((i+1)==3):
                                 city = unit['current_city'].split("from ")[-1].split(" to ")[0].strip()
-                                if len(pois[(pois['nearest_stop_name'].astype(str).str.contains(re.escape(transit_stop))) & (pois['PoI'] == poi_name) & (pois['City'] == city) & (abs(pois['nearest_stop_distance'] - stop_distance) <= 5)]) < 1:
+                                if not transit.verify(poi_name, city, transit_stop, stop_distance):
                                         return False, f"The PoI nearest stops in day {i+1} have hallucinated data."
                             else:
-                                if len(pois[(pois['nearest_stop_name'].astype(str).str.contains(re.escape(transit_stop))) & (pois['PoI'] == poi_name) & (pois['City'] == city) & (abs(pois['nearest_stop_distance'] - stop_distance) <= 5)]) < 1:
+                                if not transit.verify(poi_name, city, transit_stop, stop_distance):
                                         return False, f"The PoI nearest stops in day {i+1} have hallucinated data."
                         if question['days']==5:
                             if ((i+1)==3):
-                                if len(pois[(pois['nearest_stop_name'].astype(str).str.contains(re.escape(transit_stop))) & (pois['PoI'] == poi_name) & (pois['City'] == org_city) & (abs(pois['nearest_stop_distance'] - stop_distance) <= 5)]) < 1:
-                                    if len(pois[(pois['nearest_stop_name'].astype(str).str.contains(re.escape(transit_stop))) & (pois['PoI'] == poi_name) & (pois['City'] == dest_city) & (abs(pois['nearest_stop_distance'] - stop_distance) <= 5)]) < 1:
+                                if not transit.verify(poi_name, org_city, transit_stop, stop_distance):
+                                    if not transit.verify(poi_name, dest_city, transit_stop, stop_distance):
                                         return False, f"The PoI nearest stops in day {i+1} have hallucinated data."
                             elif ((i+1)==5):
                                 city = unit['current_city'].split("from ")[-1].split(" to ")[0].strip()
-                                if len(pois[(pois['nearest_stop_name'].astype(str).str.contains(re.escape(transit_stop))) & (pois['PoI'] == poi_name) & (pois['City'] == city) & (abs(pois['nearest_stop_distance'] - stop_distance) <= 5)]) < 1:
+                                if not transit.verify(poi_name, city, transit_stop, stop_distance):
                                         return False, f"The PoI nearest stops in day {i+1} have hallucinated data."
                             else:
-                                if len(pois[(pois['nearest_stop_name'].astype(str).str.contains(re.escape(transit_stop))) & (pois['PoI'] == poi_name) & (pois['City'] == city) & (abs(pois['nearest_stop_distance'] - stop_distance) <= 5)]) < 1:
+                                if not transit.verify(poi_name, city, transit_stop, stop_distance):
                                         return False, f"The PoI nearest stops in day {i+1} have hallucinated data."
                         if question['days']==7:
                             if ((i+1)==3) or ((i+1)==5):
-                                if len(pois[(pois['nearest_stop_name'].astype(str).str.contains(re.escape(transit_stop))) & (pois['PoI'] == poi_name) & (pois['City'] == org_city) & (abs(pois['nearest_stop_distance'] - stop_distance) <= 5)]) < 1:
-                                    if len(pois[(pois['nearest_stop_name'].astype(str).str.contains(re.escape(transit_stop))) & (pois['PoI'] == poi_name) & (pois['City'] == dest_city) & (abs(pois['nearest_stop_distance'] - stop_distance) <= 5)]) < 1:
+                                if not transit.verify(poi_name, org_city, transit_stop, stop_distance):
+                                    if not transit.verify(poi_name, dest_city, transit_stop, stop_distance):
                                         return False, f"The PoI nearest stops in day {i+1} have hallucinated data."
                             elif ((i+1)==7):
                                 city = unit['current_city'].split("from ")[-1].split(" to ")[0].strip()
-                                if len(pois[(pois['nearest_stop_name'].astype(str).str.contains(re.escape(transit_stop))) & (pois['PoI'] == poi_name) & (pois['City'] == city) & (abs(pois['nearest_stop_distance'] - stop_distance) <= 5)]) < 1:
+                                if not transit.verify(poi_name, city, transit_stop, stop_distance):
                                         return False, f"The PoI nearest stops in day {i+1} have hallucinated data."
                             else:
-                                if len(pois[(pois['nearest_stop_name'].astype(str).str.contains(re.escape(transit_stop))) & (pois['PoI'] == poi_name) & (pois['City'] == city) & (abs(pois['nearest_stop_distance'] - stop_distance) <= 5)]) < 1:
+                                if not transit.verify(poi_name, city, transit_stop, stop_distance):
                                         return False, f"The PoI nearest stops in day {i+1} have hallucinated data."
                     except Exception as e:
                         return False, f"Incorrect format. Error: {str(e)}"
@@ -697,7 +688,8 @@ def is_valid_accommodaton(question, tested_data):
             name, city = get_valid_name_city(unit[0])
             # print(unit[0],name,city)
             # try:
-            if len(accommodation.data[(accommodation.data['name'].astype(str).str.contains(re.escape(name))) & (accommodation.data['City'] == city)]) == 1 and unit[1] <  accommodation.data[(accommodation.data['name'].astype(str).str.contains(re.escape(name))) & (accommodation.data['City'] == city)].iloc[0]['minimum nights']:
+            res = accommodation.find_by_name(name, city)
+            if len(res) == 1 and unit[1] <  res.iloc[0]['minimum nights']:
                 return False, f"The accommodation {unit[0]} do not obey the minumum nights rule."
             # can not parse data
             # except re.error:
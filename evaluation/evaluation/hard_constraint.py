@@ -1,10 +1,5 @@
 from utils.func import get_valid_name_city,extract_before_parenthesis,extract_numbers_from_filenames
-from tools.flights.apis import Flights
-from tools.accommodations.apis import Accommodations
-from tools.restaurants.apis import Restaurants
-from tools.googleDistanceMatrix.apis import GoogleDistanceMatrix
-from tools.attractions.apis import Attractions
-from tools.events.apis import Events
+from tools.sandbox.registry import registry
 import math
 import json
 import re
@@ -18,12 +13,12 @@ sys.path.append(os.path.abspath(os.path.join(os.getcwd(), "..")))
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
 
-flight = Flights()
-accommodation = Accommodations()
-restaurants = Restaurants()
-googleDistanceMatrix = GoogleDistanceMatrix()
-attractions = Attractions()
-events = Events()
+flight = registry.proxy("flights")
+accommodation = registry.proxy("accommodations")
+restaurants = registry.proxy("restaurants")
+googleDistanceMatrix = registry.proxy("googleDistanceMatrix")
+attractions = registry.proxy("attractions")
+events = registry.proxy("events")
 
 
 def load_line_json_data(filename):
@@ -85,7 +80,7 @@ def get_total_cost(question, tested_data):
                 pass
             else:
                 if 'flight number' in value.lower():
-                    res = flight.data[flight.data['Flight Number'] == value.split('Flight Number: ')[1].split(',')[0]]
+                    res = flight.get_by_number(value.split('Flight Number: ')[1].split(',')[0])
                     if len(res) > 0:
                         total_cost += res['Price'].values[0] * question['people_number']
                 
@@ -101,7 +96,7 @@ def get_total_cost(question, tested_data):
         # breakfast
         if unit['breakfast'] and unit['breakfast'] != '-':
             name, city = get_valid_name_city(unit['breakfast'])
-            res = restaurants.data[(restaurants.data['name'].astype(str).str.contains(re.escape(name))) & (restaurants.data['City'] == city)]
+            res = restaurants.find_by_name(name, city)
             if len(res) > 0:
                 total_cost += res['avg_cost'].values[0] * question['people_number']
 
@@ -109,21 +104,21 @@ def get_total_cost(question, tested_data):
         # lunch
         if unit['lunch'] and unit['lunch'] != '-':
             name, city = get_valid_name_city(unit['lunch'])
-            res = restaurants.data[(restaurants.data['name'].astype(str).str.contains(re.escape(name))) & (restaurants.data['City'] == city)]
+            res = restaurants.find_by_name(name, city)
             if len(res) > 0:
                 total_cost += res['avg_cost'].values[0] * question['people_number']
         
         # dinner
         if unit['dinner'] and unit['dinner'] != '-':
             name, city = get_valid_name_city(unit['dinner'])
-            res = restaurants.data[(restaurants.data['name'].astype(str).str.contains(re.escape(name))) & (restaurants.data['City'] == city)]
+            res = restaurants.find_by_name(name, city)
             if len(res) > 0:
                 total_cost += res['avg_cost'].values[0] * question['people_number']
         
         # accommodation
         if unit['accommodation'] and unit['accommodation'] != '-':
             name, city = get_valid_name_city(unit['accommodation'])
-            res = accommodation.data[(accommodation.data['name'].astype(str).str.contains(re.escape(name))) & (accommodation.data['City'] == city)]
+            res = accommodation.find_by_name(name, city)
             # if len(res) > 0:
             #     total_cost += res['price'].values[0] * math.ceil(question['people_number'] * 1.0 / res['max_occupancy'].values[0])
             if len(res) > 0:
@@ -156,7 +151,7 @@ def is_valid_room_rule(question, tested_data):
         unit = tested_data[i]
         if unit['accommodation'] and unit['accommodation'] != '-':
             name, city = get_valid_name_city(unit['accommodation'])
-            res = accommodation.data[(accommodation.data['name'].astype(str).str.contains(re.escape(name))) & (accommodation.data['City'] == city)]
+            res = accommodation.find_by_name(name, city)
             if len(res) > 0:
                 if question['local_constraint']['house rule'] == 'smoking' and 'No smoking' in str(res['house_rules'].values[0]):
                     return False, f"The house rule should be {question['local_constraint']['house rule']}."
@@ -184,31 +179,19 @@ def is_valid_cuisine(question, tested_data):
                 name, city = get_valid_name_city(unit['breakfast'])
                 if city == question['org']:
                     continue
-                res = restaurants.data[(restaurants.data['name'].astype(str).str.contains(re.escape(name))) & (restaurants.data['City'] == city)]
-                if len(res) > 0:       
-                    for cuisine in question['local_constraint']['cuisine']:
-                        if cuisine in res.iloc[0]['cuisines']:
-                            cuisine_set.add(cuisine)
+                cuisine_set.update(restaurants.cuisines_of(name, city, question['local_constraint']['cuisine']))
 
             if unit['lunch'] and unit['lunch'] != '-':
                 name, city = get_valid_name_city(unit['lunch'])
                 if city == question['org']:
                     continue
-                res = restaurants.data[(restaurants.data['name'].astype(str).str.contains(re.escape(name))) & (restaurants.data['City'] == city)]
-                if len(res) > 0:
-                    for cuisine in question['local_constraint']['cuisine']:
-                        if cuisine in res.iloc[0]['cuisines']:
-                            cuisine_set.add(cuisine)
+                cuisine_set.update(restaurants.cuisines_of(name, city, question['local_constraint']['cuisine']))
 
             if unit['dinner'] and unit['dinner'] != '-':
                 name, city = get_valid_name_city(unit['dinner'])
                 if city == question['org']:
                     continue
-                res = restaurants.data[(restaurants.data['name'].astype(str).str.contains(re.escape(name))) & (restaurants.data['City'] == city)]
-                if len(res) > 0:
-                    for cuisine in question['local_constraint']['cuisine']:
-                        if cuisine in res.iloc[0]['cuisines']:
-                            cuisine_set.add(cuisine)
+                cuisine_set.update(restaurants.cuisines_of(name, city, question['local_constraint']['cuisine']))
 
         if len(cuisine_set) == len(question['local_constraint']['cuisine']):
             return True, None
@@ -240,12 +223,7 @@ def is_valid_attraction_type(question, tested_data):
                     if city == question['org']:
                         continue
                     
-                    res = attractions.data[(attractions.data['name'].astype(str).str.contains(re.escape(name))) & (attractions.data['City'] == city)]
-                    
-                    if len(res) > 0:
-                        for attraction_type in attraction_types:
-                            if attraction_type in res.iloc[0]['subcategories']:
-                                attraction_set.add(attraction_type)
+                    attraction_set.update(attractions.subcategories_of(name, city, attraction_types))
                                 
         if len(attraction_set) == len(attraction_types):
             return True, None
@@ -311,9 +289,7 @@ def is_valid_event_type(question, tested_data):
                     name = event.rsplit(',',1)[0].strip()  # Extract name before the first comma
                     city = event.rsplit(",",1)[-1].strip()
                     dates = question['date']
-                    event_data = events.run(city,dates)
-                       
-                    res = event_data[(event_data['name'].astype(str).str.contains(re.escape(name)))]
+                    res = events.find_by_name(name, city, dates)
                        
                     if len(res) > 0:
                         for event_type in event_types:
@@ -351,7 +327,7 @@ def is_valid_room_type(question, tested_data):
         unit = tested_data[i]
         if unit['accommodation'] and unit['accommodation'] != '-':
             name, city = get_valid_name_city(unit['accommodation'])
-            res = accommodation.data[(accommodation.data['name'].astype(str).str.contains(re.escape(name))) & (accommodation.data['City'] == city)]
+            res = accommodation.find_by_name(name, city)
             if len(res) > 0:
                 if question['local_constraint']['room type'] == 'not shared room' and res['roomType'].values[0] == 'shared_room':
                     return False, f"The room type should be {question['local_constraint']['room type']}."
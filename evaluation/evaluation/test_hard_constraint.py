@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from tools.sandbox import database
+from tools.sandbox.registry import registry
+
+pytest.importorskip("tqdm")
+pytest.importorskip("gradio")  # utils.func
+
+
+@pytest.fixture
+def sandbox_registry(sandbox_tools, monkeypatch):
+    """The process registry serving the sample tools, freshly built."""
+    for name, tool in sandbox_tools.items():
+        monkeypatch.setitem(registry.factories, name, lambda data, tool=tool: tool)
+    monkeypatch.setattr(registry, "instances", {})
+    monkeypatch.setattr(registry, "stats", {})
+    monkeypatch.setattr(registry, "database", None)
+    return sandbox_tools
+
+
+@pytest.fixture
+def hard_constraint(monkeypatch):
+    # the module changes the working directory on import
+    monkeypatch.chdir(os.getcwd())
+    from evaluation import hard_constraint
+    return hard_constraint
+
+
+def sample_plan(tools):
+    restaurant = tools["restaurants"].data.iloc[0]
+    stay = tools["accommodations"].data.iloc[0]
+    sight = tools["attractions"].data.iloc[0]
+    event = tools["events"].data.iloc[0]
+    flight = tools["flights"].data.iloc[0]
+    question = {
+        "days": 1, "people_number": 2, "org": "Nowhere", "budget": 10 ** 6,
+        "date": [event["dateTitle"].strftime("%Y-%m-%d")],
+        "local_constraint": {"house rule": "pets", "cuisine": ["Pizza"], "attraction": ["Museums"],
+                             "event": [event["segmentName"]], "transportation": "no self-driving",
+                             "room type": "not shared room"},
+    }
+    plan = [{
+        "current_city": f"from {flight['OriginCityName']} to {flight['DestCityName']}",
+        "transportation": f"Flight Number: {flight['Flight Number']}, from {flight['OriginCityName']} to {flight['DestCityName']}",
+        "breakfast": f"{restaurant['name']}, {restaurant['City']}",
+        "lunch": f"{restaurant['name']}, {restaurant['City']}",
+        "dinner": "-",
+        "accommodation": f"{stay['name']}, {stay['City']}",
+        "attraction": f"{sight['name']}, {sight['City']};",
+        "event": f"{event['name']}, {event['city']}",
+    }]
+    return question, plan
+
+
+def test_evaluation_keeps_pandas_with_sqlite_backend(sandbox_registry, hard_constraint, tmp_path, monkeypatch):
+    question, plan = sample_plan(sandbox_registry)
+    expected = hard_constraint.evaluation(question, plan)
+
+    names = ("flights", "accommodations", "restaurants", "attractions", "events")
+    path = database.compile_database({name: sandbox_registry[name] for name in names}, str(tmp_path / "sandbox.sqlite"))
+    monkeypatch.setenv(database.BACKEND_ENV, "sqlite")
+    monkeypatch.setenv(database.DATABASE_ENV, path)
+    monkeypatch.setattr(registry, "instances", {})
+    monkeypatch.setattr(registry, "stats", {})
+
+    assert hard_constraint.evaluation(question, plan) == expected
+    assert hard_constraint.get_total_cost(question, plan) > 0
+    assert all(stats["source"] != "sqlite" for stats in registry.stats.values())
+
+    # the planner environment only looks flights up by number and opts in to the database
+    from tools.planner.env import ReactEnv
+    env = ReactEnv()
+    number = plan[0]["transportation"].split("Flight Number: ")[1].split(",")[0]
+    assert env.flight.get_by_number(number)["Price"].tolist() == \
+        sandbox_registry["flights"].get_by_number(number)["Price"].tolist()
+    assert registry.stats["flights:sqlite"]["source"] == "sqlite"
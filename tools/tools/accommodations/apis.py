@@ -1,28 +1,182 @@
+import json
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
 from typing import Optional
+from tools.sandbox.snapshot import load_csv
+from tools.sandbox.compact import compact
+from tools.sandbox.index import build_group_index, NameIndex
+from tools.sandbox.cache import cached, clear_cache
 # from utils.func import extract_before_parenthesis
 
 
+# house rule a guest may need -> its bit in rule_flags, set when house_rules says "No <rule>"
+HOUSE_RULES = {'parties': 1, 'smoking': 2, 'children under 10': 4, 'pets': 8, 'visitors': 16}
+ROOM_TYPES = ('entire_home', 'private_room', 'shared_room')
+SEARCH_ORDERS = ('price', 'rating', 'occupancy')
+
+
+def parse_price(pricing):
+    """Nightly price out of a pricing entry like '{"price": "$554", "fee": null}', NaN if there is none."""
+    try:
+        entry = json.loads(str(pricing).strip().replace("'", '"').replace("None", "null"))
+        return float(entry["price"].replace('$', '').replace(',', ''))
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return np.nan
+
+
+def _select_columns(data):
+    return compact(data.dropna()[['name','pricing','roomType', 'house_rules', 'max_occupancy', 'rating', 'City']], 'accommodations')
+
+
+def _drop_incomplete(data):
+    return compact(data.dropna(), 'accommodations (load_db)')
+
+
 class Accommodations:
-    def __init__(self, path='/accommodation/cleaned_listings_final_v2.csv'):
+    def __init__(self, path='/accommodation/cleaned_listings_final_v2.csv', data=None):
         self.path = path
-        self.data = pd.read_csv(self.path).dropna()[['name','pricing','roomType', 'house_rules', 'max_occupancy', 'rating', 'City']]
+        self.data = data if data is not None else load_csv(self.path, _select_columns)
+        self.city_index = build_group_index(self.data, "City")
+        self.name_index = None
+        self.search_index = None
         print("Accommodations loaded.")
 
     def load_db(self):
-        self.data = pd.read_csv(self.path).dropna()
+        self.data = load_csv(self.path, _drop_incomplete)
+        self.city_index = build_group_index(self.data, "City")
+        self.name_index = None
+        self.search_index = None
+        clear_cache(self)
 
+    @cached("Accommodations.run")
     def run(self,
             city: str,
             ) -> DataFrame:
         """Search for accommodations by city."""
-        results = self.data[self.data["City"] == city]
-        if len(results) == 0:
+        results = self.city_index.get(city)
+        if results is None:
             return "There is no attraction in this city."
         
         return results
     
+    def find_by_name(self, name: str, city: str) -> DataFrame:
+        """Rows of the city whose name contains ``name``, the rows a str.contains(re.escape(name)) scan finds."""
+        # Built on first use, only the evaluation looks names up
+        if self.name_index is None:
+            self.name_index = NameIndex(self.data, "name", "City")
+        return self.name_index.lookup(name, city)
+
+    def build_search_index(self):
+        """
+        Per-row search attributes aligned with self.data: house rule bitflags, room type
+        codes (position in ROOM_TYPES, -1 for others), nightly price and occupancy; plus,
+        per city, its row positions in table order and sorted by every SEARCH_ORDERS key.
+        """
+        rules = self.data['house_rules'].astype(str).tolist()
+        self.rule_flags = np.array([sum(bit for rule, bit in HOUSE_RULES.items() if f'No {rule}' in text)
+                                    for text in rules], dtype=np.int8)
+        room_codes = {room_type: code for code, room_type in enumerate(ROOM_TYPES)}
+        self.room_codes = np.array([room_codes.get(room_type, -1) for room_type in self.data['roomType'].astype(str).tolist()],
+                                   dtype=np.int8)
+        self.prices = np.array([parse_price(pricing) for pricing in self.data['pricing'].tolist()], dtype=float)
+        self.occupancy = pd.to_numeric(self.data['max_occupancy'], errors='coerce').to_numpy(dtype=float)
+        # sort keys, ascending; best rated first, missing prices and ratings last
+        keys = {'price': self.prices,
+                'rating': -pd.to_numeric(self.data['rating'], errors='coerce').to_numpy(dtype=float),
+                'occupancy': self.occupancy}
+
+        self.search_index = {}
+        for city, rows in self.data.groupby('City', sort=False, observed=True).indices.items():
+            entry = {None: rows}
+            for order, key in keys.items():
+                entry[order] = rows[np.argsort(key[rows], kind='stable')]
+            self.search_index[city] = entry
+        self.search_keys = keys
+
+    def search_positions(self,
+            city=None,
+            min_occupancy: Optional[int] = None,
+            room_type=None,
+            allowed_rules=None,
+            max_price: Optional[float] = None,
+            order_by: Optional[str] = None,
+            k: Optional[int] = None,
+            ) -> np.ndarray:
+        """search() without building the frame: row positions in self.data."""
+        if order_by not in (None,) + SEARCH_ORDERS:
+            raise ValueError("order_by must be one of price, rating, occupancy or None")
+        # Built on first use, like the name index
+        if self.search_index is None:
+            self.build_search_index()
+        cities = [city] if city is None or isinstance(city, str) else list(city)
+        if room_type is not None:
+            room_types = [room_type] if isinstance(room_type, str) else list(room_type)
+            room_codes = [ROOM_TYPES.index(t) for t in room_types if t in ROOM_TYPES]
+        forbidden = 0
+        if allowed_rules is not None:
+            for rule in [allowed_rules] if isinstance(allowed_rules, str) else allowed_rules:
+                if rule not in HOUSE_RULES:
+                    raise ValueError(f"Unknown house rule {rule}, expected one of {', '.join(HOUSE_RULES)}")
+                forbidden |= HOUSE_RULES[rule]
+
+        found = []
+        for name in cities:
+            if name is None:
+                rows = np.arange(len(self.data)) if order_by is None else \
+                    np.argsort(self.search_keys[order_by], kind='stable')
+            else:
+                entry = self.search_index.get(name)
+                if entry is None:
+                    continue
+                rows = entry[order_by]
+            keep = np.ones(len(rows), dtype=bool)
+            if min_occupancy is not None:
+                keep &= self.occupancy[rows] >= min_occupancy
+            if room_type is not None:
+                keep &= np.isin(self.room_codes[rows], room_codes)
+            if forbidden:
+                keep &= (self.rule_flags[rows] & forbidden) == 0
+            if max_price is not None:
+                keep &= self.prices[rows] <= max_price
+            rows = rows[keep]
+            found.append(rows if k is None else rows[:k])
+
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        rows = np.concatenate(found)
+        if len(found) > 1 and order_by is not None:
+            # merge the cities' sorted rows; stable keeps the city order among ties
+            rows = rows[np.argsort(self.search_keys[order_by][rows], kind='stable')]
+        return rows if k is None else rows[:k]
+
+    def search(self,
+            city=None,
+            min_occupancy: Optional[int] = None,
+            room_type=None,
+            allowed_rules=None,
+            max_price: Optional[float] = None,
+            order_by: Optional[str] = None,
+            k: Optional[int] = None,
+            ) -> DataFrame:
+        """
+        Accommodations matching every given filter.
+        Parameters:
+            city: City name, list of cities, or None for all of them.
+            min_occupancy: Only places with max_occupancy at least this.
+            room_type: One of ROOM_TYPES or a list of them.
+            allowed_rules: House rules (keys of HOUSE_RULES, e.g. 'pets') the guests need;
+                places whose house_rules say "No <rule>" are left out.
+            max_price: Only places whose nightly price is at most this; places without a
+                parsable price are left out.
+            order_by: None (table order, city by city), 'price' (cheapest first), 'rating'
+                (best first) or 'occupancy' (smallest first).
+            k: At most this many rows.
+        Returns:
+            The matching rows of the table, with their table index.
+        """
+        return self.data.iloc[self.search_positions(city, min_occupancy, room_type, allowed_rules, max_price, order_by, k)]
+
     def run_for_annotation(self,
             city: str,
             ) -> DataFrame:
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.accommodations.apis import HOUSE_RULES, parse_price
+
+ORDER_KEYS = {"price": lambda data: data["pricing"].map(parse_price),
+              "rating": lambda data: -pd.to_numeric(data["rating"], errors="coerce"),
+              "occupancy": lambda data: pd.to_numeric(data["max_occupancy"], errors="coerce")}
+
+
+def scan_search(data, city=None, min_occupancy=None, room_type=None, allowed_rules=None, max_price=None,
+                order_by=None, k=None):
+    """search() as boolean filters and a stable sort over the whole table."""
+    cities = [city] if city is None or isinstance(city, str) else list(city)
+    found = []
+    for name in cities:
+        rows = data if name is None else data[data["City"] == name]
+        if min_occupancy is not None:
+            rows = rows[pd.to_numeric(rows["max_occupancy"]) >= min_occupancy]
+        if room_type is not None:
+            rows = rows[rows["roomType"].isin([room_type] if isinstance(room_type, str) else room_type)]
+        for rule in [] if allowed_rules is None else [allowed_rules] if isinstance(allowed_rules, str) else allowed_rules:
+            rows = rows[~rows["house_rules"].astype(str).str.contains(f"No {rule}", regex=False)]
+        if max_price is not None:
+            rows = rows[rows["pricing"].map(parse_price) <= max_price]
+        if order_by is not None:
+            rows = rows.assign(_key=ORDER_KEYS[order_by](rows)).sort_values("_key", kind="stable").drop(columns="_key")
+        found.append(rows)
+    results = pd.concat(found)
+    if order_by is not None and len(found) > 1:
+        results = results.assign(_key=ORDER_KEYS[order_by](results)).sort_values("_key", kind="stable").drop(columns="_key")
+    return results if k is None else results.head(k)
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"city": "Austin"},
+    {"city": "Atlantis"},
+    {"city": ["Austin", "Dallas", "Atlantis"], "order_by": "price", "k": 7},
+    {"city": "Houston", "min_occupancy": 4, "order_by": "rating"},
+    {"city": "Fresno", "room_type": "entire_home", "allowed_rules": ["pets", "smoking"]},
+    {"room_type": ["private_room", "shared_room"], "max_price": 200, "order_by": "occupancy", "k": 20},
+    {"city": ["Buffalo", "Albany"], "allowed_rules": "children under 10", "max_price": 300, "order_by": "rating"},
+    {"allowed_rules": list(HOUSE_RULES), "k": 5},
+])
+def test_search_matches_scan(sandbox_tools, filters):
+    accommodations = sandbox_tools["accommodations"]
+    results = accommodations.search(**filters)
+    expected = scan_search(accommodations.data, **filters)
+    pd.testing.assert_frame_equal(results, expected)
+
+
+def test_search_rejects_unknown_arguments(sandbox_tools):
+    accommodations = sandbox_tools["accommodations"]
+    with pytest.raises(ValueError):
+        accommodations.search(order_by="name")
+    with pytest.raises(ValueError):
+        accommodations.search(allowed_rules="music")
+
+
+@pytest.mark.parametrize("pricing, price", [
+    ('{"price": "$554", "fee": null}', 554.0),
+    ("{'price': '$1,250', 'fee': None}", 1250.0),
+    ("{}", np.nan),
+    ("not json", np.nan),
+    (None, np.nan),
+])
+def test_parse_price(pricing, price):
+    assert parse_price(pricing) == pytest.approx(price, nan_ok=True)
@@ -1,28 +1,191 @@
-import pandas as pd
+import numpy as np
 from pandas import DataFrame
 from typing import Optional
+from tools.sandbox.snapshot import load_csv
+from tools.sandbox.compact import compact
+from tools.sandbox.index import build_group_index, NameIndex
+from tools.sandbox.geo import GridIndex
+from tools.sandbox.multihot import MultiHotIndex
+from tools.sandbox.cache import cached, clear_cache
 # from utils.func import extract_before_parenthesis
 
 
+def _select_columns(data):
+    return compact(data[['name','latitude','longitude','address', 'visit_duration','subcategories','website','City']].dropna(subset=['name','latitude','longitude','address', 'visit_duration','subcategories','website','City']), 'attractions')
+
+
 class Attractions:
-    def __init__(self, path='cleaned_attractions_final.csv'):
+    def __init__(self, path='cleaned_attractions_final.csv', data=None):
         self.path = path
-        self.data = pd.read_csv(self.path)[['name','latitude','longitude','address', 'visit_duration','subcategories','website','City']].dropna(subset=['name','latitude','longitude','address', 'visit_duration','subcategories','website','City'])
+        self.data = data if data is not None else load_csv(self.path, _select_columns)
+        self.build_indexes()
         print("Attractions loaded.")
 
     def load_db(self):
-        self.data = pd.read_csv(self.path)
+        self.data = load_csv(self.path)
+        self.build_indexes()
+        clear_cache(self)
+
+    def build_indexes(self):
+        # run() returns each city with a fresh index, so slice it that way once
+        self.city_index = build_group_index(self.data, "City", reset_index=True)
+        self.city_rows = self.city_index.rows
+        self.subcategory_index = MultiHotIndex(self.data['subcategories'])
+        self.name_index = None
+        self.geo_index = {}
 
+    @cached("Attractions.run")
     def run(self,
             city: str,
             ) -> DataFrame:
         """Search for Accommodations by city and date."""
-        results = self.data[self.data["City"] == city]
-        # the results should show the index
-        results = results.reset_index(drop=True)
-        if len(results) == 0:
+        results = self.city_index.get(city)
+        if results is None:
             return "There is no attraction in this city."
         return results  
+
+    def find_by_name(self, name: str, city: str) -> DataFrame:
+        """Rows of the city whose name contains ``name``, the rows a str.contains(re.escape(name)) scan finds."""
+        return self._names().lookup(name, city)
+
+    def _names(self):
+        # Built on first use, only the evaluation looks names up
+        if self.name_index is None:
+            self.name_index = NameIndex(self.data, "name", "City")
+        return self.name_index
+
+    def subcategories_of(self, name: str, city: str, subcategories) -> list:
+        """
+        The given subcategories found in the subcategories of find_by_name(name, city).iloc[0],
+        an empty list if there is no such attraction.
+        """
+        positions = self._names().positions(name, city)
+        if len(positions) == 0:
+            return []
+        return self.subcategory_index.terms_in(positions[0], subcategories)
+
+    def search_positions(self, city=None, subcategories=None, match: str = 'any', k: Optional[int] = None) -> np.ndarray:
+        """search() without building the frame: row positions in self.data."""
+        found = []
+        for name in [city] if city is None or isinstance(city, str) else list(city):
+            rows = np.arange(len(self.data)) if name is None else self.city_rows.get(name)
+            if rows is None:
+                continue
+            if subcategories is not None:
+                rows = rows[self.subcategory_index.select(subcategories, rows, match)]
+            found.append(rows)
+        rows = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+        return rows if k is None else rows[:k]
+
+    def search(self,
+            city=None,
+            subcategories=None,
+            match: str = 'any',
+            k: Optional[int] = None,
+            ) -> DataFrame:
+        """
+        Attractions of the given subcategories.
+        Parameters:
+            city: City name, list of cities, or None for all of them.
+            subcategories: Subcategory or list of them, matched as substrings of the
+                subcategories column; no filter if None.
+            match: 'any' (at least one of the subcategories) or 'all' (every one).
+            k: At most this many rows, in table order city by city.
+        Returns:
+            The matching rows of the table, with their table index.
+        """
+        return self.data.iloc[self.search_positions(city, subcategories, match, k)]
+
+    def _grid(self, city, subcategory):
+        # (city, subcategory) -> (positions in the city frame, grid over them), built on first use
+        key = (city, subcategory)
+        if key not in self.geo_index:
+            city_rows = self.city_rows.get(city)
+            if city_rows is None:
+                self.geo_index[key] = None
+            else:
+                rows = np.arange(len(city_rows))
+                if subcategory is not None:
+                    rows = rows[self.subcategory_index.matches(subcategory, city_rows)]
+                self.geo_index[key] = (rows, GridIndex(self.data['latitude'].iloc[city_rows[rows]].to_numpy(dtype=float),
+                                                       self.data['longitude'].iloc[city_rows[rows]].to_numpy(dtype=float)))
+        return self.geo_index[key]
+
+    def near_positions(self, latitude: float, longitude: float, city: str, radius_km: Optional[float] = None,
+                       k: Optional[int] = None, subcategory: Optional[str] = None):
+        """
+        near() without building the frame.
+        Returns:
+            (positions in run(city), distances in km), closest first.
+        """
+        entry = self._grid(city, subcategory)
+        if entry is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        rows, grid = entry
+        if radius_km is None:
+            ids, distances = grid.nearest(latitude, longitude, len(grid) if k is None else k)
+        else:
+            ids, distances = grid.within(latitude, longitude, radius_km)
+            if k is not None:
+                ids, distances = ids[:k], distances[:k]
+        return rows[ids], distances
+
+    def near(self,
+             latitude: float,
+             longitude: float,
+             city: str,
+             radius_km: Optional[float] = None,
+             k: Optional[int] = None,
+             subcategory: Optional[str] = None,
+             ) -> DataFrame:
+        """
+        Attractions of a city around a coordinate, closest first.
+        Parameters:
+            latitude, longitude: Query point in degrees, e.g. an accommodation or another attraction.
+            city: City searched.
+            radius_km: Only attractions at most this far (haversine), no limit if None.
+            k: At most this many attractions, all of them if None.
+            subcategory: Only attractions whose subcategories contain this one (e.g. 'Museums').
+        Returns:
+            The matching rows of run(city) with a distance_km column.
+        """
+        city_rows = self.city_rows.get(city)
+        if city_rows is None:
+            return "There is no attraction in this city."
+        positions, distances = self.near_positions(latitude, longitude, city, radius_km, k, subcategory)
+        results = self.data.iloc[city_rows[positions]].copy()
+        # indexed like run(city)
+        results.index = positions
+        results['distance_km'] = distances
+        return results
+
+    def near_many(self,
+                  latitudes,
+                  longitudes,
+                  city: str,
+                  radius_km: Optional[float] = None,
+                  k: Optional[int] = None,
+                  subcategory: Optional[str] = None,
+                  ) -> DataFrame:
+        """
+        near() for many query points of one city at once.
+        Returns:
+            One frame with the matches of every point, a query column giving the point's
+            position in latitudes/longitudes; points are in order, matches closest first.
+        """
+        city_rows = self.city_rows.get(city)
+        if city_rows is None:
+            return "There is no attraction in this city."
+        queries, positions, distances = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)], [np.empty(0)]
+        for query, (latitude, longitude) in enumerate(zip(latitudes, longitudes)):
+            found, found_distances = self.near_positions(latitude, longitude, city, radius_km, k, subcategory)
+            queries.append(np.full(len(found), query))
+            positions.append(found)
+            distances.append(found_distances)
+        results = self.data.iloc[city_rows[np.concatenate(positions)]].copy()
+        results.insert(0, 'query', np.concatenate(queries))
+        results['distance_km'] = np.concatenate(distances)
+        return results.reset_index(drop=True)
       
     def run_for_annotation(self,
             city: str,
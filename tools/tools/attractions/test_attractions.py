@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.sandbox.geo import haversine_km
+
+CITIES = ["Austin", "Fresno", "Buffalo"]
+
+
+def scan_near(attractions, latitude, longitude, city, radius_km=None, k=None, subcategory=None):
+    """near() as a scan of run(city): distances to every row, filtered and sorted."""
+    results = attractions.run(city).copy()
+    if subcategory is not None:
+        results = results[results["subcategories"].apply(lambda value: subcategory in value)]
+    results["distance_km"] = haversine_km(latitude, longitude, results["latitude"].to_numpy(dtype=float),
+                                          results["longitude"].to_numpy(dtype=float))
+    if radius_km is not None:
+        results = results[results["distance_km"] <= radius_km]
+    results = results.sort_values("distance_km", kind="stable")
+    return results if k is None else results.head(k)
+
+
+def query_points(attractions, city, count=8):
+    rows = attractions.run(city)
+    rng = np.random.default_rng(0)
+    return list(zip(rng.uniform(rows["latitude"].min() - 0.05, rows["latitude"].max() + 0.05, count),
+                    rng.uniform(rows["longitude"].min() - 0.05, rows["longitude"].max() + 0.05, count)))
+
+
+@pytest.mark.parametrize("city", CITIES)
+@pytest.mark.parametrize("radius_km, k, subcategory", [
+    (None, 1, None), (None, 5, "Museums"), (None, None, None), (5.0, None, None), (10.0, 3, "Parks"), (0.01, None, None),
+])
+def test_near_matches_scan(sandbox_tools, city, radius_km, k, subcategory):
+    attractions = sandbox_tools["attractions"]
+    for latitude, longitude in query_points(attractions, city):
+        results = attractions.near(latitude, longitude, city, radius_km, k, subcategory)
+        expected = scan_near(attractions, latitude, longitude, city, radius_km, k, subcategory)
+        np.testing.assert_allclose(results["distance_km"].to_numpy(), expected["distance_km"].to_numpy())
+        # the same attractions, indexed like run(city); ties may come in either order
+        assert sorted(results.index) == sorted(expected.index)
+        pd.testing.assert_frame_equal(results.drop(columns="distance_km").sort_index(),
+                                      attractions.run(city).loc[sorted(expected.index)])
+
+
+def test_near_many_matches_near(sandbox_tools):
+    attractions = sandbox_tools["attractions"]
+    points = query_points(attractions, "Austin")
+    results = attractions.near_many([p[0] for p in points], [p[1] for p in points], "Austin", radius_km=20, k=4)
+    for query, (latitude, longitude) in enumerate(points):
+        single = attractions.near(latitude, longitude, "Austin", radius_km=20, k=4)
+        found = results[results["query"] == query]
+        assert found["name"].tolist() == single["name"].tolist()
+        np.testing.assert_allclose(found["distance_km"].to_numpy(), single["distance_km"].to_numpy())
+
+
+def test_unknown_city(sandbox_tools):
+    attractions = sandbox_tools["attractions"]
+    assert attractions.near(30.0, -97.0, "Atlantis") == "There is no attraction in this city."
+    assert attractions.near_many([30.0], [-97.0], "Atlantis") == "There is no attraction in this city."
@@ -1,27 +1,86 @@
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
 from typing import Optional
+from functools import lru_cache
+from tools.sandbox.snapshot import load_csv
+from tools.sandbox.compact import compact
+from tools.sandbox.index import NameIndex
+from tools.sandbox.cache import cached, clear_cache
 # from utils.func import extract_before_parenthesis
 from datetime import datetime
 
-class Events:
-    def __init__(self, path='/events/events_cleaned.csv'):
-        self.path = path
-        # Read CSV and preprocess dates
-        self.data = pd.read_csv(self.path)[['name', 'url', 'dateTitle', 'streetAddress', 'segmentName', 'city']].dropna(
-            subset=['name', 'url', 'dateTitle', 'streetAddress', 'segmentName', 'city']
-        )
 
-        # Keep only rows with valid date formats (dd-mm-yyyy)
-        self.data = self.data[self.data['dateTitle'].str.match(r'^\d{2}-\d{2}-\d{4}$', na=False)]
+def _select_columns(data):
+    data = data[['name', 'url', 'dateTitle', 'streetAddress', 'segmentName', 'city']].dropna(
+        subset=['name', 'url', 'dateTitle', 'streetAddress', 'segmentName', 'city']
+    )
+
+    # Keep only rows with valid date formats (dd-mm-yyyy)
+    data = data[data['dateTitle'].str.match(r'^\d{2}-\d{2}-\d{4}$', na=False)].copy()
+
+    # Convert date format in the CSV to datetime for filtering
+    data['dateTitle'] = pd.to_datetime(data['dateTitle'], format='%d-%m-%Y')
+    data['segmentName'] = data['segmentName'].astype('category')
+    return compact(data, 'events')
+
+
+@lru_cache(maxsize=1024)
+def _parse_date_range(start, end):
+    """Day ordinals of a 'yyyy-mm-dd' start/end pair; repeated ranges are parsed once."""
+    return datetime.strptime(start, '%Y-%m-%d').toordinal(), datetime.strptime(end, '%Y-%m-%d').toordinal()
 
-        # Convert date format in the CSV to datetime for filtering
-        self.data['dateTitle'] = pd.to_datetime(self.data['dateTitle'], format='%d-%m-%Y')
+
+class Events:
+    def __init__(self, path='/events/events_cleaned.csv', data=None):
+        self.path = path
+        # Read CSV and preprocess dates (cached as a snapshot after the first load)
+        self.data = data if data is not None else load_csv(self.path, _select_columns)
+        self.build_date_index()
+        self.name_index = None
         print("Events loaded.")
 
     def load_db(self):
-        self.data = pd.read_csv(self.path)
+        self.data = load_csv(self.path)
+        self.build_date_index()
+        self.name_index = None
+        clear_cache(self)
+
+    def build_date_index(self):
+        """
+        Per city: the positions of the city's rows, their day ordinals sorted, the
+        positions (into the city's rows) in that order and the segmentName codes in that order.
+        """
+        dates = self.data['dateTitle']
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates, format='%d-%m-%Y', errors='coerce')
+        # datetime64[D] counts days from 1970-01-01, ordinal 719163
+        ordinals = dates.to_numpy().astype('datetime64[D]').astype(np.int64) + 719163
+        self.ordinals = ordinals
+        segments = self.data['segmentName'].astype('category')
+        self.segment_names = list(segments.cat.categories)
+        codes = segments.cat.codes.to_numpy()
+        valid = ~dates.isna().to_numpy()
 
+        self.city_dates = {}
+        for city, rows in self.data.groupby('city', sort=False, observed=True).indices.items():
+            rows = rows[valid[rows]]
+            order = np.argsort(ordinals[rows], kind='stable')
+            self.city_dates[city] = (rows, ordinals[rows][order], order, codes[rows][order])
+
+    def _date_slice(self, city, date_range):
+        """
+        City entry and the [lo, hi) range of its date-sorted rows inside date_range, None if the city is unknown.
+        A range that ends before it starts gives lo > hi, callers treat lo >= hi as no events.
+        """
+        start_date, end_date = _parse_date_range(date_range[0], date_range[-1])
+        entry = self.city_dates.get(city)
+        if entry is None:
+            return None, 0, 0
+        ordinals = entry[1]
+        return entry, np.searchsorted(ordinals, start_date, side='left'), np.searchsorted(ordinals, end_date, side='right')
+
+    @cached("Events.run")
     def run(self, city: str, date_range: list) -> pd.DataFrame:
         """
         Search for Events by city and date range.
@@ -31,25 +90,43 @@ class Events:
         Returns:
             Filtered DataFrame with events in the city within the given date range.
         """
-        # Parse the input date range
-        start_date = datetime.strptime(date_range[0], '%Y-%m-%d')
-        end_date = datetime.strptime(date_range[-1], '%Y-%m-%d')
-        
-        # Filter by city and date range
-        results = self.data[
-            (self.data['city'] == city) &
-            (self.data['dateTitle'] >= start_date) &
-            (self.data['dateTitle'] <= end_date)
-        ]
-        
-        # Reset index for cleaner output
-        results = results.reset_index(drop=True)
-        
-        if len(results) == 0:
+        # Binary search the city's date-sorted rows
+        entry, lo, hi = self._date_slice(city, date_range)
+        if entry is None or lo >= hi:
             return "There are no events in this city for the given date range."
-        
-        return results
+
+        # Back to table order, with the index reset for cleaner output
+        rows = entry[0][np.sort(entry[2][lo:hi])]
+        return self.data.iloc[rows].reset_index(drop=True)
+
+    def count_by_segment(self, city: str, date_range: list) -> dict:
+        """Number of events per segmentName in the city within the date range, without building a DataFrame."""
+        entry, lo, hi = self._date_slice(city, date_range)
+        if entry is None or lo >= hi:
+            return {}
+        # Rows without a segmentName have code -1
+        codes = entry[3][lo:hi]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.segment_names))
+        return {self.segment_names[code]: int(count) for code, count in enumerate(counts) if count}
       
+    def find_by_name(self, name: str, city: str, date_range: Optional[list] = None) -> pd.DataFrame:
+        """
+        Events of the city whose name contains ``name``, the rows a str.contains(re.escape(name)) scan finds.
+        Parameters:
+            date_range: Optional [start, end] in 'yyyy-mm-dd' format; when given only events inside it
+                are kept and the index is reset, as in run().
+        """
+        # Built on first use, only the evaluation looks names up
+        if self.name_index is None:
+            self.name_index = NameIndex(self.data, 'name', 'city')
+        rows = self.name_index.positions(name, city)
+        if date_range is None:
+            return self.data.iloc[rows]
+        start_date, end_date = _parse_date_range(date_range[0], date_range[-1])
+        ordinals = self.ordinals[rows]
+        rows = rows[(ordinals >= start_date) & (ordinals <= end_date)]
+        return self.data.iloc[rows].reset_index(drop=True)
+
     def run_for_annotation(self, city: str) -> DataFrame:
         """Search for Accommodations by city."""
         results = self.data[self.data["city"] == extract_before_parenthesis(city)]
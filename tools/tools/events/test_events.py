@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.events.apis import Events
+from tools.sandbox import database
+
+NO_EVENTS = "There are no events in this city for the given date range."
+CITIES = ["Austin", "Albany", "Fresno", "Atlantis"]
+RANGES = [["2024-11-03", "2024-11-12"], ["2024-11-01", "2024-11-30"], ["2024-11-07", "2024-11-07"],
+          ["2024-11-20", "2024-11-05"], ["2025-01-01", "2025-01-02"]]
+
+
+def scan_run(data, city, date_range):
+    """Events.run as the row scan it was before the date index."""
+    dates = pd.to_datetime(data["dateTitle"], format="%d-%m-%Y", errors="coerce") \
+        if not pd.api.types.is_datetime64_any_dtype(data["dateTitle"]) else data["dateTitle"]
+    results = data[(data["city"] == city) & (dates >= date_range[0]) & (dates <= date_range[-1])]
+    if len(results) == 0:
+        return NO_EVENTS
+    return results.reset_index(drop=True)
+
+
+def scan_counts(data, city, date_range):
+    results = scan_run(data, city, date_range)
+    if isinstance(results, str):
+        return {}
+    return {str(segment): int(count) for segment, count in results["segmentName"].value_counts().items() if count}
+
+
+@pytest.fixture
+def raw_events(sandbox_csvs, tmp_path):
+    """Events over the raw CSV (load_db), with a few rows missing their segmentName."""
+    data = pd.read_csv(sandbox_csvs["events"])
+    data.loc[data.index % 17 == 0, "segmentName"] = np.nan
+    path = str(tmp_path / "events.csv")
+    data.to_csv(path, index=False)
+    events = Events(path)
+    events.load_db()
+    return events
+
+
+@pytest.mark.parametrize("city", CITIES)
+@pytest.mark.parametrize("date_range", RANGES)
+def test_run_matches_scan(sandbox_tools, raw_events, city, date_range):
+    for events in (sandbox_tools["events"], raw_events):
+        expected = scan_run(events.data, city, date_range)
+        results = events.run(city, date_range)
+        if isinstance(expected, str):
+            assert results == expected
+        else:
+            pd.testing.assert_frame_equal(results, expected)
+
+
+@pytest.mark.parametrize("city", CITIES)
+@pytest.mark.parametrize("date_range", RANGES)
+def test_count_by_segment_matches_scan(sandbox_tools, raw_events, city, date_range):
+    for events in (sandbox_tools["events"], raw_events):
+        assert events.count_by_segment(city, date_range) == scan_counts(events.data, city, date_range)
+
+
+def test_reversed_range_has_no_events(sandbox_tools, tmp_path):
+    events = sandbox_tools["events"]
+    path = database.compile_database({"events": events}, str(tmp_path / "sandbox.sqlite"))
+    db = database.SandboxDatabase(path)
+    try:
+        db_events = database.DatabaseEvents(db)
+        for city in ["Austin", "Fresno"]:
+            assert not isinstance(events.run(city, ["2024-11-01", "2024-11-30"]), str)
+            assert events.run(city, ["2024-11-30", "2024-11-01"]) == NO_EVENTS
+            assert db_events.run(city, ["2024-11-30", "2024-11-01"]) == NO_EVENTS
+            assert events.count_by_segment(city, ["2024-11-30", "2024-11-01"]) == {}
+    finally:
+        db.close()
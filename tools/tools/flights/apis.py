@@ -1,29 +1,91 @@
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
 from typing import Optional
+from tools.sandbox.snapshot import load_csv
+from tools.sandbox.compact import compact
+from tools.sandbox.index import build_group_index
+from tools.sandbox.cache import cached, clear_cache
+from tools.flights.connections import FlightConnections
+from tools.flights.times import MINUTES_PER_DAY, parse_minutes
 # from utils.func import extract_before_parenthesis
 
+# 'HH:MM' / 'YYYY-MM-DD' strings callers compare with < and >, kept out of categoricals
+TEXT_COLUMNS = ('DepTime', 'ArrTime', 'FlightDate')
+
+
+def _select_columns(data):
+    return compact(data.dropna()[['Flight Number', 'Price', 'DepTime', 'ArrTime', 'ActualElapsedTime','FlightDate','OriginCityName','DestCityName','Distance']], 'flights', text_columns=TEXT_COLUMNS)
+
+
+def _rename_index_column(data):
+    return compact(data.dropna().rename(columns={'Unnamed: 0': 'Flight Number'}), 'flights (load_db)', text_columns=TEXT_COLUMNS)
+
 class Flights:
 
-    def __init__(self, path='/flights/cleaned_flights_november_2024.csv'):
+    def __init__(self, path='/flights/cleaned_flights_november_2024.csv', data=None):
         self.path = path
         self.data = None
 
-        self.data = pd.read_csv(self.path).dropna()[['Flight Number', 'Price', 'DepTime', 'ArrTime', 'ActualElapsedTime','FlightDate','OriginCityName','DestCityName','Distance']]
+        # a table attached from a shared store (sandbox/shared.py) replaces loading the CSV
+        self.data = data if data is not None else load_csv(self.path, _select_columns)
+        self.build_indexes()
         print("Flights API loaded.")
 
     def load_db(self):
-        self.data = pd.read_csv(self.path).dropna().rename(columns={'Unnamed: 0': 'Flight Number'})
+        self.data = load_csv(self.path, _rename_index_column)
+        self.build_indexes()
+        clear_cache(self)
+
+    def build_indexes(self):
+        """Index the table by (origin, destination, date) and by flight number."""
+        self.route_date_index = build_group_index(self.data, ["OriginCityName", "DestCityName", "FlightDate"])
+
+        # DepTime/ArrTime as minutes after midnight (-1 when unparsable), aligned with self.data rows.
+        self.dep_minutes = np.array([-1 if m is None else m for m in map(parse_minutes, self.data["DepTime"].tolist())], dtype=np.int32)
+        self.arr_minutes = np.array([-1 if m is None else m for m in map(parse_minutes, self.data["ArrTime"].tolist())], dtype=np.int32)
+        # Ordering keys: unparsable times sort after every valid one (and fall outside any departure
+        # window), arrivals roll past midnight when the flight lands the next day.
+        invalid = np.iinfo(np.int32).max
+        departure = np.where(self.dep_minutes < 0, invalid, self.dep_minutes)
+        arrival = np.where((self.dep_minutes >= 0) & (self.arr_minutes < self.dep_minutes),
+                           self.arr_minutes + MINUTES_PER_DAY, self.arr_minutes)
+        arrival = np.where(self.arr_minutes < 0, invalid, arrival)
+        self.departure_keys = departure
+        prices = self.data["Price"].to_numpy(dtype=float)
 
+        # (origin, destination, date) -> row positions sorted by price, by departure and by arrival,
+        # plus the sorted departure minutes for binary searching a departure window
+        self.route_date_orders = {}
+        for key, rows in self.data.groupby(["OriginCityName", "DestCityName", "FlightDate"], sort=False, observed=True).indices.items():
+            by_departure = rows[np.argsort(departure[rows], kind="stable")]
+            self.route_date_orders[key] = (
+                rows[np.argsort(prices[rows], kind="stable")],
+                by_departure,
+                rows[np.argsort(arrival[rows], kind="stable")],
+                departure[by_departure],
+            )
+
+        numbers = self.data["Flight Number"]
+        if isinstance(numbers, DataFrame):
+            # load_db() can end up with two 'Flight Number' columns, the CSV's own one is last
+            numbers = numbers.iloc[:, -1]
+        # flight number -> positions of all its rows, in table order
+        codes, uniques = pd.factorize(numbers, sort=False)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        self.number_index = {number: order[bounds[i]:bounds[i + 1]] for i, number in enumerate(uniques.tolist())}
+        # the connection graph is only built once someone searches for connections
+        self.connections = None
+
+    @cached("Flights.run")
     def run(self,
             origin: str,
             destination: str,
             departure_date: str,
             ) -> DataFrame:
         """Search for flights by origin, destination, and departure date."""
-        results = self.data[self.data["OriginCityName"] == origin]
-        results = results[results["DestCityName"] == destination]
-        results = results[results["FlightDate"] == departure_date]
+        results = self.route_date_index.get((origin, destination, departure_date))
         # if order == "ascPrice":
         #     results = results.sort_values(by=["Price"], ascending=True)
         # elif order == "descPrice":
@@ -36,9 +98,101 @@ class Flights:
         #     results = results.sort_values(by=["ArrTime"], ascending=True)
         # elif order == "descArrTime":
         #     results = results.sort_values(by=["ArrTime"], ascending=False)
-        if len(results) == 0:
+        if results is None:
             return "There is no flight from {} to {} on {}.".format(origin, destination, departure_date)
         return results
+
+    def run_many(self, queries) -> list:
+        """Batch version of run() for a list of (origin, destination, departure_date) tuples."""
+        return [self.run(origin, destination, departure_date) for origin, destination, departure_date in queries]
+
+    def top_k(self,
+            origin: str,
+            destination: str,
+            departure_date: str,
+            k: int = 5,
+            order: str = 'price',
+            dep_window: Optional[tuple] = None,
+            ) -> DataFrame:
+        """
+        Best k flights of a route on a date.
+        Parameters:
+            order: 'price' (cheapest first), 'departure' (earliest departure first) or
+                'arrival' (earliest arrival first); flights whose time can not be parsed come last.
+            dep_window: Optional (start, end) departure window, inclusive, given as
+                minutes after midnight or 'HH:MM' strings; it never holds an unparsable DepTime.
+        Returns:
+            DataFrame with at most k rows of the flights table, empty if nothing matches.
+        """
+        if order not in ('price', 'departure', 'arrival'):
+            raise ValueError("order must be one of price, departure, arrival")
+        orders = self.route_date_orders.get((origin, destination, departure_date))
+        if orders is None:
+            return self.data.iloc[0:0]
+        by_price, by_departure, by_arrival, departures = orders
+
+        if dep_window is None:
+            rows = {'price': by_price, 'departure': by_departure, 'arrival': by_arrival}[order][:k]
+            return self.data.iloc[rows]
+
+        start, end = (w if isinstance(w, (int, np.integer)) else parse_minutes(w) for w in dep_window)
+        if start is None or end is None:
+            raise ValueError(f"dep_window must be minutes after midnight or 'HH:MM' strings, got {dep_window!r}")
+        # no valid departure is later, the unparsable ones sort after this
+        end = min(end, MINUTES_PER_DAY - 1)
+        lo = np.searchsorted(departures, start, side='left')
+        hi = np.searchsorted(departures, end, side='right')
+        if order == 'departure':
+            rows = by_departure[lo:hi][:k]
+        else:
+            # keep the presorted order and drop the flights outside the window
+            rows = by_price if order == 'price' else by_arrival
+            dep = self.departure_keys[rows]
+            rows = rows[(dep >= start) & (dep <= end)][:k]
+        return self.data.iloc[rows]
+
+    def search_connections(self,
+            origin: str,
+            destination: str,
+            departure_date: str,
+            k: int = 3,
+            max_legs: int = 2,
+            objective: str = 'price',
+            min_connection: int = 60,
+            max_connection: int = 720,
+            ) -> list:
+        """Search multi-leg itineraries, see FlightConnections.search."""
+        if self.connections is None:
+            data = self.data
+            if data.columns.duplicated().any():
+                # load_db() can end up with two 'Flight Number' columns, legs keep the CSV's own (last) one
+                data = data.loc[:, ~data.columns.duplicated(keep='last')]
+            self.connections = FlightConnections(data, self.dep_minutes, self.arr_minutes)
+        return self.connections.search(origin, destination, departure_date, k=k, max_legs=max_legs, objective=objective,
+                                       min_connection=min_connection, max_connection=max_connection)
+
+    def get_by_number(self,
+            flight_number: str,
+            origin: Optional[str] = None,
+            destination: Optional[str] = None,
+            ) -> DataFrame:
+        """
+        Look up a flight by its number.
+        Parameters:
+            flight_number: Value of the 'Flight Number' column.
+            origin, destination: If given, the flight must also fly this route.
+        Returns:
+            DataFrame with the matching rows in table order, empty if there is none.
+        """
+        positions = self.number_index.get(flight_number)
+        if positions is None:
+            return self.data.iloc[0:0]
+        results = self.data.iloc[positions]
+        if origin is not None:
+            results = results[results["OriginCityName"] == origin]
+        if destination is not None:
+            results = results[results["DestCityName"] == destination]
+        return results
     
     def run_for_annotation(self,
             origin: str,
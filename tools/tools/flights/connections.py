@@ -0,0 +1,155 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from datetime import date as Date
+
+import numpy as np
+from pandas import DataFrame
+
+from tools.flights.times import MINUTES_PER_DAY, parse_minutes
+
+
+class FlightConnections:
+    """
+    Time-expanded flight graph for multi-leg itinerary search.
+
+    Every flight is a timed edge origin -> destination. A connection from flight a to
+    flight b is allowed when b leaves a's destination at least ``min_connection`` minutes
+    after a lands. Flights are grouped per (day, origin) and sorted by departure, so the
+    feasible next legs of a label are found with a binary search.
+    """
+
+    def __init__(self, data: DataFrame, dep_minutes=None, arr_minutes=None):
+        """dep_minutes/arr_minutes are the parsed DepTime/ArrTime columns (-1 when invalid), parsed here if not given."""
+        self.data = data
+        if dep_minutes is None:
+            dep_minutes = np.array([parse_minutes(x) for x in data['DepTime'].tolist()], dtype=float)
+        if arr_minutes is None:
+            arr_minutes = np.array([parse_minutes(x) for x in data['ArrTime'].tolist()], dtype=float)
+        departures = np.where(np.asarray(dep_minutes, dtype=float) < 0, np.nan, dep_minutes)
+        arrivals = np.where(np.asarray(arr_minutes, dtype=float) < 0, np.nan, arr_minutes)
+        days = np.array([Date.fromisoformat(str(x)[:10]).toordinal() for x in data['FlightDate'].tolist()], dtype=np.int64)
+        prices = data['Price'].to_numpy(dtype=float)
+        valid = ~(np.isnan(departures) | np.isnan(arrivals) | np.isnan(prices))
+
+        # Absolute minutes since day 0 of the table; a landing time earlier than the
+        # departure time means the flight lands the next day.
+        self.day0 = int(days.min()) if len(days) else 0
+        offset = (days - self.day0) * MINUTES_PER_DAY
+        self.dep = np.where(valid, offset + np.nan_to_num(departures), 0).astype(np.int64)
+        arr = offset + np.nan_to_num(arrivals)
+        arr = np.where(arrivals < departures, arr + MINUTES_PER_DAY, arr)
+        self.arr = np.where(valid, arr, 0).astype(np.int64)
+        self.price = prices
+        self.origin = data['OriginCityName'].to_numpy()
+        self.dest = data['DestCityName'].to_numpy()
+
+        # (day, origin) -> (sorted departure minutes, row positions in the same order)
+        self.departures = {}
+        positions = np.flatnonzero(valid)
+        order = positions[np.lexsort((self.dep[positions], self.origin[positions].astype(str), days[positions]))]
+        keys = list(zip(days[order].tolist(), self.origin[order].tolist()))
+        start = 0
+        for end in range(1, len(order) + 1):
+            if end == len(order) or keys[end] != keys[start]:
+                rows = order[start:end]
+                self.departures[keys[start]] = (self.dep[rows].tolist(), rows.tolist())
+                start = end
+
+    def _next_legs(self, city, earliest, latest):
+        """Row positions of flights leaving ``city`` between absolute minutes ``earliest`` and ``latest``."""
+        first_day = self.day0 + earliest // MINUTES_PER_DAY
+        last_day = self.day0 + latest // MINUTES_PER_DAY
+        for day in range(first_day, last_day + 1):
+            bucket = self.departures.get((day, city))
+            if bucket is None:
+                continue
+            times, rows = bucket
+            lo = bisect_left(times, earliest)
+            hi = bisect_right(times, latest)
+            yield from rows[lo:hi]
+
+    def search(self,
+            origin: str,
+            destination: str,
+            departure_date: str,
+            k: int = 3,
+            max_legs: int = 2,
+            objective: str = 'price',
+            min_connection: int = 60,
+            max_connection: int = 720,
+            ) -> list:
+        """
+        Find the k best itineraries from origin to destination leaving on departure_date.
+        Parameters:
+            objective: 'price' for the cheapest total fare, 'duration' for the shortest
+                time from first departure to last arrival.
+            max_legs: Maximum number of flights in an itinerary.
+            min_connection, max_connection: Allowed layover in minutes.
+        Returns:
+            List of itineraries ordered by the objective, each a dict with the legs
+            (rows of the flights table), flight numbers, total price, total minutes
+            and layovers.
+        """
+        if objective not in ('price', 'duration'):
+            raise ValueError("objective must be one of price, duration")
+
+        day = Date.fromisoformat(departure_date).toordinal()
+        bucket = self.departures.get((day, origin))
+        if bucket is None or k <= 0:
+            return []
+
+        # Label-setting search. A label is (key, tie, first departure, arrival, path).
+        # Keys never decrease along a path, so itineraries reach the destination in
+        # objective order. A label is dropped when k settled labels ending with the
+        # same flight are at least as good on key and number of legs and visited no
+        # city it has not: each of them can take every next leg it could, at no worse
+        # a key. (Labels at the same city but landing at other times can not stand in
+        # for it, their layover windows differ.)
+        heap = []
+        counter = 0
+        for row in bucket[1]:
+            key = self.price[row] if objective == 'price' else self.arr[row] - self.dep[row]
+            heap.append((key, counter, self.dep[row], self.arr[row], (row,)))
+            counter += 1
+        heapq.heapify(heap)
+
+        settled = {}
+        results = []
+        while heap and len(results) < k:
+            key, _, first_dep, arrival, path = heapq.heappop(heap)
+            city = self.dest[path[-1]]
+            visited = frozenset([origin, *(self.dest[row] for row in path)])
+            labels = settled.setdefault(path[-1], [])
+            dominated = sum(1 for other_key, other_legs, other_visited in labels
+                            if other_key <= key and other_legs <= len(path) and other_visited <= visited)
+            if dominated >= k:
+                continue
+            labels.append((key, len(path), visited))
+
+            if city == destination:
+                results.append(self._itinerary(path))
+                continue
+            if len(path) >= max_legs:
+                continue
+
+            for row in self._next_legs(city, arrival + min_connection, arrival + max_connection):
+                if self.dest[row] in visited:
+                    continue
+                if objective == 'price':
+                    next_key = key + self.price[row]
+                else:
+                    next_key = self.arr[row] - first_dep
+                heapq.heappush(heap, (next_key, counter, first_dep, self.arr[row], path + (row,)))
+                counter += 1
+
+        return results
+
+    def _itinerary(self, path):
+        rows = list(path)
+        return {
+            "legs": self.data.iloc[rows],
+            "flight_numbers": self.data.iloc[rows]['Flight Number'].tolist() if 'Flight Number' in self.data else [],
+            "total_price": float(self.price[rows].sum()),
+            "total_minutes": int(self.arr[rows[-1]] - self.dep[rows[0]]),
+            "layover_minutes": [int(self.dep[b] - self.arr[a]) for a, b in zip(rows, rows[1:])],
+        }
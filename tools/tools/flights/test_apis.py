@@ -0,0 +1,147 @@
+import pandas as pd
+import pytest
+
+from tools.flights.apis import Flights
+
+
+def make_flights():
+    rows = [
+        # number, price, dep, arr, date, origin, destination
+        ("F1", 300, "08:00", "10:30", "2024-11-01", "Austin", "Denver"),
+        ("F2", 150, "13:15", "15:00", "2024-11-01", "Austin", "Denver"),
+        ("F3", 220, "06:40", "09:10", "2024-11-01", "Austin", "Denver"),
+        ("F1", 310, "08:00", "10:30", "2024-11-02", "Austin", "Denver"),
+        ("F4", 90, "21:00", "00:45", "2024-11-01", "Denver", "Austin"),
+        ("F1", 120, "17:00", "18:20", "2024-11-02", "Denver", "Austin"),
+        ("F5", 80, "bad", "10:00", "2024-11-01", "Austin", "Denver"),
+    ]
+    data = pd.DataFrame(rows, columns=["Flight Number", "Price", "DepTime", "ArrTime", "FlightDate",
+                                       "OriginCityName", "DestCityName"])
+    data["ActualElapsedTime"] = "1 hours 30 minutes"
+    data["Distance"] = 1000.0
+    return data
+
+
+@pytest.fixture
+def flights():
+    return Flights(data=make_flights())
+
+
+def scan_by_number(data, number, origin=None, destination=None):
+    results = data[data["Flight Number"] == number]
+    if origin is not None:
+        results = results[results["OriginCityName"] == origin]
+    if destination is not None:
+        results = results[results["DestCityName"] == destination]
+    return results
+
+
+@pytest.mark.parametrize("number, origin, destination", [
+    ("F1", None, None),
+    ("F1", "Denver", None),
+    ("F1", "Austin", "Denver"),
+    ("F1", "Denver", "Denver"),
+    ("F4", "Denver", "Austin"),
+    ("F9", None, None),
+])
+def test_get_by_number_matches_scan(flights, number, origin, destination):
+    expected = scan_by_number(flights.data, number, origin, destination)
+    results = flights.get_by_number(number, origin, destination)
+    assert list(results.index) == list(expected.index)
+    pd.testing.assert_frame_equal(results, expected)
+
+
+def test_get_by_number_duplicate_number_columns():
+    data = make_flights()
+    data.insert(0, "Flight Number", range(len(data)), allow_duplicates=True)
+    flights = Flights(data=data)
+    results = flights.get_by_number("F1", "Denver")
+    assert results["Price"].tolist() == [120]
+
+
+def test_run_matches_scan(flights):
+    data = flights.data
+    for origin, destination, date in [("Austin", "Denver", "2024-11-01"), ("Denver", "Austin", "2024-11-02")]:
+        expected = data[(data["OriginCityName"] == origin) & (data["DestCityName"] == destination)
+                        & (data["FlightDate"] == date)]
+        pd.testing.assert_frame_equal(flights.run(origin, destination, date), expected)
+    assert isinstance(flights.run("Austin", "Nowhere", "2024-11-01"), str)
+
+
+def test_top_k_orders(flights):
+    assert flights.top_k("Austin", "Denver", "2024-11-01", k=2)["Flight Number"].tolist() == ["F5", "F2"]
+    # F5 has no valid DepTime: last by departure, by arrival its ArrTime still counts
+    assert flights.top_k("Austin", "Denver", "2024-11-01", k=4, order="departure")["Flight Number"].tolist() == ["F3", "F1", "F2", "F5"]
+    assert flights.top_k("Austin", "Denver", "2024-11-01", k=4, order="arrival")["Flight Number"].tolist() == ["F3", "F5", "F1", "F2"]
+    assert flights.top_k("Austin", "Boston", "2024-11-01").empty
+
+
+def test_top_k_unparsable_times_come_last():
+    data = make_flights()
+    data.loc[2, "ArrTime"] = "bad"
+    flights = Flights(data=data)
+    assert flights.top_k("Austin", "Denver", "2024-11-01", k=4, order="arrival")["Flight Number"].tolist() == ["F5", "F1", "F2", "F3"]
+    assert flights.top_k("Austin", "Denver", "2024-11-01", k=4, order="departure")["Flight Number"].tolist() == ["F3", "F1", "F2", "F5"]
+    for order in ("price", "departure", "arrival"):
+        for dep_window in [(-10, 1439), (0, 100000)]:
+            results = flights.top_k("Austin", "Denver", "2024-11-01", k=10, order=order, dep_window=dep_window)
+            assert "F5" not in results["Flight Number"].tolist()
+            assert len(results) == 3
+
+
+def test_top_k_dep_window(flights):
+    results = flights.top_k("Austin", "Denver", "2024-11-01", dep_window=("07:00", "14:00"))
+    assert results["Flight Number"].tolist() == ["F2", "F1"]
+    results = flights.top_k("Austin", "Denver", "2024-11-01", order="departure", dep_window=(400, 480))
+    assert results["Flight Number"].tolist() == ["F3", "F1"]
+
+
+@pytest.mark.parametrize("dep_window", [("7am", "14:00"), ("07:00", None), ("25:00", "26:00")])
+def test_top_k_rejects_unparsable_window(flights, dep_window):
+    with pytest.raises(ValueError):
+        flights.top_k("Austin", "Denver", "2024-11-01", dep_window=dep_window)
+
+
+def scan_top_k(data, origin, destination, date, k, order, dep_window):
+    """top_k as a scan: the route's rows, filtered by the window and stably sorted."""
+    rows = data[(data["OriginCityName"] == origin) & (data["DestCityName"] == destination) & (data["FlightDate"] == date)]
+    dep = rows["DepTime"].map(lambda value: int(value[:2]) * 60 + int(value[3:5]))
+    arr = rows["ArrTime"].map(lambda value: int(value[:2]) * 60 + int(value[3:5]))
+    keys = {"price": rows["Price"].astype(float), "departure": dep, "arrival": arr.where(arr >= dep, arr + 1440)}
+    if dep_window is not None:
+        keep = (dep >= dep_window[0]) & (dep <= dep_window[1])
+        rows, keys = rows[keep], {name: key[keep] for name, key in keys.items()}
+    return rows.iloc[keys[order].to_numpy().argsort(kind="stable")].head(k)
+
+
+@pytest.mark.parametrize("order", ["price", "departure", "arrival"])
+@pytest.mark.parametrize("k, dep_window", [(3, None), (100, None), (2, (360, 1080)), (100, (0, 720))])
+def test_top_k_matches_scan(sandbox_tools, order, k, dep_window):
+    flights = sandbox_tools["flights"]
+    data = flights.data
+    routes = data.groupby(["OriginCityName", "DestCityName", "FlightDate"], observed=True).size().sort_values(ascending=False)
+    for origin, destination, date in routes.index[:40]:
+        expected = scan_top_k(data, origin, destination, date, k, order, dep_window)
+        pd.testing.assert_frame_equal(flights.top_k(origin, destination, date, k, order, dep_window), expected)
+
+
+def test_run_many_matches_run(sandbox_tools):
+    flights = sandbox_tools["flights"]
+    keys = list(flights.route_date_index)[:30]
+    origin, destination, date = keys[0]
+    # unknown routes and cities, a date without flights, and repeated keys
+    queries = keys + [(origin, destination, "2024-12-25"), (origin, "Atlantis", date), ("Atlantis", destination, date),
+                      (destination, destination, date), keys[3], keys[0]]
+    results = flights.run_many(queries)
+    assert len(results) == len(queries)
+    data = flights.data
+    for (origin, destination, date), result in zip(queries, results):
+        expected = data[(data["OriginCityName"] == origin) & (data["DestCityName"] == destination)
+                        & (data["FlightDate"] == date)]
+        if expected.empty:
+            assert result == flights.run(origin, destination, date) == \
+                f"There is no flight from {origin} to {destination} on {date}."
+        else:
+            pd.testing.assert_frame_equal(result, expected)
+            pd.testing.assert_frame_equal(result, flights.run(origin, destination, date))
+    assert flights.run_many([]) == []
@@ -0,0 +1,65 @@
+from datetime import date as Date
+
+import pytest
+
+from tools.flights.times import MINUTES_PER_DAY, parse_minutes
+
+
+def absolute_times(row, day0):
+    offset = (Date.fromisoformat(row["FlightDate"]).toordinal() - day0) * MINUTES_PER_DAY
+    dep, arr = parse_minutes(row["DepTime"]), parse_minutes(row["ArrTime"])
+    return offset + dep, offset + arr + (MINUTES_PER_DAY if arr < dep else 0)
+
+
+def brute_force(data, origin, destination, departure_date, max_legs, objective, min_connection, max_connection):
+    """Objective value of every itinerary, enumerated over all flight sequences."""
+    day0 = min(Date.fromisoformat(value).toordinal() for value in data["FlightDate"])
+    flights = []
+    for row in data.to_dict(orient="records"):
+        dep, arr = absolute_times(row, day0)
+        flights.append((row["OriginCityName"], row["DestCityName"], dep, arr, float(row["Price"]), row["FlightDate"]))
+    keys = []
+
+    def extend(path, visited):
+        last = flights[path[-1]]
+        if last[1] == destination:
+            first = flights[path[0]]
+            keys.append(sum(flights[i][4] for i in path) if objective == "price" else last[3] - first[2])
+            return
+        if len(path) == max_legs:
+            return
+        for i, flight in enumerate(flights):
+            if flight[0] == last[1] and flight[1] not in visited and \
+                    last[3] + min_connection <= flight[2] <= last[3] + max_connection:
+                extend(path + [i], visited | {flight[1]})
+
+    for i, flight in enumerate(flights):
+        if flight[0] == origin and flight[5] == departure_date and flight[1] != origin:
+            extend([i], {origin, flight[1]})
+    return sorted(keys)
+
+
+ROUTES = [("Austin", "Buffalo"), ("Austin", "Dallas"), ("San Diego", "Buffalo"), ("Los Angeles", "New York"),
+          ("Dallas", "Fresno"), ("Albany", "Houston")]
+
+
+@pytest.mark.parametrize("origin, destination", ROUTES)
+@pytest.mark.parametrize("objective", ["price", "duration"])
+@pytest.mark.parametrize("max_legs, min_connection, max_connection", [(2, 60, 720), (3, 45, 300), (3, 30, 120), (2, 30, 1440)])
+def test_search_connections_matches_brute_force(sandbox_tools, origin, destination, objective, max_legs,
+                                                min_connection, max_connection):
+    flights = sandbox_tools["flights"]
+    for departure_date in ("2024-11-01", "2024-11-02"):
+        expected = brute_force(flights.data, origin, destination, departure_date, max_legs, objective,
+                               min_connection, max_connection)
+        itineraries = flights.search_connections(origin, destination, departure_date, k=5, max_legs=max_legs,
+                                                 objective=objective, min_connection=min_connection,
+                                                 max_connection=max_connection)
+        key = "total_price" if objective == "price" else "total_minutes"
+        assert [itinerary[key] for itinerary in itineraries] == pytest.approx(expected[:5])
+        for itinerary in itineraries:
+            legs = itinerary["legs"]
+            assert legs["OriginCityName"].iloc[0] == origin and legs["DestCityName"].iloc[-1] == destination
+            assert legs["FlightDate"].iloc[0] == departure_date
+            assert all(min_connection <= layover <= max_connection for layover in itinerary["layover_minutes"])
+            assert itinerary["flight_numbers"] == legs["Flight Number"].tolist()
@@ -0,0 +1,15 @@
+import re
+
+MINUTES_PER_DAY = 1440
+_TIME_PATTERN = re.compile(r'(\d{1,2}):(\d{2})')
+
+
+def parse_minutes(value):
+    """Minutes after midnight for a string starting with 'HH:MM', None if it is not a valid clock time."""
+    match = _TIME_PATTERN.match(str(value))
+    if not match:
+        return None
+    hours, minutes = int(match.group(1)), int(match.group(2))
+    if hours > 23 or minutes > 59:
+        return None
+    return hours * 60 + minutes
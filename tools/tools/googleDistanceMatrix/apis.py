@@ -1,37 +1,77 @@
-import requests
 # from utils.func import extract_before_parenthesis
 import re
 import json
 import os
-from requests.exceptions import SSLError
-import time
 import sys
 import pandas as pd
 import numpy as np
+from functools import lru_cache
+from tools.sandbox.snapshot import load_csv
+from tools.sandbox.compact import compact
+from tools.sandbox.cache import cached
+from tools.googleDistanceMatrix.online import DistanceMatrixClient
 
 # This tool refers to the "DistanceMatrix" in the paper. Considering this data obtained from Google API, we consistently use this name in the code. 
 # Please be assured that this will not influence the experiment results shown in the paper. 
 
+def _compact(data):
+    return compact(data, 'distance_matrix')
+
+
+@lru_cache(maxsize=4096)
 def extract_before_parenthesis(s):
+    if '(' not in s:
+        return s
     match = re.search(r'^(.*?)\([^)]*\)', s)
     return match.group(1) if match else s
 
 class GoogleDistanceMatrix:
-    def __init__(self, subscription_key: str="") -> None:
+    def __init__(self, subscription_key: str="", path='/distance_matrix/city_distances_times_full.csv', data=None) -> None:
         self.gplaces_api_key: str = subscription_key
-        self.data =  pd.read_csv('/distance_matrix/city_distances_times_full.csv')
+        self.path = path
+        # created on first online call, so offline runs never open a session or the cache
+        self.client = None
+        self.data = data if data is not None else load_csv(self.path, _compact)
+        self.build_matrix()
         print("OSM_DistanceMatrix loaded.")
 
+    def build_matrix(self):
+        """Compile the table into a city -> id map and dense duration/distance matrices (NaN for missing pairs)."""
+        # the first row of a duplicated pair wins, as it did for the row scan
+        pairs = self.data.drop_duplicates(subset=['origin', 'destination'], keep='first')
+        cities = pd.unique(pd.concat([pairs['origin'], pairs['destination']], ignore_index=True))
+        self.city_ids = {city: i for i, city in enumerate(cities)}
+        origin_ids = pairs['origin'].map(self.city_ids).to_numpy()
+        destination_ids = pairs['destination'].map(self.city_ids).to_numpy()
+
+        self.duration = np.full((len(cities), len(cities)), np.nan)
+        self.distance = np.full((len(cities), len(cities)), np.nan)
+        self.duration[origin_ids, destination_ids] = pairs['duration_min'].to_numpy(dtype=float)
+        self.distance[origin_ids, destination_ids] = pairs['distance_km'].to_numpy(dtype=float)
+        # lookups hand back scalars of the column dtype, like reading the DataFrame did
+        self.duration_type = self.data['duration_min'].dtype.type
+        self.distance_type = self.data['distance_km'].dtype.type
+
+    def lookup(self, origin, destination):
+        """(duration, distance) of a city pair, None if the pair is missing or has no valid value."""
+        i = self.city_ids.get(origin)
+        j = self.city_ids.get(destination)
+        if i is None or j is None:
+            return None
+        duration = self.duration[i, j]
+        distance = self.distance[i, j]
+        if np.isnan(duration) or np.isnan(distance):
+            return None
+        return self.duration_type(duration), self.distance_type(distance)
+
+    @cached("GoogleDistanceMatrix.run")
     def run(self, origin, destination, mode='driving'):
         origin = extract_before_parenthesis(origin)
         destination = extract_before_parenthesis(destination)
         info = {"origin": origin, "destination": destination,"cost": None, "duration": None, "distance": None}
-        response = self.data[(self.data['origin'] == origin) & (self.data['destination'] == destination)]
-        if len(response) > 0:
-                if response['duration_min'].values[0] is None or response['distance_km'].values[0] is None or np.isnan(response['duration_min'].values[0]) or np.isnan(response['distance_km'].values[0]):
-                    return "No valid information."
-                info["duration"] = response['duration_min'].values[0]
-                info["distance"] = response['distance_km'].values[0]
+        response = self.lookup(origin, destination)
+        if response is not None:
+                info["duration"], info["distance"] = response
                 # print(info["duration"],type(info["duration"]))
                 # print(info["distance"],type(info["distance"]))
                 if 'driving' in mode:
@@ -51,12 +91,9 @@ class GoogleDistanceMatrix:
         origin = extract_before_parenthesis(origin)
         destination = extract_before_parenthesis(destination)
         info = {"origin": origin, "destination": destination,"cost": None, "duration": None, "distance": None}
-        response = self.data[(self.data['origin'] == origin) & (self.data['destination'] == destination)]
-        if len(response) > 0:
-                if response['duration_min'].values[0] is None or response['distance_km'].values[0] is None or response['duration_min'].values[0] is np.nan or response['distance_km'].values[0] is np.nan:
-                    return info
-                info["duration"] = response['duration_min'].values[0]
-                info["distance"] = response['distance_km'].values[0]
+        response = self.lookup(origin, destination)
+        if response is not None:
+                info["duration"], info["distance"] = response
 
                 
                 if int(info["duration"])< 1440:
@@ -71,58 +108,69 @@ class GoogleDistanceMatrix:
 
         return info 
 
+    def run_batch(self, origins, destinations, mode='driving'):
+        """
+        Vectorized run_for_evaluation() costs for many city pairs.
+        Parameters:
+            origins, destinations: Equal-length sequences of city names.
+            mode: 'driving'/'self-driving' or 'taxi'.
+        Returns:
+            Float array of costs, NaN where run_for_evaluation() would give no cost.
+        """
+        i = np.array([self.city_ids.get(extract_before_parenthesis(city), -1) for city in origins], dtype=np.int64)
+        j = np.array([self.city_ids.get(extract_before_parenthesis(city), -1) for city in destinations], dtype=np.int64)
+        found = (i >= 0) & (j >= 0)
+        i, j = np.where(found, i, 0), np.where(found, j, 0)
+        duration = np.where(found, self.duration[i, j], np.nan)
+        distance = np.where(found, self.distance[i, j], np.nan)
+
+        if 'driving' in mode:
+            costs = np.trunc(distance * 0.05)
+        elif mode == "taxi":
+            costs = np.trunc(distance)
+        else:
+            costs = np.full(len(i), np.nan)
+        with np.errstate(invalid='ignore'):
+            costs[~(np.trunc(duration) < 1440)] = np.nan
+        return costs
+
+
+    def online_client(self):
+        if self.client is None:
+            self.client = DistanceMatrixClient(self.gplaces_api_key)
+        return self.client
+
+    def _format_online(self, origin, destination, mode, element):
+        info = {"origin": origin, "destination": destination,"cost": None, "duration": None, "distance": None}
+        if element is not None and element['status'] == "OK":
+            info["duration"] = element['duration']['text']
+            info["distance"] = element['distance']['text']
+            if 'driving' in mode:
+                info["cost"] = int(eval(info["distance"].replace("km","").replace(",","")) * 0.05)
+            elif mode == "taxi":
+                info["cost"] = int(eval(info["distance"].replace("km","").replace(",","")))
+            # if 'day' in info["duration"]:
+            #     return "No valid information."
+            return f"{mode}, from {origin} to {destination}, duration: {info['duration']}, distance: {info['distance']}, cost: {info['cost']}"
+
+        return "No valid information."
 
     def run_online(self, origin, destination, mode="driving"):
         # mode in ['driving','taxi','walking', 'distance','transit']
-        endpoint = "https://maps.googleapis.com/maps/api/distancematrix/json"
-
-        params = {
-            "origins": origin,
-            "destinations": destination,
-            "mode": mode if mode=="taxi" else "driving",
-            "key": self.gplaces_api_key
-        }
-
-        while True:
-            try:
-                response = requests.get(endpoint, params=params)
-                break
-            except SSLError:
-                time.sleep(30)
-
-        data = response.json()
-        info = {"origin": origin, "destination": destination,"cost": None, "duration": None, "distance": None}
-        if data['status'] == "OK":
-            element = data['rows'][0]['elements'][0]
-            if element['status'] == "OK":
-                info["duration"] = element['duration']['text']
-                info["distance"] = element['distance']['text']
-                if 'driving' in mode:
-                    info["cost"] = int(eval(info["distance"].replace("km","").replace(",","")) * 0.05)
-                elif mode == "taxi":
-                    info["cost"] = int(eval(info["distance"].replace("km","").replace(",","")))
-                # if 'day' in info["duration"]:
-                #     return "No valid information."
-                return f"{mode}, from {origin} to {destination}, duration: {info['duration']}, distance: {info['distance']}, cost: {info['cost']}"
+        element = self.online_client().element(origin, destination, mode if mode=="taxi" else "driving")
+        return self._format_online(origin, destination, mode, element)
 
-        return "No valid information."   
+    def run_online_matrix(self, origins, destinations, mode="driving"):
+        """run_online() for every origin x destination pair, fetched in as few matrix requests as possible."""
+        elements = self.online_client().matrix(origins, destinations, mode if mode=="taxi" else "driving")
+        return {pair: self._format_online(pair[0], pair[1], mode, element) for pair, element in elements.items()}
     
     def run_for_annotation(self, origin, destination, mode="driving"):
         # mode in ['driving','taxi','walking', 'distance','transit']
-        endpoint = "https://maps.googleapis.com/maps/api/distancematrix/json"
-
-        params = {
-            "origins": extract_before_parenthesis(origin),
-            "destinations": extract_before_parenthesis(destination),
-            "mode": mode if mode!="taxi" else "driving",
-            "key": self.gplaces_api_key
-        }
-        
-        response = requests.get(endpoint, params=params)
-        data = response.json()
+        element = self.online_client().element(extract_before_parenthesis(origin), extract_before_parenthesis(destination),
+                                               mode if mode!="taxi" else "driving")
         info = {}
-        if data['status'] == "OK":
-            element = data['rows'][0]['elements'][0]
+        if element is not None:
             if element['status'] == "OK":
                 info["duration"] = element['duration']['text']
                 info["distance"] = element['distance']['text']
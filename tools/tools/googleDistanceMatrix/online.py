@@ -0,0 +1,227 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ChunkedEncodingError, ConnectionError, ContentDecodingError, SSLError, Timeout
+
+DEFAULT_ENDPOINT = "https://maps.googleapis.com/maps/api/distancematrix/json"
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "triptide", "distance_matrix.sqlite")
+
+# Distance Matrix API limits per request
+MAX_ELEMENTS = 100
+MAX_PLACES = 25
+
+# Top-level statuses worth retrying; anything else is a final answer
+RETRY_STATUSES = {"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"}
+
+
+class RequestFailed(Exception):
+    """The API could not be reached, or kept failing, within the retries."""
+
+
+class InvalidResponse(RequestFailed):
+    """The endpoint answered with something other than a Distance Matrix response."""
+
+
+class ElementCache:
+    """
+    Persistent (endpoint, origin, destination, mode) -> Distance Matrix element cache in SQLite.
+    Answers of different endpoints (the API, a stand-in server) never mix.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(elements)")]
+        if columns and "endpoint" not in columns:
+            # entries of older versions do not say which endpoint answered them
+            self.conn.execute("DROP TABLE elements")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS elements ("
+            "endpoint TEXT, origin TEXT, destination TEXT, mode TEXT, element TEXT, "
+            "PRIMARY KEY (endpoint, origin, destination, mode))"
+        )
+        self.conn.commit()
+
+    def get(self, endpoint, origin, destination, mode):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT element FROM elements WHERE endpoint = ? AND origin = ? AND destination = ? AND mode = ?",
+                (endpoint, origin, destination, mode),
+            ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def put_many(self, endpoint, items):
+        """items: iterable of (origin, destination, mode, element)."""
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO elements VALUES (?, ?, ?, ?, ?)",
+                [(endpoint, o, d, m, json.dumps(element)) for o, d, m, element in items],
+            )
+            self.conn.commit()
+
+
+class DistanceMatrixClient:
+    """
+    Distance Matrix API client with one pooled keep-alive session, matrix batching,
+    a persistent element cache and jittered exponential backoff.
+
+    ``endpoint`` can point at any server speaking the Distance Matrix JSON shape,
+    e.g. standin_server.py for local testing.
+    """
+
+    def __init__(self,
+                 api_key: str = "",
+                 endpoint: str = None,
+                 cache_path: str = None,
+                 max_retries: int = 6,
+                 backoff_base: float = 1.0,
+                 backoff_cap: float = 60.0,
+                 timeout: float = 30.0,
+                 pool_size: int = 10,
+                 ) -> None:
+        self.api_key = api_key
+        self.endpoint = endpoint or os.environ.get("GOOGLE_DISTANCE_MATRIX_ENDPOINT", DEFAULT_ENDPOINT)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        cache_path = cache_path or os.environ.get("TRIPTIDE_DISTANCE_CACHE", DEFAULT_CACHE_PATH)
+        self.cache = ElementCache(cache_path) if cache_path != "none" else None
+        self.stats = {"requests": 0, "retries": 0, "cache_hits": 0, "cache_misses": 0}
+        # matrix() may be called from several threads at once
+        self.stats_lock = threading.Lock()
+
+    def _count(self, name, amount=1):
+        with self.stats_lock:
+            self.stats[name] += amount
+
+    def _backoff(self, attempt):
+        # "full jitter": uniform over [0, min(cap, base * 2^attempt)]
+        time.sleep(random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt)))
+
+    def _request(self, origins, destinations, mode):
+        params = {
+            "origins": "|".join(origins),
+            "destinations": "|".join(destinations),
+            "mode": mode,
+            "key": self.api_key,
+        }
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count("retries")
+                self._backoff(attempt - 1)
+            self._count("requests")
+            try:
+                response = self.session.get(self.endpoint, params=params, timeout=self.timeout)
+            except (SSLError, ConnectionError, Timeout, ChunkedEncodingError, ContentDecodingError) as e:
+                error = e
+                continue
+            if response.status_code == 429 or response.status_code >= 500:
+                error = RequestFailed(f"HTTP {response.status_code}")
+                continue
+            if response.status_code != 200:
+                # wrong endpoint, bad key: retrying gives the same answer
+                raise InvalidResponse(f"HTTP {response.status_code} from {self.endpoint}: {response.text[:200]}")
+            try:
+                data = self._parse(response, len(origins), len(destinations))
+            except ValueError as e:
+                # a truncated or garbled body, e.g. from a proxy, is worth another try
+                error = InvalidResponse(f"Malformed response from {self.endpoint}: {e}")
+                continue
+            if data.get("status") in RETRY_STATUSES:
+                error = RequestFailed(data.get("status"))
+                continue
+            return data
+        if isinstance(error, InvalidResponse):
+            raise error
+        raise RequestFailed(f"Distance Matrix request failed after {self.max_retries + 1} attempts: {error}")
+
+    @staticmethod
+    def _parse(response, origin_count, destination_count):
+        """The JSON body; ValueError unless it is an object, with a row of elements per origin when OK."""
+        data = response.json()
+        if not isinstance(data, dict):
+            raise ValueError("body is not a JSON object")
+        if data.get("status") == "OK":
+            rows = data.get("rows")
+            if not isinstance(rows, list) or len(rows) != origin_count or not all(
+                    isinstance(row, dict) and isinstance(row.get("elements"), list)
+                    and len(row["elements"]) == destination_count for row in rows):
+                raise ValueError(f"expected {origin_count} rows of {destination_count} elements")
+        return data
+
+    def matrix(self, origins, destinations, mode="driving"):
+        """
+        Elements for every origin x destination pair.
+        Returns:
+            Dict (origin, destination) -> element dict as returned by the API
+            ({"status", "duration", "distance"}), or None when the request for
+            that pair was answered with a non-OK top-level status.
+            Raises RequestFailed when a request gives up, InvalidResponse when the
+            endpoint does not answer like the Distance Matrix API.
+        """
+        origins = list(dict.fromkeys(origins))
+        destinations = list(dict.fromkeys(destinations))
+        results = {}
+        missing = []
+        for origin in origins:
+            for destination in destinations:
+                element = self.cache.get(self.endpoint, origin, destination, mode) if self.cache is not None else None
+                if element is None:
+                    missing.append((origin, destination))
+                else:
+                    results[(origin, destination)] = element
+        self._count("cache_hits", len(results))
+        self._count("cache_misses", len(missing))
+        if not missing:
+            return results
+
+        # Only uncached pairs go out: origins missing the same destinations share requests,
+        # in blocks that fit the element limit
+        missing_by_origin = {}
+        for origin, destination in missing:
+            missing_by_origin.setdefault(origin, []).append(destination)
+        groups = {}
+        for origin, missing_destinations in missing_by_origin.items():
+            groups.setdefault(tuple(missing_destinations), []).append(origin)
+        for missing_destinations, missing_origins in groups.items():
+            self._fetch(missing_origins, list(missing_destinations), mode, results)
+        return results
+
+    def _fetch(self, origins, destinations, mode, results):
+        """Request every origin x destination pair into results, in blocks within the API limits."""
+        per_destination_block = min(MAX_PLACES, len(destinations))
+        per_origin_block = max(1, min(MAX_PLACES, MAX_ELEMENTS // per_destination_block))
+        for i in range(0, len(origins), per_origin_block):
+            origin_block = origins[i:i + per_origin_block]
+            for j in range(0, len(destinations), per_destination_block):
+                destination_block = destinations[j:j + per_destination_block]
+                data = self._request(origin_block, destination_block, mode)
+                fetched = []
+                for r, origin in enumerate(origin_block):
+                    for c, destination in enumerate(destination_block):
+                        element = None
+                        if data.get("status") == "OK":
+                            element = data["rows"][r]["elements"][c]
+                            fetched.append((origin, destination, mode, element))
+                        results.setdefault((origin, destination), element)
+                if self.cache is not None and fetched:
+                    self.cache.put_many(self.endpoint, fetched)
+
+    def element(self, origin, destination, mode="driving"):
+        """Single pair lookup, see matrix()."""
+        return self.matrix([origin], [destination], mode)[(origin, destination)]
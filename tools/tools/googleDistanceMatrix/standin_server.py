@@ -0,0 +1,112 @@
+"""
+Local stand-in for the Distance Matrix API, for exercising DistanceMatrixClient without a key.
+
+    python standin_server.py --port 8765 --fail-every 3 --throttle-every 5
+    export GOOGLE_DISTANCE_MATRIX_ENDPOINT=http://127.0.0.1:8765/maps/api/distancematrix/json
+
+Distances and durations are derived from a hash of the pair, so answers are stable across runs.
+Places named 'Nowhere...' get a NOT_FOUND element. Other paths than PATH get HTTP 404.
+"""
+import argparse
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PATH = "/maps/api/distancematrix/json"
+
+
+def fake_element(origin, destination):
+    if origin.startswith("Nowhere") or destination.startswith("Nowhere"):
+        return {"status": "NOT_FOUND"}
+    digest = int(hashlib.md5(f"{origin}|{destination}".encode("utf-8")).hexdigest(), 16)
+    meters = 5000 + digest % 2000000
+    seconds = int(meters / 25)
+    return {
+        "status": "OK",
+        "distance": {"text": f"{meters / 1000:,.0f} km", "value": meters},
+        "duration": {"text": f"{seconds // 3600} hours {seconds % 3600 // 60} mins", "value": seconds},
+    }
+
+
+class StandInServer(ThreadingHTTPServer):
+    # the default backlog of 5 resets connections when a pooled client opens many at once
+    request_queue_size = 128
+
+    def __init__(self, address, fail_every=0, throttle_every=0, malformed_every=0, max_elements=100):
+        """
+        Parameters:
+            fail_every: Answer every n-th request with HTTP 503 (never if 0).
+            throttle_every: Answer every n-th request with HTTP 429.
+            malformed_every: Answer every n-th request with a truncated JSON body.
+            max_elements: Larger requests get MAX_ELEMENTS_EXCEEDED, as from the API.
+        """
+        super().__init__(address, DistanceMatrixHandler)
+        self.fail_every = fail_every
+        self.throttle_every = throttle_every
+        self.malformed_every = malformed_every
+        self.max_elements = max_elements
+        self.request_count = 0
+        # (origins, destinations) of every request answered with a matrix
+        self.matrix_sizes = []
+        self.lock = threading.Lock()
+
+
+class DistanceMatrixHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+            count = server.request_count
+        url = urlparse(self.path)
+        if url.path != PATH:
+            self.send_error(404)
+            return
+        for every, status in ((server.fail_every, 503), (server.throttle_every, 429)):
+            if every and count % every == 0:
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+        params = parse_qs(url.query)
+        origins = params.get("origins", [""])[0].split("|")
+        destinations = params.get("destinations", [""])[0].split("|")
+        if len(origins) * len(destinations) > server.max_elements:
+            body = {"status": "MAX_ELEMENTS_EXCEEDED", "rows": []}
+        else:
+            body = {
+                "status": "OK",
+                "origin_addresses": origins,
+                "destination_addresses": destinations,
+                "rows": [{"elements": [fake_element(o, d) for d in destinations]} for o in origins],
+            }
+            with server.lock:
+                server.matrix_sizes.append((len(origins), len(destinations)))
+        payload = json.dumps(body).encode("utf-8")
+        if server.malformed_every and count % server.malformed_every == 0:
+            payload = payload[:len(payload) // 2]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-every", type=int, default=0, help="Answer every n-th request with HTTP 503")
+    parser.add_argument("--throttle-every", type=int, default=0, help="Answer every n-th request with HTTP 429")
+    parser.add_argument("--malformed-every", type=int, default=0, help="Answer every n-th request with a truncated body")
+    args = parser.parse_args()
+
+    server = StandInServer((args.host, args.port), fail_every=args.fail_every, throttle_every=args.throttle_every,
+                           malformed_every=args.malformed_every)
+    print(f"Distance Matrix stand-in on http://{args.host}:{args.port}{PATH}")
+    server.serve_forever()
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.googleDistanceMatrix.apis import GoogleDistanceMatrix, extract_before_parenthesis
+
+
+def scan_run(data, origin, destination, mode="driving"):
+    """GoogleDistanceMatrix.run as a row scan, the way it was written before the matrix."""
+    origin = extract_before_parenthesis(origin)
+    destination = extract_before_parenthesis(destination)
+    response = data[(data["origin"] == origin) & (data["destination"] == destination)]
+    if len(response) == 0:
+        return "No valid information."
+    duration, distance = response["duration_min"].values[0], response["distance_km"].values[0]
+    if np.isnan(duration) or np.isnan(distance):
+        return "No valid information."
+    cost = None
+    if "driving" in mode:
+        cost = int(distance * 0.05)
+    elif mode == "taxi":
+        cost = int(distance)
+    if int(duration) > 1440:
+        return "No valid information."
+    return f"{mode}, from {origin} to {destination}, duration: {duration}, distance: {distance}, cost: {cost}"
+
+
+def scan_cost(data, origin, destination, mode):
+    """The cost run_for_evaluation gives, NaN for none."""
+    response = data[(data["origin"] == origin) & (data["destination"] == destination)]
+    if len(response) == 0:
+        return np.nan
+    duration, distance = response["duration_min"].values[0], response["distance_km"].values[0]
+    if np.isnan(duration) or np.isnan(distance) or not int(duration) < 1440:
+        return np.nan
+    if "driving" in mode:
+        return int(distance * 0.05)
+    if mode == "taxi":
+        return int(distance)
+    return np.nan
+
+
+@pytest.fixture
+def distances(sandbox_tools):
+    matrix = sandbox_tools["googleDistanceMatrix"]
+    # a repeated pair (the first row counts) and a pair with no distance
+    extra = pd.DataFrame({"origin": ["Austin", "Austin", "Dallas"], "destination": ["Albany", "Albany", "Atlantis"],
+                          "duration_min": [100.0, 5.0, 60.0], "distance_km": [500.0, 1.0, np.nan]})
+    data = pd.concat([extra, matrix.data], ignore_index=True)
+    return GoogleDistanceMatrix(data=data)
+
+
+def city_pairs(data):
+    cities = sorted(set(data["origin"]) | set(data["destination"])) + ["Atlantis", "Austin(TX)", "Nowhere"]
+    return [(origin, destination) for origin in cities for destination in cities]
+
+
+@pytest.mark.parametrize("mode", ["driving", "self-driving", "taxi", "walking"])
+def test_run_matches_scan(distances, mode):
+    data = distances.data
+    for origin, destination in city_pairs(data):
+        assert distances.run(origin, destination, mode) == scan_run(data, origin, destination, mode)
+
+
+@pytest.mark.parametrize("mode", ["self-driving", "taxi", "walking"])
+def test_run_batch_matches_scan(distances, mode):
+    data = distances.data
+    pairs = city_pairs(data)
+    costs = distances.run_batch([origin for origin, _ in pairs], [destination for _, destination in pairs], mode)
+    expected = [scan_cost(data, extract_before_parenthesis(origin), extract_before_parenthesis(destination), mode)
+                for origin, destination in pairs]
+    np.testing.assert_array_equal(costs, np.array(expected, dtype=float))
+    for (origin, destination), cost in zip(pairs, costs):
+        info = distances.run_for_evaluation(origin, destination, mode)
+        assert (info["cost"] is None) == np.isnan(cost)
+        if info["cost"] is not None:
+            assert info["cost"] == cost
+
+
+def test_repeated_pair_keeps_first_row(distances):
+    assert distances.lookup("Austin", "Albany") == (100.0, 500.0)
+    assert distances.lookup("Dallas", "Atlantis") is None
+    assert distances.run_batch([], [], "taxi").shape == (0,)
@@ -0,0 +1,143 @@
+import sqlite3
+import threading
+
+import pytest
+
+from tools.googleDistanceMatrix import online
+from tools.googleDistanceMatrix.online import DistanceMatrixClient, ElementCache, InvalidResponse, RequestFailed
+from tools.googleDistanceMatrix.standin_server import PATH, StandInServer, fake_element
+
+
+@pytest.fixture
+def start_server():
+    servers = []
+
+    def start(**options):
+        server = StandInServer(("127.0.0.1", 0), **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}{PATH}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def client(endpoint, cache_path, **options):
+    options.setdefault("backoff_base", 0.001)
+    return DistanceMatrixClient(endpoint=endpoint, cache_path=str(cache_path), **options)
+
+
+ORIGINS = [f"Origin {i}" for i in range(30)]
+DESTINATIONS = [f"Destination {i}" for i in range(12)]
+
+
+def test_batches_within_api_limits(start_server, tmp_path):
+    server, endpoint = start_server()
+    results = client(endpoint, tmp_path / "cache.sqlite").matrix(ORIGINS, DESTINATIONS)
+    assert results == {(o, d): fake_element(o, d) for o in ORIGINS for d in DESTINATIONS}
+    assert all(o * d <= online.MAX_ELEMENTS and o <= online.MAX_PLACES and d <= online.MAX_PLACES
+               for o, d in server.matrix_sizes)
+    assert sum(o * d for o, d in server.matrix_sizes) == len(ORIGINS) * len(DESTINATIONS)
+    assert server.request_count == 4
+
+
+def test_retries_throttled_and_failed_requests(start_server, tmp_path):
+    server, endpoint = start_server(fail_every=3, throttle_every=2)
+    distances = client(endpoint, tmp_path / "cache.sqlite")
+    results = distances.matrix(ORIGINS, DESTINATIONS)
+    assert len(results) == len(ORIGINS) * len(DESTINATIONS)
+    assert all(element["status"] == "OK" for element in results.values())
+    assert distances.stats["retries"] > 0
+    assert distances.stats["requests"] == server.request_count
+
+
+def test_cache_hits_skip_requests(start_server, tmp_path):
+    server, endpoint = start_server()
+    distances = client(endpoint, tmp_path / "cache.sqlite")
+    distances.matrix(ORIGINS[:5], DESTINATIONS)
+    requests_made = server.request_count
+    # a new client on the same file answers the cached pairs and only fetches the new origin
+    again = client(endpoint, tmp_path / "cache.sqlite")
+    results = again.matrix(ORIGINS[:6], DESTINATIONS)
+    assert results == {(o, d): fake_element(o, d) for o in ORIGINS[:6] for d in DESTINATIONS}
+    assert again.stats["cache_hits"] == 5 * len(DESTINATIONS)
+    assert again.stats["cache_misses"] == len(DESTINATIONS)
+    assert server.matrix_sizes[-1] == (1, len(DESTINATIONS))
+    assert server.request_count == requests_made + 1
+
+
+def test_cached_pairs_are_not_fetched_again(start_server, tmp_path):
+    server, endpoint = start_server()
+    distances = client(endpoint, tmp_path / "cache.sqlite")
+    # a diagonal of cached pairs, and two origins with everything cached but one pair
+    distances.matrix(ORIGINS[:1], DESTINATIONS[:1])
+    distances.matrix(ORIGINS[1:2], DESTINATIONS[1:2])
+    distances.matrix(ORIGINS[2:4], DESTINATIONS[:-1])
+    requested = sum(o * d for o, d in server.matrix_sizes)
+    results = distances.matrix(ORIGINS[:4], DESTINATIONS)
+    assert results == {(o, d): fake_element(o, d) for o in ORIGINS[:4] for d in DESTINATIONS}
+    cached = 1 + 1 + 2 * (len(DESTINATIONS) - 1)
+    assert distances.stats["cache_misses"] - requested == 4 * len(DESTINATIONS) - cached
+    assert sum(o * d for o, d in server.matrix_sizes) - requested == 4 * len(DESTINATIONS) - cached
+
+
+def test_cache_keeps_endpoints_apart(start_server, tmp_path):
+    first, first_endpoint = start_server()
+    second, second_endpoint = start_server()
+    client(first_endpoint, tmp_path / "cache.sqlite").element("Austin", "Dallas")
+    other = client(second_endpoint, tmp_path / "cache.sqlite")
+    other.element("Austin", "Dallas")
+    assert other.stats["cache_hits"] == 0
+    assert second.request_count == 1
+
+
+def test_old_cache_files_are_reset(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE elements (origin TEXT, destination TEXT, mode TEXT, element TEXT, "
+                 "PRIMARY KEY (origin, destination, mode))")
+    conn.execute("INSERT INTO elements VALUES ('Austin', 'Dallas', 'driving', '{}')")
+    conn.commit()
+    conn.close()
+    cache = ElementCache(path)
+    assert cache.get("http://x", "Austin", "Dallas", "driving") is None
+    cache.put_many("http://x", [("Austin", "Dallas", "driving", {"status": "OK"})])
+    assert cache.get("http://x", "Austin", "Dallas", "driving") == {"status": "OK"}
+
+
+def test_malformed_bodies_are_retried_then_typed(start_server, tmp_path):
+    server, endpoint = start_server(malformed_every=2)
+    assert client(endpoint, tmp_path / "a.sqlite").element("Austin", "Dallas") == fake_element("Austin", "Dallas")
+
+    server, endpoint = start_server(malformed_every=1)
+    with pytest.raises(InvalidResponse):
+        client(endpoint, tmp_path / "b.sqlite", max_retries=2).element("Austin", "Dallas")
+    assert server.request_count == 3
+
+
+def test_final_http_errors_are_not_retried(start_server, tmp_path):
+    server, endpoint = start_server()
+    with pytest.raises(InvalidResponse):
+        client(endpoint.replace(PATH, "/wrong"), tmp_path / "cache.sqlite").element("Austin", "Dallas")
+    assert server.request_count == 1
+
+    # nothing listens there: connection errors are retried, then given up
+    unreachable = client("http://127.0.0.1:1" + PATH, tmp_path / "cache.sqlite", max_retries=1)
+    with pytest.raises(RequestFailed):
+        unreachable.element("Austin", "Dallas")
+    assert unreachable.stats["retries"] == 1
+
+
+def test_stats_are_consistent_across_threads(start_server, tmp_path):
+    server, endpoint = start_server(throttle_every=4)
+    distances = client(endpoint, tmp_path / "cache.sqlite")
+    threads = [threading.Thread(target=distances.matrix, args=([f"Origin {t}-{i}" for i in range(10)], DESTINATIONS))
+               for t in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert distances.stats["requests"] == server.request_count
+    assert distances.stats["cache_misses"] == 8 * 10 * len(DESTINATIONS)
@@ -1,16 +1,51 @@
+import numpy as np
 from pandas import DataFrame
 
+try:
+    import tiktoken
+except ImportError:  # token counts fall back to an estimate
+    tiktoken = None
+
+_encoder = None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens of text with the planner's gpt-3.5-turbo encoding, about 4 characters a token without tiktoken."""
+    global _encoder
+    if _encoder is None:
+        _encoder = False
+        if tiktoken is not None:
+            try:
+                _encoder = tiktoken.encoding_for_model("gpt-3.5-turbo")
+            except (OSError, ValueError, KeyError):
+                # the encoding file can not be fetched (requests errors are OSErrors) or read
+                pass
+    if _encoder is False:
+        return (len(text) + 3) // 4
+    return len(_encoder.encode(text, disallowed_special=()))
+
+
 class Notebook:
     def __init__(self) -> None:
         self.data = []
+        # one entry per data entry: text list_all() shows, its lines and the running token count at every line end
+        self.rendered = []
+
+    def _render(self, content):
+        text = content.to_string(index=False) if type(content) == DataFrame else str(content)
+        lines = text.split("\n")
+        line_tokens = np.cumsum([count_tokens(line + "\n") for line in lines])
+        return {"text": text, "lines": lines, "line_tokens": line_tokens}
 
     def write(self, input_data: DataFrame, short_description: str):
         self.data.append({"Short Description": short_description, "Content":input_data})
+        self.rendered.append(self._render(input_data))
         return f"The information has been recorded in Notebook, and its index is {len(self.data)-1}."
     
     def update(self, input_data: DataFrame, index: int, short_decription: str):
         self.data[index]["Content"] = input_data
         self.data[index]["Short Description"]  = short_decription
+        self.rendered[index] = self._render(input_data)
 
         return f"The information has been updated in Notebook."
     
@@ -21,13 +56,77 @@ class Notebook:
         
         return results
 
-    def list_all(self):
+    def tokens(self, index=None):
+        """Tokens of one entry's rendered content, or of all entries if index is None."""
+        if index is None:
+            return sum(self.tokens(i) for i in range(len(self.rendered)))
+        return int(self.rendered[index]["line_tokens"][-1])
+
+    def _note(self, index):
+        """Function of the number of lines shown giving the note on what a truncated entry leaves out."""
+        content, lines = self.data[index]["Content"], self.rendered[index]["lines"]
+        if type(content) == DataFrame:
+            # the first line is the header
+            return lambda shown: f"... {len(content) - max(shown - 1, 0)} more rows not shown, {len(content)} rows in total"
+        return lambda shown: f"... {len(lines) - shown} more lines not shown"
+
+    def _truncated(self, index, budget):
+        """
+        Content cut to the lines that fit in budget tokens together with a note on what was
+        left out, and its tokens. Only the note is left when budget is smaller than it.
+        """
+        lines, line_tokens = self.rendered[index]["lines"], self.rendered[index]["line_tokens"]
+        note = self._note(index)
+        shown = int(np.searchsorted(line_tokens, budget - count_tokens(note(0)), side="right"))
+        # fewer rows left out can take more tokens to say
+        while shown and line_tokens[shown - 1] + count_tokens(note(shown)) > budget:
+            shown -= 1
+        tokens = (int(line_tokens[shown - 1]) if shown else 0) + count_tokens(note(shown))
+        return "\n".join(lines[:shown] + [note(shown)]), tokens
+
+    def _fit(self, max_tokens):
+        """
+        Token cap per entry so that all contents, the entries over the cap cut down to it,
+        fit in max_tokens. Water-filling: the biggest entries give up tokens first. A cut
+        entry takes at least its note (entries no bigger than their note stay whole), so a
+        budget too small for the notes is exceeded.
+        """
+        sizes = [self.tokens(i) for i in range(len(self.data))]
+        notes = [count_tokens(self._note(i)(0)) for i in range(len(self.data))]
+        budget = max_tokens - sum(count_tokens(str(unit["Short Description"])) for unit in self.data)
+
+        def total(cap):
+            return sum(min(size, max(cap, note)) for size, note in zip(sizes, notes))
+
+        lo, hi = 0, max(sizes, default=0)
+        if total(hi) <= budget:
+            return None
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if total(mid) <= budget:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    def list_all(self, max_tokens=None):
+        """
+        Every entry with its content, rendered once when it was written.
+        Parameters:
+            max_tokens: Optional budget for the whole listing. When the entries do not fit,
+                the biggest ones are cut to their first rows (with a note of how many were
+                left out) until they do.
+        """
+        cap = None if max_tokens is None else self._fit(max_tokens)
         results = []
         for idx, unit in enumerate(self.data):
-            if type(unit['Content']) == DataFrame:
-                results.append({"index":idx, "Short Description":unit['Short Description'], "Content":unit['Content'].to_string(index=False)})
+            if cap is not None and self.tokens(idx) > max(cap, count_tokens(self._note(idx)(0))):
+                content = self._truncated(idx, cap)[0]
+            elif type(unit['Content']) == DataFrame:
+                content = self.rendered[idx]["text"]
             else:
-                results.append({"index":idx, "Short Description":unit['Short Description'], "Content":unit['Content']})
+                content = unit['Content']
+            results.append({"index":idx, "Short Description":unit['Short Description'], "Content":content})
         
         return results
     
@@ -36,5 +135,6 @@ class Notebook:
     
     def reset(self):
         self.data = []
+        self.rendered = []
     
     
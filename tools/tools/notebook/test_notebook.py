@@ -0,0 +1,94 @@
+import types
+
+import pandas as pd
+import pytest
+
+from tools.notebook import apis
+from tools.notebook.apis import Notebook, count_tokens
+
+
+@pytest.fixture
+def notebook(sandbox_tools):
+    notebook = Notebook()
+    notebook.write(sandbox_tools["flights"].data.head(200), "Flights from Austin")
+    notebook.write(sandbox_tools["restaurants"].run("Austin"), "Restaurants in Austin")
+    notebook.write("No valid information.", "Driving from Austin to Dallas")
+    notebook.write(sandbox_tools["attractions"].run("Dallas").head(3), "Attractions in Dallas")
+    return notebook
+
+
+def listed_tokens(results):
+    return sum(count_tokens(str(unit["Short Description"])) + count_tokens(str(unit["Content"])) for unit in results)
+
+
+def test_list_all_matches_rendering_on_read(notebook):
+    expected = [{"index": idx, "Short Description": unit["Short Description"],
+                 "Content": unit["Content"].to_string(index=False) if isinstance(unit["Content"], pd.DataFrame)
+                 else unit["Content"]}
+                for idx, unit in enumerate(notebook.data)]
+    assert notebook.list_all() == expected
+    assert notebook.list_all(max_tokens=10 ** 9) == expected
+
+
+@pytest.mark.parametrize("max_tokens", [400, 1500, 4000])
+def test_list_all_fits_the_budget(notebook, max_tokens):
+    full = notebook.list_all()
+    results = notebook.list_all(max_tokens=max_tokens)
+    assert listed_tokens(results) <= max_tokens
+    for unit, original in zip(results, full):
+        if unit["Content"] != original["Content"]:
+            shown, note = unit["Content"].rsplit("\n", 1)
+            assert original["Content"].startswith(shown)
+            assert note.startswith("... ")
+    # the small entries are left whole
+    assert results[2]["Content"] == "No valid information."
+    assert results[3]["Content"] == full[3]["Content"]
+
+
+def test_list_all_fits_budgets_down_to_the_notes(notebook):
+    descriptions = sum(count_tokens(unit["Short Description"]) for unit in notebook.data)
+    # every entry bigger than its note cut down to the note alone
+    smallest = descriptions + sum(min(notebook.tokens(i), count_tokens(notebook._note(i)(0))) for i in range(len(notebook.data)))
+    for max_tokens in range(smallest, notebook.tokens() + descriptions + 10, 3):
+        assert listed_tokens(notebook.list_all(max_tokens=max_tokens)) <= max_tokens, max_tokens
+    results = notebook.list_all(max_tokens=1)
+    assert [unit["Content"].startswith("... ") for unit in results] == \
+        [notebook.tokens(i) > count_tokens(notebook._note(i)(0)) for i in range(len(notebook.data))] == [True, True, False, True]
+    assert listed_tokens(results) == smallest
+
+
+def test_truncated_reports_the_note(notebook):
+    for budget in (0, 5, 30, 200):
+        content, tokens = notebook._truncated(0, budget)
+        # counted line by line, never less than the joined text takes
+        assert tokens >= count_tokens(content)
+        assert tokens <= max(budget, count_tokens(notebook._note(0)(0)))
+
+
+def test_count_tokens_estimates_without_tiktoken(monkeypatch):
+    monkeypatch.setattr(apis, "_encoder", None)
+    monkeypatch.setattr(apis, "tiktoken", None)
+    assert count_tokens("a" * 9) == 3 and apis._encoder is False
+
+    def offline(model):
+        raise OSError("encoding file can not be fetched")
+
+    monkeypatch.setattr(apis, "_encoder", None)
+    monkeypatch.setattr(apis, "tiktoken", types.SimpleNamespace(encoding_for_model=offline))
+    assert count_tokens("a" * 8) == 2 and apis._encoder is False
+
+
+def test_truncated_frame_counts_the_rows_left_out(notebook):
+    content = notebook.list_all(max_tokens=600)[0]["Content"]
+    lines = content.split("\n")
+    rows_shown = len(lines) - 2
+    assert lines[-1] == f"... {200 - rows_shown} more rows not shown, 200 rows in total"
+
+
+def test_update_renders_again(notebook, sandbox_tools):
+    before = notebook.tokens(1)
+    notebook.update(sandbox_tools["restaurants"].run("Dallas").head(2), 1, "Restaurants in Dallas")
+    assert notebook.tokens(1) < before
+    assert notebook.list_all()[1]["Content"] == sandbox_tools["restaurants"].run("Dallas").head(2).to_string(index=False)
+    notebook.reset()
+    assert notebook.list_all() == [] and notebook.tokens() == 0
@@ -13,6 +13,7 @@ from langchain.schema import (
     SystemMessage
 )
 from env import ReactEnv,ReactReflectEnv
+from tools.planner.response_cache import ResponseCache, cache_key
 import tiktoken
 import re
 import openai
@@ -20,8 +21,8 @@ import time
 from enum import Enum
 from typing import List, Union, Literal
 # from langchain_google_genai import ChatGoogleGenerativeAI
-from transformers import AutoModelForCausalLM, AutoTokenizer
 import torch
+from tools.planner.local_model import MODEL_PATHS, load_local_model
 import argparse
 
 
@@ -29,6 +30,10 @@ OPENAI_API_KEY = os.environ['OPENAI_API_KEY']
 # openai.api_key = OPENAI_API_KEY
 # GOOGLE_API_KEY = os.environ['GOOGLE_API_KEY']
 
+# generate() options of the local models; decoding otherwise follows the model's
+# generation_config (Qwen and Phi sample), unless the Planner is created with greedy=True
+LOCAL_GENERATION = {"max_new_tokens": 3072}
+
 
 def catch_openai_api_error():
     error = sys.exc_info()[0]
@@ -56,52 +61,89 @@ class Planner:
     def __init__(self,
                  agent_prompt: PromptTemplate = planner_agent_prompt_direct_og,
                  model_name: str = 'gpt-3.5-turbo-1106',
+                 cache: ResponseCache = None,
+                 device: str = "cuda",
+                 dtype: str = None,
+                 threads: int = None,
+                 interop_threads: int = None,
+                 model_path: str = None,
+                 greedy: bool = False,
                  ) -> None:
+        """
+        The local models (qwen, phi4) take the options of local_model.load_local_model():
+        device 'cuda' (default) or 'cpu', dtype fp32/bf16/int8 and thread counts on cpu,
+        and model_path to load other weights, e.g. a small test model. greedy=True makes
+        them decode greedily (do_sample=False) instead of sampling as their generation_config says.
+        """
         self.agent_prompt = agent_prompt
         self.scratchpad: str = ''
         self.model_name = model_name
+        self.device = device
+        self.dtype = (dtype or "fp32") if device == "cpu" else None
+        self.greedy = greedy
         self.enc = tiktoken.encoding_for_model("gpt-3.5-turbo")
+        # responses by prompt, see response_cache.py; TRIPTIDE_PLANNER_CACHE=none turns it off
+        self.cache = cache if cache is not None else ResponseCache.from_env()
         
         if model_name in ['qwen','phi4']:
-            model_path = {
-                'qwen': "Qwen/Qwen2.5-7B-Instruct",
-                'phi4': "microsoft/Phi-4-mini-instruct"
-            }[model_name]
-            
-            self.tokenizer = AutoTokenizer.from_pretrained(model_path)
-            self.model = AutoModelForCausalLM.from_pretrained(
-                model_path,
-                torch_dtype=torch.float16,
-                device_map="auto",
-                offload_folder="offload",  # Enables CPU offloading
-                attn_implementation="flash_attention_2"  # Speeds up inference
-            )
+            self.tokenizer, self.model = load_local_model(model_path or MODEL_PATHS[model_name], device=device, dtype=dtype,
+                                                          threads=threads, interop_threads=interop_threads)
+            # batches are padded on the left, so every prompt ends where generation starts
+            self.tokenizer.padding_side = "left"
+            if self.tokenizer.pad_token is None:
+                self.tokenizer.pad_token = self.tokenizer.eos_token
         else:
             self.llm = ChatOpenAI(model_name=model_name, temperature=0, max_tokens=4096, openai_api_key=OPENAI_API_KEY)
+        # local generation: queries, generated tokens and seconds spent, for throughput reports
+        self.stats = {"queries": 0, "generated_tokens": 0, "seconds": 0.0}
         
-        print(f"PlannerAgent {model_name} loaded.")
+        print(f"PlannerAgent {model_name} loaded{f' (cpu, {self.dtype})' if self.dtype else ''}.")
 
     def run(self, text,query,reference_info1, reference_info2,reference_info3 ,log_file=None) -> str:
         if log_file:
             log_file.write('\n---------------Planner\n' + self._build_agent_prompt(text, query, reference_info1,reference_info2,reference_info3))
         
         prompt = self._build_agent_prompt(text, query, reference_info1, reference_info2,reference_info3)
-        
+
+        if self.model_name not in ['qwen','phi4'] and len(self.enc.encode(prompt)) > 12000:
+            return 'Max Token Length Exceeded.'
+        key = cache_key(self.model_name, prompt, self.generation_params())
+        if self.cache is not None:
+            response = self.cache.get(key)
+            if response is not None:
+                return response
+        response = self._generate(prompt)
+        if self.cache is not None and response is not None:
+            self.cache.put(key, self.model_name, response)
+        return response
+
+    def generation_params(self):
+        """Everything besides model and prompt the response depends on, for the cache key."""
         if self.model_name in ['qwen','phi4']:
-            inputs = self.tokenizer(prompt, return_tensors="pt").to("cuda")
-            # print(self.model.generation_config)
-            output = self.model.generate(**inputs, max_new_tokens=3072) #do_sample=False) # temperature=0.0) #equivalent
-            generated_text = self.tokenizer.decode(output[0], skip_special_tokens=True)
-            
-            response_start = generated_text.find(prompt)
-            if response_start != -1:
-                generated_text = generated_text[response_start + len(prompt):].strip()
-            
-            return generated_text
+            params = self.local_generation()
+            config = getattr(self.model, "generation_config", None)
+            if config is not None:
+                # the model's own decoding defaults (do_sample, temperature, top_p, ...) apply too
+                params["generation_config"] = config.to_dict()
+            if self.device == "cpu":
+                # quantized weights answer differently
+                params.update(device="cpu", dtype=self.dtype)
+            return params
+        # AsyncChatRunner sends the same, so both share cached responses
+        return {"temperature": 0, "max_tokens": 4096}
+
+    def local_generation(self):
+        """Options passed to generate() of the local models."""
+        options = dict(LOCAL_GENERATION)
+        if self.greedy:
+            options["do_sample"] = False
+        return options
+
+    def _generate(self, prompt) -> str:
+        if self.model_name in ['qwen','phi4']:
+            return self._generate_local([prompt])[0]
         else:
-            if len(self.enc.encode(prompt)) > 12000:
-                return 'Max Token Length Exceeded.'
-            elif self.model_name == 'gpt-4o':
+            if self.model_name == 'gpt-4o':
                 response = openai.ChatCompletion.create(
                     model=self.model_name,
                     messages=[{"role": "user", "content": prompt}],
@@ -113,6 +155,73 @@ class Planner:
             else:
                 return self.llm([HumanMessage(content=prompt)]).content
 
+    def _generate_local(self, prompts) -> List[str]:
+        """One generate() call for a batch of prompts, responses in prompt order."""
+        start = time.perf_counter()
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.device)
+        # print(self.model.generation_config)
+        with torch.inference_mode():
+            output = self.model.generate(**inputs, **self.local_generation())
+        new_tokens = output[:, inputs["input_ids"].shape[1]:]
+        self.stats["generated_tokens"] += int((new_tokens != self.tokenizer.pad_token_id).sum())
+        self.stats["queries"] += len(prompts)
+        self.stats["seconds"] += time.perf_counter() - start
+
+        responses = []
+        for prompt, sequence in zip(prompts, output):
+            # padding is a special token, the text decodes as it would unbatched
+            generated_text = self.tokenizer.decode(sequence, skip_special_tokens=True)
+
+            response_start = generated_text.find(prompt)
+            if response_start != -1:
+                generated_text = generated_text[response_start + len(prompt):].strip()
+
+            responses.append(generated_text)
+        return responses
+
+    def throughput(self):
+        """Queries per minute and generated tokens per second of the local generation so far."""
+        seconds = self.stats["seconds"] or float("nan")
+        return {"queries_per_min": self.stats["queries"] / seconds * 60,
+                "tokens_per_s": self.stats["generated_tokens"] / seconds}
+
+    def run_batch(self, inputs, batch_size: int = 8) -> List[str]:
+        """
+        run() for many queries, local models generating batch_size prompts per generate() call.
+        Parameters:
+            inputs: List of (text, query, reference_info1, reference_info2, reference_info3).
+            batch_size: Prompts per batch; prompts are grouped by token length so a batch
+                pads little.
+        Returns:
+            Responses in input order.
+        """
+        if self.model_name not in ['qwen','phi4']:
+            return [self.run(*item) for item in inputs]
+
+        prompts = [self._build_agent_prompt(*item) for item in inputs]
+        params = self.generation_params()
+        keys = [cache_key(self.model_name, prompt, params) for prompt in prompts]
+        responses = [None] * len(prompts)
+        pending = []
+        for i, key in enumerate(keys):
+            if self.cache is not None:
+                responses[i] = self.cache.get(key)
+            if responses[i] is None:
+                pending.append(i)
+
+        if not pending:
+            return responses
+        # the fast tokenizer encodes the whole list at once; only the lengths are needed here
+        lengths = [len(ids) for ids in self.tokenizer([prompts[i] for i in pending])["input_ids"]]
+        pending = [i for _, i in sorted(zip(lengths, pending))]
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            for i, response in zip(batch, self._generate_local([prompts[i] for i in batch])):
+                responses[i] = response
+                if self.cache is not None:
+                    self.cache.put(keys[i], self.model_name, response)
+        return responses
+
     def _build_agent_prompt(self, text, query, reference_info1, reference_info2,reference_info3) -> str:
         return self.agent_prompt.format(text=text, query= query,reference_info1=reference_info1, reference_info2= reference_info2, reference_info3=reference_info3)
 
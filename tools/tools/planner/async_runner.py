@@ -0,0 +1,308 @@
+"""
+Concurrent chat-completions runner for the OpenAI planner models.
+
+    runner = AsyncChatRunner("gpt-4o", api_key, concurrency=16, rpm=500, tpm=150000)
+    results = runner.run(prompts, on_result=lambda i, content: ...)
+
+asyncio schedules the prompts: a semaphore bounds the requests in flight and a
+requests-per-minute and a tokens-per-minute bucket (charged with the prompt size
+before a request goes out, and with the completion size once it is answered) keep
+them under the account's rate limits. Failed requests (connection errors, bodies cut
+off or not in the chat-completions shape, HTTP 429 and 5xx) are retried with jittered
+exponential backoff, or after the server's Retry-After (seconds or an HTTP-date);
+other HTTP errors are not. A prompt that still fails gets None as result and its
+error in errors, the other prompts carry on; so do they when on_result raises (see
+callback_errors). The HTTP calls themselves run on a pooled requests session in
+worker threads, and so does on_result. Results come back in prompt order whatever
+order they finish in.
+
+``endpoint`` (or OPENAI_CHAT_ENDPOINT) can point at any server speaking the
+chat-completions JSON shape, e.g. standin_server.py for local testing.
+"""
+import asyncio
+import email.utils
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tools.planner.response_cache import cache_key
+
+DEFAULT_ENDPOINT = "https://api.openai.com/v1/chat/completions"
+
+# Prompts longer than this are answered without a request, as Planner.run does
+MAX_PROMPT_TOKENS = 12000
+MAX_TOKENS_EXCEEDED = 'Max Token Length Exceeded.'
+
+
+def retry_after_seconds(value):
+    """
+    Seconds to wait from a Retry-After header, given in seconds or as an HTTP-date.
+    None when the header is missing or unparsable, so the normal backoff applies.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when.tzinfo is None:
+        # RFC 7231 dates are GMT
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RequestFailed(Exception):
+    """An answer worth retrying: throttled, a server error or a malformed body."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RequestRejected(Exception):
+    """An answer retrying would not change: bad request, authentication."""
+
+
+class TokenBucket:
+    """
+    Refills at capacity per minute up to capacity. acquire() waits until the amount is
+    there; charge() takes tokens at once and may leave the bucket in debt, which later
+    acquire() calls wait out.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount):
+        # larger than the bucket: waiting for a full bucket is the best that can be done
+        amount = min(float(amount), self.capacity)
+        # the lock keeps waiters in arrival order, a big request is not starved by small ones
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def charge(self, amount):
+        self._refill()
+        self.tokens -= amount
+
+
+class AsyncChatRunner:
+    def __init__(self,
+                 model_name: str,
+                 api_key: str = "",
+                 endpoint: str = None,
+                 concurrency: int = 8,
+                 rpm: int = 500,
+                 tpm: int = 30000,
+                 temperature: float = 0,
+                 max_tokens: int = 4096,
+                 max_retries: int = 6,
+                 backoff_base: float = 1.0,
+                 backoff_cap: float = 60.0,
+                 timeout: float = 600.0,
+                 count_tokens=None,
+                 cache=None,
+                 ) -> None:
+        """
+        Parameters:
+            model_name: Model sent with every request.
+            concurrency: Requests in flight at most.
+            rpm, tpm: Requests and tokens per minute the buckets allow.
+            max_retries: Retries per prompt before it is given up (its result is None).
+            count_tokens: Function prompt -> token count, about 4 characters a token if None.
+            cache: Optional ResponseCache; cached prompts are answered without a request.
+        """
+        self.model_name = model_name
+        self.api_key = api_key
+        self.endpoint = endpoint or os.environ.get("OPENAI_CHAT_ENDPOINT", DEFAULT_ENDPOINT)
+        self.concurrency = concurrency
+        self.rpm = rpm
+        self.tpm = tpm
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self.count_tokens = count_tokens or (lambda text: (len(text) + 3) // 4)
+        self.cache = cache
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.stats = {"requests": 0, "retries": 0, "failures": 0,
+                      "prompt_tokens": 0, "completion_tokens": 0, "throttled_seconds": 0.0}
+        # index -> last error of the prompts given up
+        self.errors = {}
+        # index -> exception on_result raised for the prompt
+        self.callback_errors = {}
+
+    def _post(self, prompt):
+        """
+        One blocking request. Returns (content, usage); raises RequestFailed for answers worth
+        retrying, RequestRejected for the others and requests' exceptions for transport errors.
+        """
+        response = self.session.post(
+            self.endpoint,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json={"model": self.model_name, "messages": [{"role": "user", "content": prompt}],
+                  "temperature": self.temperature, "max_tokens": self.max_tokens},
+            timeout=self.timeout,
+        )
+        if response.status_code == 429 or response.status_code >= 500:
+            raise RequestFailed(f"HTTP {response.status_code}", retry_after_seconds(response.headers.get("Retry-After")))
+        if response.status_code != 200:
+            # bad request, authentication: retrying gives the same answer
+            raise RequestRejected(f"HTTP {response.status_code}: {response.text[:200]}")
+        try:
+            data = response.json()
+            content = data["choices"][0]["message"]["content"]
+            usage = data.get("usage") or {}
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+            # a proxy's error page or a half-written answer: the next try usually gets a proper one
+            raise RequestFailed(f"Malformed response ({e!r}): {response.text[:200]!r}")
+        if not isinstance(content, str):
+            raise RequestFailed(f"Malformed response: content is {content!r}")
+        return content, usage
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(self.backoff_cap, retry_after)
+        # "full jitter": uniform over [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def _give_up(self, index, error, attempts=None):
+        self.stats["failures"] += 1
+        self.errors[index] = error
+        after = f" after {attempts} attempts" if attempts is not None else ""
+        print(f"Prompt {index} failed{after}: {error!r}")
+
+    def _cache_get(self, key):
+        try:
+            return self.cache.get(key)
+        except sqlite3.Error as e:
+            # an unreadable cache costs a request, not the prompt
+            print(f"Response cache read failed: {e!r}")
+            return None
+
+    def _cache_put(self, key, content):
+        try:
+            self.cache.put(key, self.model_name, content)
+        except sqlite3.Error as e:
+            print(f"Response cache write failed: {e!r}")
+
+    async def _complete(self, index, prompt, semaphore, requests_bucket, tokens_bucket, executor):
+        prompt_tokens = self.count_tokens(prompt)
+        if prompt_tokens > MAX_PROMPT_TOKENS:
+            return MAX_TOKENS_EXCEEDED
+        if self.cache is not None:
+            # the parameters Planner.run uses for the same model, so both share entries
+            key = cache_key(self.model_name, prompt, {"temperature": self.temperature, "max_tokens": self.max_tokens})
+            content = self._cache_get(key)
+            if content is not None:
+                return content
+        loop = asyncio.get_running_loop()
+        error = None
+        for attempt in range(self.max_retries + 1):
+            async with semaphore:
+                started = time.monotonic()
+                await requests_bucket.acquire(1)
+                await tokens_bucket.acquire(prompt_tokens)
+                self.stats["throttled_seconds"] += time.monotonic() - started
+                self.stats["requests"] += 1
+                try:
+                    content, usage = await loop.run_in_executor(executor, self._post, prompt)
+                except RequestFailed as e:
+                    error, retry_after = e, e.retry_after
+                except (RequestRejected, ValueError) as e:
+                    # ValueError: requests' invalid URL and header errors, as final as a rejection
+                    error = e
+                    break
+                except requests.RequestException as e:
+                    # connection, timeout, SSL, a body cut off mid-transfer
+                    error, retry_after = e, None
+                else:
+                    tokens_bucket.charge(usage.get("completion_tokens", 0))
+                    self.stats["prompt_tokens"] += usage.get("prompt_tokens", prompt_tokens)
+                    self.stats["completion_tokens"] += usage.get("completion_tokens", 0)
+                    if self.cache is not None:
+                        self._cache_put(key, content)
+                    return content
+            if attempt < self.max_retries:
+                # backing off outside the semaphore leaves the slot to other prompts
+                self.stats["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+        self._give_up(index, error, attempt + 1)
+        return None
+
+    async def run_async(self, prompts, on_result=None):
+        """See run()."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        requests_bucket, tokens_bucket = TokenBucket(self.rpm), TokenBucket(self.tpm)
+        results = [None] * len(prompts)
+        # callbacks write files and fsync: they run in worker threads, one at a time
+        callback_lock = threading.Lock()
+
+        def call_back(index):
+            with callback_lock:
+                on_result(index, results[index])
+
+        async def complete(index, prompt):
+            try:
+                results[index] = await self._complete(index, prompt, semaphore, requests_bucket, tokens_bucket, executor)
+            except Exception as e:
+                # whatever went wrong is this prompt's failure, not the batch's
+                self._give_up(index, e)
+            if on_result is not None:
+                try:
+                    await asyncio.to_thread(call_back, index)
+                except Exception as e:
+                    self.callback_errors[index] = e
+                    print(f"on_result failed for prompt {index}: {e!r}")
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            outcomes = await asyncio.gather(*(complete(index, prompt) for index, prompt in enumerate(prompts)),
+                                            return_exceptions=True)
+        for index, outcome in enumerate(outcomes):
+            if isinstance(outcome, BaseException) and index not in self.errors:
+                self._give_up(index, outcome)
+        return results
+
+    def run(self, prompts, on_result=None):
+        """
+        Complete every prompt.
+        Parameters:
+            prompts: List of prompts.
+            on_result: Optional function (index, content) called as each prompt finishes,
+                e.g. to write its result file right away. It runs in a worker thread, off
+                the event loop, never in two threads at once.
+        Returns:
+            Contents in prompt order; None for prompts given up (see errors). Exceptions
+            on_result raises are collected in callback_errors, not raised.
+        """
+        return asyncio.run(self.run_async(prompts, on_result))
@@ -0,0 +1,143 @@
+import os
+import sys
+import argparse
+import queue
+import timeit
+import multiprocessing
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+# measured generation only, never answered from the response cache
+os.environ["TRIPTIDE_PLANNER_CACHE"] = "none"
+
+from tools.planner.apis import Planner
+from tools.planner import local_model
+from tools.sandbox.memory import peak_rss_mib
+
+
+def load_inputs(path, queries):
+    data = pd.read_csv(path).head(queries)
+    return [(row['annotation_plan'], row['disruption_info'], row['reference_information_1'],
+             row['reference_information_2'], row['reference_information_3'])
+            for row in data.to_dict(orient='records')]
+
+
+def report(name, planner):
+    throughput = planner.throughput()
+    print(f"{name:<16} {planner.stats['queries']:>5} queries  {planner.stats['seconds']:9.1f} s  "
+          f"{throughput['queries_per_min']:8.2f} queries/min  {throughput['tokens_per_s']:8.1f} tokens/s")
+
+
+def bench_batching(args):
+    """Local generation one prompt per generate() call (Planner.run) against run_batch()."""
+    inputs = load_inputs(args.csv_file, args.queries)
+    planner = Planner(model_name=args.model_name, device=args.device, dtype=args.dtype,
+                      threads=args.threads, model_path=args.model_path, greedy=True)
+
+    planner.stats = {"queries": 0, "generated_tokens": 0, "seconds": 0.0}
+    unbatched = [planner.run(*item) for item in inputs]
+    report("unbatched", planner)
+
+    for batch_size in args.batch_sizes:
+        planner.stats = {"queries": 0, "generated_tokens": 0, "seconds": 0.0}
+        batched = planner.run_batch(inputs, batch_size=batch_size)
+        report(f"batch_size {batch_size}", planner)
+        # greedy decoding; padding can still flip near-tied tokens, so report rather than assert
+        same = sum(a == b for a, b in zip(unbatched, batched))
+        print(f"{'':<16} {same}/{len(inputs)} responses identical to unbatched")
+
+
+def _measure_cpu(model_path, dtype, threads, interop_threads, prompt, new_tokens, repeat, results):
+    # bench_cpu spawns one process per dtype, earlier dtypes' weights never count toward this peak
+    import torch
+
+    baseline = peak_rss_mib()
+    start = timeit.default_timer()
+    tokenizer, model = local_model.load_local_model(model_path, device="cpu", dtype=dtype,
+                                                    threads=threads, interop_threads=interop_threads)
+    load_seconds = timeit.default_timer() - start
+    inputs = tokenizer([prompt], return_tensors="pt")
+    with torch.inference_mode():
+        # warm-up: first calls pick kernels and allocate
+        model.generate(**inputs, max_new_tokens=2, min_new_tokens=2, do_sample=False)
+        start = timeit.default_timer()
+        for _ in range(repeat):
+            output = model.generate(**inputs, max_new_tokens=new_tokens, min_new_tokens=new_tokens, do_sample=False)
+        seconds = timeit.default_timer() - start
+    text = tokenizer.decode(output[0, inputs["input_ids"].shape[1]:], skip_special_tokens=True)
+    rss = peak_rss_mib()
+    results.put((dtype, load_seconds, repeat * new_tokens / seconds, rss - baseline, rss,
+                 torch.get_num_threads(), torch.get_num_interop_threads(), text))
+
+
+def _wait_result(process, results):
+    """The child's result, None if it exits without one (e.g. it ran out of memory)."""
+    while True:
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            if not process.is_alive():
+                break
+    # it may have put its result right before exiting
+    try:
+        return results.get(timeout=1)
+    except queue.Empty:
+        return None
+
+
+def bench_cpu(args):
+    """Generation tokens/s and peak RSS of the CPU backend in fp32, bf16 and int8."""
+    prompt = args.prompt
+    if args.csv_file:
+        planner_prompt = load_inputs(args.csv_file, 1)[0]
+        prompt = "\n".join(str(part) for part in planner_prompt)[:args.prompt_chars]
+    context = multiprocessing.get_context("spawn")
+    for dtype in args.dtypes:
+        results = context.Queue()
+        process = context.Process(target=_measure_cpu, args=(args.model_path, dtype, args.threads, args.interop_threads,
+                                                             prompt, args.new_tokens, args.repeat, results))
+        process.start()
+        # drain the queue before join(): a child exits only once its result has been read
+        result = _wait_result(process, results)
+        process.join()
+        if result is None:
+            print(f"{dtype:<6} failed (exit code {process.exitcode})")
+            continue
+        dtype, load_seconds, tokens_per_s, rss_delta, rss, threads, interop_threads, text = result
+        print(f"{dtype:<6} load {load_seconds:6.1f} s   {tokens_per_s:8.1f} tokens/s   "
+              f"peak RSS +{rss_delta:7.0f} MiB ({rss:7.0f} MiB)   threads {threads}/{interop_threads}   "
+              f"{text[:40]!r}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    batching_parser = subparsers.add_parser("batching", help="Planner.run against run_batch for the local models")
+    batching_parser.add_argument("--csv_file", type=str, required=True, help="Path to the reference_info.csv file")
+    batching_parser.add_argument("--model_name", type=str, default="qwen", choices=["qwen", "phi4"])
+    batching_parser.add_argument("--queries", type=int, default=32)
+    batching_parser.add_argument("--batch_sizes", type=lambda s: [int(x) for x in s.split(",")], default=[4, 8, 16])
+    batching_parser.add_argument("--device", type=str, default="cuda", choices=list(local_model.DEVICES))
+    batching_parser.add_argument("--dtype", type=str, default=None, choices=list(local_model.CPU_DTYPES))
+    batching_parser.add_argument("--threads", type=int, default=None)
+    batching_parser.add_argument("--model_path", type=str, default=None, help="Other weights, e.g. a small test model")
+    batching_parser.set_defaults(func=bench_batching)
+
+    cpu_parser = subparsers.add_parser("cpu", help="CPU backend of the local models: fp32, bf16 and int8")
+    cpu_parser.add_argument("--model_path", type=str, required=True,
+                            help="Model id or directory, e.g. a small one such as Qwen/Qwen2.5-0.5B-Instruct")
+    cpu_parser.add_argument("--dtypes", type=lambda s: s.split(","), default=list(local_model.CPU_DTYPES))
+    cpu_parser.add_argument("--threads", type=int, default=None)
+    cpu_parser.add_argument("--interop_threads", type=int, default=None)
+    cpu_parser.add_argument("--prompt", type=str, default="Plan a three-day trip from Seattle to Denver.")
+    cpu_parser.add_argument("--csv_file", type=str, default=None, help="Use (the start of) the first query's planner inputs as prompt")
+    cpu_parser.add_argument("--prompt_chars", type=int, default=4000)
+    cpu_parser.add_argument("--new_tokens", type=int, default=64)
+    cpu_parser.add_argument("--repeat", type=int, default=3)
+    cpu_parser.set_defaults(func=bench_cpu)
+
+    args = parser.parse_args()
+    args.func(args)
@@ -1,19 +1,18 @@
-from tools.flights.apis import Flights
-from tools.accommodations.apis import Accommodations
-from tools.restaurants.apis import Restaurants
-from tools.googleDistanceMatrix.apis import GoogleDistanceMatrix
-from tools.attractions.apis import Attractions
+from tools.sandbox import database
+from tools.sandbox.registry import registry
 from evaluation.hard_constraint import extract_from_to,get_valid_name_city
 import math
 
 class ReactEnv:
     def __init__(self):
         
-        self.flight = Flights()
-        self.accommodation = Accommodations()
-        self.restaurants = Restaurants()
-        self.googleDistanceMatrix = GoogleDistanceMatrix()
-        self.attractions = Attractions()
+        # process-wide tools, loaded on first use and shared with the evaluation modules;
+        # flights are only looked up by number here, so they may come from the sqlite backend
+        self.flight = registry.proxy("flights", backend=database.backend())
+        self.accommodation = registry.proxy("accommodations")
+        self.restaurants = registry.proxy("restaurants")
+        self.googleDistanceMatrix = registry.proxy("googleDistanceMatrix")
+        self.attractions = registry.proxy("attractions")
     
     def run(self, tested_data):
 
@@ -29,7 +28,7 @@ class ReactEnv:
                 org_city, dest_city = extract_from_to(unit['current_city'])
             if 'flight number' in value.lower():
                     try:
-                        res = self.flight.data[self.flight.data['Flight Number'] == value.split('Flight Number: ')[1].split(',')[0]]
+                        res = self.flight.get_by_number(value.split('Flight Number: ')[1].split(',')[0])
                         if len(res) > 0:
                             total_cost += res['Price'].values[0] * people_number
                         else:
@@ -129,7 +128,7 @@ class ReactReflectEnv(ReactEnv):
             else:    
                 if 'flight number' in value.lower():
                         try:
-                            res = self.flight.data[self.flight.data['Flight Number'] == value.split('Flight Number: ')[1].split(',')[0]]
+                            res = self.flight.get_by_number(value.split('Flight Number: ')[1].split(',')[0])
                             if len(res) > 0:
                                 total_cost += res['Price'].values[0] * people_number
                             else:
@@ -0,0 +1,83 @@
+"""
+Loading the local planner models (qwen, phi4) for GPU or CPU inference.
+
+    tokenizer, model = load_local_model("Qwen/Qwen2.5-7B-Instruct", device="cpu", dtype="int8", threads=16)
+
+cuda: float16 weights spread over the GPUs (device_map="auto") with FlashAttention-2,
+as the planner has always loaded them.
+cpu: fp32 or bf16 weights, or int8 dynamic quantization of the linear layers (weights
+stored as int8, activations quantized on the fly), with PyTorch's SDPA attention and
+explicit intra-op / inter-op thread counts.
+"""
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+MODEL_PATHS = {
+    'qwen': "Qwen/Qwen2.5-7B-Instruct",
+    'phi4': "microsoft/Phi-4-mini-instruct",
+}
+
+DEVICES = ("cuda", "cpu")
+CPU_DTYPES = ("fp32", "bf16", "int8")
+
+
+def set_threads(threads=None, interop_threads=None):
+    """
+    Parameters:
+        threads: Intra-op threads (one matmul split over them), torch's default if None.
+        interop_threads: Inter-op threads (independent ops run side by side). torch only
+            takes this before its first parallel work, so set it before loading.
+    """
+    if interop_threads is not None:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            print(f"Inter-op threads already fixed at {torch.get_num_interop_threads()}, "
+                  f"{interop_threads} not applied.")
+    if threads is not None:
+        torch.set_num_threads(threads)
+
+
+def load_local_model(model_path, device="cuda", dtype=None, threads=None, interop_threads=None):
+    """
+    Parameters:
+        model_path: Hugging Face model id or directory.
+        device: One of DEVICES.
+        dtype: cpu only, one of CPU_DTYPES (fp32 by default).
+        threads, interop_threads: cpu only, see set_threads().
+    Returns:
+        (tokenizer, model), the model in eval mode.
+    """
+    if device not in DEVICES:
+        raise ValueError(f"device must be one of {', '.join(DEVICES)}")
+    if device == "cuda":
+        # cuda always loads float16 weights with torch's own threading, nothing to apply these to
+        unused = [name for name, value in (("dtype", dtype), ("threads", threads), ("interop_threads", interop_threads))
+                  if value is not None]
+        if unused:
+            raise ValueError(f"{', '.join(unused)} only apply to device='cpu'")
+    elif (dtype or "fp32") not in CPU_DTYPES:
+        raise ValueError(f"dtype must be one of {', '.join(CPU_DTYPES)}")
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    if device == "cuda":
+        model = AutoModelForCausalLM.from_pretrained(
+            model_path,
+            torch_dtype=torch.float16,
+            device_map="auto",
+            offload_folder="offload",  # Enables CPU offloading
+            attn_implementation="flash_attention_2"  # Speeds up inference
+        )
+        return tokenizer, model.eval()
+
+    dtype = dtype or "fp32"
+    set_threads(threads, interop_threads)
+    model = AutoModelForCausalLM.from_pretrained(
+        model_path,
+        torch_dtype=torch.bfloat16 if dtype == "bf16" else torch.float32,
+        attn_implementation="sdpa",
+        low_cpu_mem_usage=True,
+    ).eval()
+    if dtype == "int8":
+        # dynamic quantization works on fp32 modules; embeddings and norms stay fp32
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return tokenizer, model
@@ -0,0 +1,90 @@
+"""
+Completion manifest of a planner run, so an interrupted run can be resumed.
+
+One JSON file per output directory, model and strategy records for every query the
+hash of its input, the model, the strategy and whether it completed or failed. Every
+update replaces the file atomically, a crash leaves the previous version whole.
+
+    manifest = RunManifest(path, model_name, strategy)
+    pending = manifest.pending(digests) if resume else list(range(len(digests)))
+    ...
+    manifest.mark(number, digest, "completed")
+"""
+import contextlib
+import hashlib
+import json
+import os
+import time
+
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+def input_hash(*parts):
+    """Stable hash of the inputs a query's result depends on."""
+    text = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def write_json_atomic(path, data, **kwargs):
+    """Write JSON to a temporary file next to path, then move it over path."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, **kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        # open() itself may have failed, leaving nothing to remove
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+
+class RunManifest:
+    def __init__(self, path, model_name, strategy):
+        self.path = path
+        self.model_name = model_name
+        self.strategy = strategy
+        self.queries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                # JSON keys are strings, query numbers are ints
+                self.queries = {int(number): entry for number, entry in json.load(f)["queries"].items()}
+
+    def is_completed(self, number, digest):
+        """Whether query number completed with the same input, model and strategy."""
+        entry = self.queries.get(number)
+        return (entry is not None and entry["status"] == COMPLETED and entry["input_hash"] == digest
+                and entry["model"] == self.model_name and entry["strategy"] == self.strategy)
+
+    def pending(self, digests, has_result=None):
+        """
+        Parameters:
+            digests: input_hash of every query, by query number.
+            has_result: Optional function number -> whether the query's result is still stored.
+        Returns:
+            Numbers of the queries to run: not completed with the same input, or whose result is gone.
+        """
+        return [number for number, digest in enumerate(digests)
+                if not (self.is_completed(number, digest) and (has_result is None or has_result(number)))]
+
+    def mark(self, number, digest, status, error=None):
+        entry = {"input_hash": digest, "model": self.model_name, "strategy": self.strategy,
+                 "status": status, "updated": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        if error is not None:
+            entry["error"] = str(error)
+        self.queries[number] = entry
+        self.save()
+
+    def save(self):
+        write_json_atomic(self.path, {"model": self.model_name, "strategy": self.strategy,
+                                      "queries": {str(number): self.queries[number] for number in sorted(self.queries)}},
+                          indent=2)
+
+    def counts(self):
+        counts = {}
+        for entry in self.queries.values():
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return counts
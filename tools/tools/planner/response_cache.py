@@ -0,0 +1,167 @@
+"""
+On-disk cache of planner model responses, content-addressed by prompt, model and
+generation parameters.
+
+    cache = ResponseCache.from_env()
+    key = cache_key(model_name, prompt, {"temperature": 0, "max_tokens": 4096})
+    response = cache.get(key)
+    if response is None:
+        response = generate(prompt)
+        cache.put(key, model_name, response)
+
+Entries live in one SQLite file (TRIPTIDE_PLANNER_CACHE, "none" turns caching off),
+capped at max_bytes of responses (TRIPTIDE_PLANNER_CACHE_MB, 1024 by default): the
+least recently used entries are evicted first. Hits record their access time in
+memory and write it in batches (every FLUSH_EVERY hits, before evicting and on
+close), and the cache keeps a running total of its size rather than summing it on
+every put. The batch still pending is written at exit. With bypass=True
+(TRIPTIDE_PLANNER_CACHE_BYPASS=1) nothing is read from the cache, fresh responses
+still replace what it holds.
+"""
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "triptide", "planner_responses.sqlite")
+PATH_ENV = "TRIPTIDE_PLANNER_CACHE"
+BYPASS_ENV = "TRIPTIDE_PLANNER_CACHE_BYPASS"
+MAX_MB_ENV = "TRIPTIDE_PLANNER_CACHE_MB"
+DEFAULT_MAX_BYTES = 1 << 30
+# hits whose access times are written in one transaction
+FLUSH_EVERY = 256
+
+
+def cache_key(model_name, prompt, params):
+    """Hash of everything a response depends on: model, the full prompt and generation parameters."""
+    text = json.dumps([model_name, prompt, params], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, bypass=False):
+        """
+        Parameters:
+            path: SQLite file, created if missing.
+            max_bytes: Total size of the cached responses (UTF-8) kept at most.
+            bypass: Do not answer from the cache, only store.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=60)
+        # several runs may share the file, WAL lets them read while one writes
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, response TEXT, size INTEGER, created REAL, last_used REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.conn.commit()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        # key -> access time of hits not written yet; a crash only loses some LRU order
+        self.touched = {}
+        self.total_bytes = 0
+        self.data_version = None
+        self._sync_total()
+        # the planners never close their cache, the last hits are written on the way out
+        atexit.register(self.flush)
+
+    @classmethod
+    def from_env(cls):
+        """Cache configured by the environment variables above, None if TRIPTIDE_PLANNER_CACHE is 'none'."""
+        path = os.environ.get(PATH_ENV, DEFAULT_CACHE_PATH)
+        if path == "none":
+            return None
+        max_mb = os.environ.get(MAX_MB_ENV)
+        return cls(path, max_bytes=int(max_mb) << 20 if max_mb else DEFAULT_MAX_BYTES,
+                   bypass=os.environ.get(BYPASS_ENV, "") not in ("", "0"))
+
+    def get(self, key):
+        """Cached response for key, or None (always None when bypassing)."""
+        if self.bypass:
+            self.stats["misses"] += 1
+            return None
+        with self.lock:
+            row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self.touched[key] = time.time()
+            if len(self.touched) >= FLUSH_EVERY:
+                self._flush()
+                self.conn.commit()
+            self.stats["hits"] += 1
+        return row[0]
+
+    def put(self, key, model_name, response):
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self.lock:
+            self._sync_total()
+            self.touched.pop(key, None)
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                              (key, model_name, response, size, now, now))
+            self.total_bytes += size - (old[0] if old else 0)
+            self.stats["writes"] += 1
+            if self.total_bytes > self.max_bytes:
+                # the pending access times decide what is least recently used
+                self._flush()
+                self._evict()
+            self.conn.commit()
+
+    def _sync_total(self):
+        # data_version changes when another connection (another run) commits to the file
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self.data_version:
+            self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self.data_version = version
+
+    def _flush(self):
+        if self.touched:
+            self.conn.executemany("UPDATE responses SET last_used = ? WHERE key = ?",
+                                  [(used, key) for key, used in self.touched.items()])
+            self.touched.clear()
+
+    def _evict(self):
+        excess = self.total_bytes - self.max_bytes
+        # least recently used first, until enough bytes are freed
+        evicted = []
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if excess <= 0:
+                break
+            evicted.append((key,))
+            excess -= size
+            self.total_bytes -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self.stats["evictions"] += len(evicted)
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self):
+        with self.lock:
+            self.touched.clear()
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+            self.total_bytes = 0
+
+    def flush(self):
+        """Write the access times of the hits not written yet."""
+        with self.lock:
+            self._flush()
+            self.conn.commit()
+
+    def close(self):
+        self.flush()
+        atexit.unregister(self.flush)
+        self.conn.close()
@@ -13,7 +13,10 @@ import pandas as pd
 from tqdm import tqdm
 # from langchain.callbacks import get_openai_callback
 from langchain_community.callbacks.manager import get_openai_callback
-from tools.planner.apis import Planner
+from tools.planner.apis import Planner, OPENAI_API_KEY
+from tools.planner.async_runner import AsyncChatRunner
+from tools.planner import response_cache
+from tools.planner.manifest import RunManifest, input_hash, write_json_atomic, COMPLETED, FAILED
 import openai
 
 # Change the working directory if needed
@@ -40,6 +43,24 @@ def catch_openai_api_error():
     else:
         print("API error:", error)
 
+def result_path(output_dir, number):
+    return os.path.join(output_dir, f'gpt4o_orig_generated_plan_{number+1}.json')
+
+def load_result(output_dir, number):
+    # Load previous results if available
+    result_file = result_path(output_dir, number)
+    if os.path.exists(result_file):
+        with open(result_file, 'r') as f:
+            return json.load(f)
+    return [{}]
+
+def write_result(output_dir, number, key, planner_results):
+    result = load_result(output_dir, number)
+    result[-1][key] = planner_results
+
+    # Write to JSON file; replaced whole, a crash mid-write leaves the previous file
+    write_json_atomic(result_path(output_dir, number), result, indent=4)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--day", type=str, default="3day")
@@ -48,7 +69,24 @@ if __name__ == "__main__":
     parser.add_argument("--output_dir", type=str, default="./")
     parser.add_argument("--strategy", type=str, default="direct_og")
     parser.add_argument("--csv_file", type=str, required=True, help="Path to the reference_info.csv file")
+    parser.add_argument("--concurrency", type=int, default=8, help="OpenAI requests in flight at most")
+    parser.add_argument("--rpm", type=int, default=500, help="OpenAI requests per minute")
+    parser.add_argument("--tpm", type=int, default=30000, help="OpenAI tokens per minute")
+    parser.add_argument("--max_retries", type=int, default=6, help="Retries per query before it is given up")
+    parser.add_argument("--device", type=str, default="cuda", choices=["cuda", "cpu"], help="Where the local models run")
+    parser.add_argument("--dtype", type=str, default=None, choices=["fp32", "bf16", "int8"], help="Local model weights on cpu, fp32 by default")
+    parser.add_argument("--threads", type=int, default=None, help="Intra-op threads on cpu")
+    parser.add_argument("--interop_threads", type=int, default=None, help="Inter-op threads on cpu")
+    parser.add_argument("--model_path", type=str, default=None, help="Other weights for the local model")
+    parser.add_argument("--greedy", action="store_true", help="Local models decode greedily instead of sampling as their generation_config says")
+    parser.add_argument("--batch_size", type=int, default=1, help="Prompts per generate() call of the local models")
+    parser.add_argument("--resume", action="store_true", help="Skip queries the run manifest records as completed")
+    parser.add_argument("--cache_path", type=str, default=None, help="Response cache file, 'none' to turn caching off")
+    parser.add_argument("--cache_max_mb", type=int, default=None, help="Size cap of the response cache, 1024 by default")
+    parser.add_argument("--bypass_cache", action="store_true", help="Do not answer from the response cache, only refresh it")
     args = parser.parse_args()
+    if args.device != "cpu" and any(value is not None for value in (args.dtype, args.threads, args.interop_threads)):
+        parser.error("--dtype, --threads and --interop_threads only apply with --device cpu")
 
     # Load data from CSV
     data = load_csv_data(args.csv_file)
@@ -61,15 +99,91 @@ if __name__ == "__main__":
     # Prepare the dataset
     query_data_list = data.to_dict(orient='records')
 
+    # the planner opens its response cache from these
+    if args.cache_path is not None:
+        os.environ[response_cache.PATH_ENV] = args.cache_path
+    if args.cache_max_mb is not None:
+        os.environ[response_cache.MAX_MB_ENV] = str(args.cache_max_mb)
+    if args.bypass_cache:
+        os.environ[response_cache.BYPASS_ENV] = "1"
+
     # Define planner based on strategy
     if args.strategy == 'direct_og':
-        planner = Planner(model_name=args.model_name, agent_prompt=planner_agent_prompt_direct_og)
+        planner = Planner(model_name=args.model_name, agent_prompt=planner_agent_prompt_direct_og,
+                          device=args.device, dtype=args.dtype, threads=args.threads,
+                          interop_threads=args.interop_threads, model_path=args.model_path,
+                          greedy=args.greedy)
     #else args.strategy == 'direct_param':
      #   planner = Planner(model_name=args.model_name, agent_prompt=cot_planner_agent_prompt_param)
 
+    # Ensure the directory exists
+    output_dir = os.path.join(args.output_dir, args.set_type)
+    os.makedirs(output_dir, exist_ok=True)
+    result_key = f'{args.model_name}_{args.strategy}_sole-planning_results'
+
+    manifest = RunManifest(os.path.join(output_dir, f'manifest_{args.model_name}_{args.strategy}.json'),
+                           args.model_name, args.strategy)
+    digests = [input_hash(query_data, args.day) for query_data in query_data_list]
+    if args.resume:
+        # completed with the same input, and the result is still in its file
+        pending = manifest.pending(digests, lambda number: result_key in load_result(output_dir, number)[-1])
+        print(f"Resuming: {len(query_data_list) - len(pending)} queries completed, {len(pending)} to run.")
+    else:
+        pending = list(range(len(query_data_list)))
+
+    if args.strategy == 'direct_og' and args.model_name not in ['qwen', 'phi4']:
+        # OpenAI models: all queries concurrently, within the rate limits
+        runner = AsyncChatRunner(args.model_name, OPENAI_API_KEY, concurrency=args.concurrency,
+                                 rpm=args.rpm, tpm=args.tpm, max_retries=args.max_retries,
+                                 count_tokens=lambda prompt: len(planner.enc.encode(prompt)), cache=planner.cache)
+        prompts = [planner._build_agent_prompt(query_data_list[number]['annotation_plan'], query_data_list[number]['disruption_info'],
+                                               query_data_list[number]['reference_information_1'], query_data_list[number]['reference_information_2'],
+                                               query_data_list[number]['reference_information_3'])
+                   for number in pending]
+        progress = tqdm(total=len(prompts), desc="Processing data")
+
+        def on_result(index, planner_results):
+            number = pending[index]
+            progress.update()
+            if planner_results is not None:
+                write_result(output_dir, number, result_key, planner_results)
+                manifest.mark(number, digests[number], COMPLETED)
+            else:
+                manifest.mark(number, digests[number], FAILED, runner.errors.get(index))
+
+        runner.run(prompts, on_result=on_result)
+        progress.close()
+        print(runner.stats)
+        if planner.cache is not None:
+            print(f"Response cache: {planner.cache.stats}")
+        if runner.errors:
+            print(f"{len(runner.errors)} queries failed: {sorted(pending[index] + 1 for index in runner.errors)}; rerun with --resume to retry them.")
+        if runner.callback_errors:
+            print(f"{len(runner.callback_errors)} results could not be written: "
+                  f"{sorted(pending[index] + 1 for index in runner.callback_errors)}; rerun with --resume to redo them.")
+        sys.exit(0)
+
+    if args.strategy == 'direct_og' and args.model_name in ['qwen', 'phi4'] and args.batch_size > 1:
+        # local models: batches of similar-length prompts, results written chunk by chunk
+        chunk_size = args.batch_size * 8
+        for start in tqdm(range(0, len(pending), chunk_size), desc="Processing data"):
+            chunk = pending[start:start + chunk_size]
+            inputs = [(query_data_list[number]['annotation_plan'], query_data_list[number]['disruption_info'],
+                       query_data_list[number]['reference_information_1'], query_data_list[number]['reference_information_2'],
+                       query_data_list[number]['reference_information_3'])
+                      for number in chunk]
+            for number, planner_results in zip(chunk, planner.run_batch(inputs, batch_size=args.batch_size)):
+                write_result(output_dir, number, result_key, planner_results)
+                manifest.mark(number, digests[number], COMPLETED)
+        print(planner.stats, planner.throughput())
+        if planner.cache is not None:
+            print(f"Response cache: {planner.cache.stats}")
+        sys.exit(0)
+
     # Iterate over data and generate results
     with get_openai_callback() as cb:
-        for number, query_data in enumerate(tqdm(query_data_list, desc="Processing data")):
+        for number in tqdm(pending, desc="Processing data"):
+            query_data = query_data_list[number]
             if args.day == '3day':
                 reference_information = query_data['reference_information']
             elif args.day == '5day':
@@ -86,31 +200,17 @@ if __name__ == "__main__":
                     planner_results, scratchpad = planner.run(reference_information,query_data['annotation_plan'], query_data['disruption_info'])
                 else:
                     planner_results = planner.run(query_data['annotation_plan'], query_data['disruption_info'],query_data['reference_information_1'],query_data['reference_information_2'],query_data['reference_information_3'])
-                    time.sleep(8)
                 if planner_results is not None:
                     break
             print(planner_results)
 
-            # Ensure the directory exists
-            output_dir = os.path.join(args.output_dir, args.set_type)
-            os.makedirs(output_dir, exist_ok=True)
-
-            # Load previous results if available
-            result_file = os.path.join(output_dir, f'gpt4o_orig_generated_plan_{number+1}.json')
-            if os.path.exists(result_file):
-                with open(result_file, 'r') as f:
-                    result = json.load(f)
-            else:
-                result = [{}]
-
             # Store the new results
             # if args.strategy in ['react', 'reflexion']:
             #     result[-1][f'{args.model_name}_{args.strategy}_sole-planning_results_logs'] = scratchpad
-            
-            result[-1][f'{args.model_name}_{args.strategy}_sole-planning_results'] = planner_results
 
-            # Write to JSON file
-            with open(result_file, 'w') as f:
-                json.dump(result, f, indent=4)
+            write_result(output_dir, number, result_key, planner_results)
+            manifest.mark(number, digests[number], COMPLETED)
 
         print(cb)
+        if planner.cache is not None:
+            print(f"Response cache: {planner.cache.stats}")
@@ -0,0 +1,136 @@
+"""
+Local stand-in for the chat-completions API, for exercising AsyncChatRunner without a key.
+
+    python standin_server.py --port 8766 --delay 0.5 --fail-every 5
+    export OPENAI_CHAT_ENDPOINT=http://127.0.0.1:8766/v1/chat/completions
+
+The answer to a prompt is derived from its hash, so answers are stable across runs.
+Every n-th request gets HTTP 429 with a Retry-After header (--fail-every); other
+options answer every n-th request with HTTP 500, a body that is not JSON, JSON
+without choices, or a body cut off by closing the connection. The server counts
+the requests it has in flight at once (max_in_flight).
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_answer(prompt):
+    digest = hashlib.md5(prompt.encode("utf-8")).hexdigest()
+    return f"Plan {digest[:12]}"
+
+
+class StandInServer(ThreadingHTTPServer):
+    # many clients connect at once, the default backlog of 5 resets some of them
+    request_queue_size = 128
+
+    def __init__(self, address, delay=0.0, fail_every=0, retry_after=1,
+                 error_every=0, malformed_every=0, no_choices_every=0, cut_every=0):
+        """
+        Parameters:
+            delay: Seconds every answer takes.
+            fail_every: Answer every n-th request with HTTP 429 and Retry-After: retry_after (never if 0).
+            error_every: Answer every n-th request with HTTP 500.
+            malformed_every: Answer every n-th request with a 200 whose body is not JSON.
+            no_choices_every: Answer every n-th request with a 200 JSON body without choices.
+            cut_every: Close the connection halfway through every n-th answer.
+        """
+        super().__init__(address, ChatCompletionsHandler)
+        self.delay = delay
+        self.fail_every = fail_every
+        self.retry_after = retry_after
+        self.error_every = error_every
+        self.malformed_every = malformed_every
+        self.no_choices_every = no_choices_every
+        self.cut_every = cut_every
+        self.request_count = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+
+def _every(every, count):
+    return every and count % every == 0
+
+
+class ChatCompletionsHandler(BaseHTTPRequestHandler):
+    def _send(self, status, body=None, headers=(), payload=None, cut=False):
+        if payload is None:
+            payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if cut:
+            # promised the whole body, sends half of it and hangs up
+            self.wfile.write(payload[:len(payload) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        with self.server.lock:
+            self.server.request_count += 1
+            count = self.server.request_count
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+        try:
+            server = self.server
+            time.sleep(server.delay)
+            if _every(server.fail_every, count):
+                self._send(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                           [("Retry-After", str(server.retry_after))])
+                return
+            if _every(server.error_every, count):
+                self._send(500, {"error": {"message": "The server had an error", "type": "server_error"}})
+                return
+            if _every(server.malformed_every, count):
+                self._send(200, payload=b"<html>Bad gateway</html>")
+                return
+            if _every(server.no_choices_every, count):
+                self._send(200, {"id": f"chatcmpl-{count}", "object": "chat.completion"})
+                return
+            prompt = request["messages"][-1]["content"]
+            answer = fake_answer(prompt)
+            self._send(200, cut=_every(server.cut_every, count), body={
+                "id": f"chatcmpl-{count}",
+                "object": "chat.completion",
+                "model": request.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(answer) // 4,
+                          "total_tokens": len(prompt) // 4 + len(answer) // 4},
+            })
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds every answer takes")
+    parser.add_argument("--fail-every", type=int, default=0, help="Answer every n-th request with HTTP 429")
+    parser.add_argument("--error-every", type=int, default=0, help="Answer every n-th request with HTTP 500")
+    parser.add_argument("--malformed-every", type=int, default=0, help="Answer every n-th request with a non-JSON body")
+    parser.add_argument("--no-choices-every", type=int, default=0, help="Answer every n-th request without choices")
+    parser.add_argument("--cut-every", type=int, default=0, help="Cut every n-th answer off halfway")
+    args = parser.parse_args()
+
+    server = StandInServer((args.host, args.port), delay=args.delay, fail_every=args.fail_every,
+                           error_every=args.error_every, malformed_every=args.malformed_every,
+                           no_choices_every=args.no_choices_every, cut_every=args.cut_every)
+    print(f"Chat-completions stand-in on http://{args.host}:{args.port}/v1/chat/completions")
+    server.serve_forever()
@@ -0,0 +1,145 @@
+import email.utils
+import threading
+import time
+
+import pytest
+
+from tools.planner.async_runner import AsyncChatRunner, RequestFailed, RequestRejected, retry_after_seconds
+from tools.planner.response_cache import ResponseCache
+from tools.planner.standin_server import StandInServer, fake_answer
+
+PATH = "/v1/chat/completions"
+PROMPTS = [f"Plan a trip number {i}" for i in range(24)]
+
+
+@pytest.fixture
+def start_server():
+    servers = []
+
+    def start(**options):
+        options.setdefault("retry_after", 0)
+        server = StandInServer(("127.0.0.1", 0), **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}{PATH}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def runner(endpoint, **options):
+    options.setdefault("backoff_base", 0.001)
+    options.setdefault("rpm", 100000)
+    options.setdefault("tpm", 10000000)
+    return AsyncChatRunner("gpt-4o", endpoint=endpoint, **options)
+
+
+@pytest.mark.parametrize("mode", ["fail_every", "error_every", "malformed_every", "no_choices_every", "cut_every"])
+def test_retries_bad_answers(start_server, mode):
+    server, endpoint = start_server(**{mode: 2})
+    chat = runner(endpoint, concurrency=4)
+    results = chat.run(PROMPTS)
+    assert results == [fake_answer(prompt) for prompt in PROMPTS]
+    assert chat.errors == {}
+    assert chat.stats["retries"] > 0
+    assert chat.stats["requests"] == server.request_count == len(PROMPTS) + chat.stats["retries"]
+
+
+def test_mixed_failures_keep_prompt_order(start_server):
+    server, endpoint = start_server(delay=0.01, fail_every=3, error_every=5, malformed_every=7,
+                                    no_choices_every=11, cut_every=13)
+    chat = runner(endpoint, concurrency=8, max_retries=20)
+    finished = []
+    results = chat.run(PROMPTS, on_result=lambda index, content: finished.append((index, content)))
+    assert results == [fake_answer(prompt) for prompt in PROMPTS]
+    assert sorted(finished) == list(enumerate(results))
+    assert server.max_in_flight <= 8
+
+
+def test_gives_up_after_retries(start_server):
+    server, endpoint = start_server(error_every=1)
+    chat = runner(endpoint, max_retries=2)
+    finished = []
+    results = chat.run(PROMPTS[:3], on_result=lambda index, content: finished.append((index, content)))
+    assert results == [None] * 3
+    assert sorted(finished) == [(0, None), (1, None), (2, None)]
+    assert all(isinstance(error, RequestFailed) for error in chat.errors.values())
+    assert sorted(chat.errors) == [0, 1, 2]
+    assert server.request_count == 3 * 3
+    assert chat.stats["failures"] == 3
+
+
+def test_retry_after_as_http_date(start_server):
+    # a date already past: retry at once rather than give the prompt up
+    server, endpoint = start_server(fail_every=2, retry_after=email.utils.formatdate(time.time() - 60, usegmt=True))
+    chat = runner(endpoint, concurrency=4)
+    assert chat.run(PROMPTS) == [fake_answer(prompt) for prompt in PROMPTS]
+    assert chat.errors == {}
+    assert chat.stats["retries"] > 0
+
+    assert 25 <= retry_after_seconds(email.utils.formatdate(time.time() + 30, usegmt=True)) <= 30
+    assert retry_after_seconds("7") == 7.0
+    assert retry_after_seconds("soon") is None
+    assert retry_after_seconds(None) is None
+
+
+def test_rejected_requests_are_not_retried(start_server):
+    server, endpoint = start_server()
+    chat = runner(endpoint.replace(PATH, "/v1/unknown"))
+    assert chat.run(PROMPTS[:3]) == [None] * 3
+    assert all(isinstance(error, RequestRejected) for error in chat.errors.values())
+    assert chat.stats["requests"] == 3
+    assert chat.stats["retries"] == 0
+
+
+def test_one_prompt_failing_leaves_the_others(start_server):
+    server, endpoint = start_server()
+
+    def count_tokens(prompt):
+        if prompt == PROMPTS[1]:
+            raise KeyError("no tokenizer for this prompt")
+        return len(prompt) // 4
+
+    def on_result(index, content):
+        finished.append(index)
+        if index == 2:
+            raise OSError("disk full")
+
+    finished = []
+    chat = runner(endpoint, count_tokens=count_tokens)
+    results = chat.run(PROMPTS, on_result=on_result)
+    assert results[1] is None
+    assert results[:1] + results[2:] == [fake_answer(prompt) for prompt in PROMPTS[:1] + PROMPTS[2:]]
+    assert sorted(finished) == list(range(len(PROMPTS)))
+    assert list(chat.errors) == [1] and isinstance(chat.errors[1], KeyError)
+    assert list(chat.callback_errors) == [2] and isinstance(chat.callback_errors[2], OSError)
+
+
+def test_callbacks_run_off_the_loop_one_at_a_time(start_server):
+    server, endpoint = start_server(delay=0.01)
+    loop_thread = threading.get_ident()
+    threads, running, overlaps = set(), [], []
+
+    def on_result(index, content):
+        threads.add(threading.get_ident())
+        running.append(index)
+        overlaps.append(len(running))
+        time.sleep(0.002)
+        running.remove(index)
+
+    results = runner(endpoint, concurrency=8).run(PROMPTS, on_result=on_result)
+    assert results == [fake_answer(prompt) for prompt in PROMPTS]
+    assert loop_thread not in threads
+    assert max(overlaps) == 1 and len(overlaps) == len(PROMPTS)
+
+
+def test_cached_prompts_skip_requests(start_server, tmp_path):
+    server, endpoint = start_server()
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    first = runner(endpoint, cache=cache).run(PROMPTS)
+    requests_made = server.request_count
+    assert runner(endpoint, cache=cache).run(PROMPTS) == first
+    assert server.request_count == requests_made == len(PROMPTS)
+    cache.close()
@@ -0,0 +1,125 @@
+import os
+
+import pytest
+
+# Planner imports the whole local and OpenAI stack at module level
+for module in ("torch", "transformers", "langchain", "langchain_community", "openai", "tiktoken"):
+    pytest.importorskip(module)
+
+import torch
+from transformers import BatchEncoding, GenerationConfig
+
+from tools.planner.response_cache import ResponseCache
+
+PROMPT = "{text} | {query} | {reference_info1} | {reference_info2} | {reference_info3}"
+
+
+class WordTokenizer:
+    """Tokens are words; run_batch only needs the lengths."""
+    padding_side = "right"
+    pad_token = None
+    eos_token = "</s>"
+
+    def __call__(self, prompts, **kwargs):
+        return {"input_ids": [prompt.split() for prompt in prompts]}
+
+
+@pytest.fixture
+def planner(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", os.environ.get("OPENAI_API_KEY", "test"))
+    monkeypatch.syspath_prepend(os.path.dirname(os.path.abspath(__file__)))
+    from tools.planner import apis
+
+    # no weights and no tiktoken download: the local models never count tokens with it
+    monkeypatch.setattr(apis, "load_local_model", lambda *args, **kwargs: (WordTokenizer(), None))
+    monkeypatch.setattr(apis.tiktoken, "encoding_for_model", lambda model: None)
+    planner = apis.Planner(agent_prompt=PROMPT, model_name="qwen", device="cpu",
+                           cache=ResponseCache(str(tmp_path / "responses.sqlite")))
+    planner.batches = []
+
+    def generate(prompts):
+        planner.batches.append(list(prompts))
+        return [f"plan for {prompt}" for prompt in prompts]
+
+    planner.real_generate_local = planner._generate_local
+    planner._generate_local = generate
+    yield planner
+    planner.cache.close()
+
+
+def make_inputs(count):
+    return [(f"day {i}", "word " * (i * 7 % 11), "a", "b", f"ref {i}") for i in range(count)]
+
+
+def test_run_batch_buckets_by_length_and_keeps_order(planner):
+    inputs = make_inputs(19)
+    responses = planner.run_batch(inputs, batch_size=4)
+    prompts = [planner._build_agent_prompt(*item) for item in inputs]
+    assert responses == [f"plan for {prompt}" for prompt in prompts]
+    assert [len(batch) for batch in planner.batches] == [4, 4, 4, 4, 3]
+    lengths = [[len(prompt.split()) for prompt in batch] for batch in planner.batches]
+    assert all(max(batch) <= min(following) for batch, following in zip(lengths, lengths[1:]))
+
+
+def test_run_batch_answers_cached_prompts_without_generating(planner):
+    inputs = make_inputs(10)
+    first = planner.run(*inputs[3])
+    planner.batches.clear()
+    responses = planner.run_batch(inputs, batch_size=8)
+    assert responses[3] == first
+    assert sum(len(batch) for batch in planner.batches) == 9
+    planner.batches.clear()
+    assert planner.run_batch(inputs, batch_size=8) == responses
+    assert planner.batches == []
+
+
+class TensorTokenizer(WordTokenizer):
+    """Every word is token 1, padding is 0; decode gives back the words."""
+    pad_token_id = 0
+
+    def __call__(self, prompts, **kwargs):
+        width = max(len(prompt.split()) for prompt in prompts)
+        ids = [[0] * (width - len(prompt.split())) + [1] * len(prompt.split()) for prompt in prompts]
+        return BatchEncoding({"input_ids": torch.tensor(ids)})
+
+    def decode(self, sequence, skip_special_tokens=True):
+        return " ".join("word" for token in sequence.tolist() if token)
+
+
+class RecordingModel:
+    """generate() appends two tokens and records the options it was called with."""
+
+    def __init__(self):
+        self.calls = []
+        self.generation_config = GenerationConfig(do_sample=True, temperature=0.7, top_p=0.8)
+
+    def generate(self, input_ids, **kwargs):
+        self.calls.append(kwargs)
+        return torch.cat([input_ids, torch.ones((len(input_ids), 2), dtype=input_ids.dtype)], dim=1)
+
+
+def test_generation_follows_model_config_and_cache_key(planner):
+    from tools.planner.apis import LOCAL_GENERATION
+    planner.tokenizer, planner.model = TensorTokenizer(), RecordingModel()
+    prompts = [planner._build_agent_prompt(*item) for item in make_inputs(3)]
+    assert len(planner.real_generate_local(prompts)) == 3
+    # nothing overrides the sampling defaults of the model's generation_config
+    assert planner.model.calls == [LOCAL_GENERATION]
+    assert "do_sample" not in LOCAL_GENERATION
+    assert planner.stats["generated_tokens"] == 6
+
+    params = planner.generation_params()
+    assert params["max_new_tokens"] == LOCAL_GENERATION["max_new_tokens"]
+    assert params["generation_config"]["temperature"] == 0.7
+    planner.model.generation_config.temperature = 0.2
+    assert planner.generation_params() != params
+
+
+def test_greedy_is_opt_in(planner):
+    planner.tokenizer, planner.model = TensorTokenizer(), RecordingModel()
+    sampled = planner.generation_params()
+    planner.greedy = True
+    planner.real_generate_local([planner._build_agent_prompt(*make_inputs(1)[0])])
+    assert planner.model.calls[-1]["do_sample"] is False
+    assert planner.generation_params()["do_sample"] is False
+    assert planner.generation_params() != sampled
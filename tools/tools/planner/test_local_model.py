@@ -0,0 +1,106 @@
+import importlib.util
+import os
+import sys
+import types
+
+import pytest
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "local_model.py")
+
+
+class FakeModel:
+    def __init__(self, path, **kwargs):
+        self.path, self.kwargs, self.evaluated = path, kwargs, False
+
+    def eval(self):
+        self.evaluated = True
+        return self
+
+
+@pytest.fixture
+def local_model(monkeypatch):
+    """local_model.py loaded against stand-ins for torch and transformers; calls records what reached them."""
+    calls = []
+    torch = types.ModuleType("torch")
+    torch.float16, torch.bfloat16, torch.float32, torch.qint8 = "float16", "bfloat16", "float32", "qint8"
+    torch.nn = types.SimpleNamespace(Linear="Linear")
+    torch.interop_threads = None
+
+    def set_num_interop_threads(count):
+        # torch refuses once its thread pools exist
+        if torch.interop_threads is not None:
+            raise RuntimeError("cannot set number of interop threads after parallel work has started")
+        torch.interop_threads = count
+        calls.append(("interop_threads", count))
+
+    def quantize_dynamic(model, layers, dtype):
+        calls.append(("quantize_dynamic", layers, dtype))
+        return ("quantized", model)
+
+    torch.set_num_interop_threads = set_num_interop_threads
+    torch.get_num_interop_threads = lambda: torch.interop_threads
+    torch.set_num_threads = lambda count: calls.append(("threads", count))
+    torch.ao = types.SimpleNamespace(quantization=types.SimpleNamespace(quantize_dynamic=quantize_dynamic))
+
+    transformers = types.ModuleType("transformers")
+    transformers.AutoTokenizer = types.SimpleNamespace(
+        from_pretrained=lambda path: calls.append(("tokenizer", path)) or "tokenizer")
+    transformers.AutoModelForCausalLM = types.SimpleNamespace(
+        from_pretrained=lambda path, **kwargs: calls.append(("model", path)) or FakeModel(path, **kwargs))
+
+    monkeypatch.setitem(sys.modules, "torch", torch)
+    monkeypatch.setitem(sys.modules, "transformers", transformers)
+    spec = importlib.util.spec_from_file_location("local_model_under_test", PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.calls = calls
+    return module
+
+
+@pytest.mark.parametrize("options", [
+    {"device": "tpu"},
+    {"device": "cpu", "dtype": "fp16"},
+    {"device": "cuda", "dtype": "int8"},
+    {"device": "cuda", "dtype": "fp32"},
+    {"device": "cuda", "threads": 4},
+    {"device": "cuda", "interop_threads": 2},
+])
+def test_rejects_options_before_loading(local_model, options):
+    with pytest.raises(ValueError):
+        local_model.load_local_model("some/model", **options)
+    assert local_model.calls == []
+
+
+def test_cuda_loads_float16(local_model):
+    tokenizer, model = local_model.load_local_model("some/model")
+    assert tokenizer == "tokenizer" and model.evaluated
+    assert model.kwargs["torch_dtype"] == "float16"
+    assert model.kwargs["device_map"] == "auto"
+    assert model.kwargs["attn_implementation"] == "flash_attention_2"
+    assert not any(call[0] in ("threads", "interop_threads") for call in local_model.calls)
+
+
+@pytest.mark.parametrize("dtype, torch_dtype", [(None, "float32"), ("fp32", "float32"), ("bf16", "bfloat16")])
+def test_cpu_dtypes_and_threads(local_model, dtype, torch_dtype):
+    tokenizer, model = local_model.load_local_model("some/model", device="cpu", dtype=dtype, threads=8, interop_threads=2)
+    assert model.evaluated
+    assert model.kwargs == {"torch_dtype": torch_dtype, "attn_implementation": "sdpa", "low_cpu_mem_usage": True}
+    # the threads are set before the weights load
+    assert local_model.calls == [("tokenizer", "some/model"), ("interop_threads", 2), ("threads", 8),
+                                 ("model", "some/model")]
+
+
+def test_cpu_int8_quantizes_linear_layers(local_model):
+    _, model = local_model.load_local_model("some/model", device="cpu", dtype="int8")
+    kind, quantized = model
+    assert kind == "quantized"
+    # dynamic quantization starts from fp32 weights in eval mode
+    assert quantized.kwargs["torch_dtype"] == "float32" and quantized.evaluated
+    assert local_model.calls[-1] == ("quantize_dynamic", {"Linear"}, "qint8")
+
+
+def test_interop_threads_fixed_after_first_use(local_model, capsys):
+    local_model.set_threads(interop_threads=2)
+    local_model.set_threads(threads=4, interop_threads=6)
+    assert "already fixed at 2, 6 not applied" in capsys.readouterr().out
+    assert local_model.calls == [("interop_threads", 2), ("threads", 4)]
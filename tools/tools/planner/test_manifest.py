@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+
+import pytest
+
+from tools.planner.async_runner import AsyncChatRunner
+from tools.planner.manifest import COMPLETED, FAILED, RunManifest, input_hash, write_json_atomic
+from tools.planner.standin_server import StandInServer, fake_answer
+
+QUERIES = [{"annotation_plan": f"plan {i}", "disruption_info": f"disruption {i}"} for i in range(12)]
+
+
+def run_queries(manifest, numbers, digests, endpoint, results, max_retries=6):
+    """What sole_planning_mltp.py does for the OpenAI models, results kept in a dict."""
+    runner = AsyncChatRunner("gpt-4o", endpoint=endpoint, rpm=100000, tpm=10000000,
+                             max_retries=max_retries, backoff_base=0.001)
+
+    def on_result(index, content):
+        number = numbers[index]
+        if content is not None:
+            results[number] = content
+            manifest.mark(number, digests[number], COMPLETED)
+        else:
+            manifest.mark(number, digests[number], FAILED, runner.errors.get(index))
+
+    runner.run([json.dumps(QUERIES[number]) for number in numbers], on_result=on_result)
+    return runner
+
+
+def test_resume_runs_only_unfinished_queries(tmp_path):
+    server = StandInServer(("127.0.0.1", 0), retry_after=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    path = str(tmp_path / "manifest_gpt4o_direct_og.json")
+    digests = [input_hash(query, "3day") for query in QUERIES]
+    results = {}
+    try:
+        # first run: every other request fails and is not retried, the process dies after 8 queries
+        server.error_every = 2
+        run_queries(RunManifest(path, "gpt4o", "direct_og"), list(range(8)), digests, endpoint, results, max_retries=0)
+        manifest = RunManifest(path, "gpt4o", "direct_og")
+        assert manifest.counts() == {COMPLETED: 4, FAILED: 4}
+        failed = [number for number, entry in manifest.queries.items() if entry["status"] == FAILED]
+        assert all("HTTP 500" in manifest.queries[number]["error"] for number in failed)
+
+        # one completed query's result went missing in the meantime
+        lost = min(results)
+        del results[lost]
+        pending = manifest.pending(digests, lambda number: number in results)
+        assert pending == sorted(failed + [lost] + list(range(8, 12)))
+
+        server.error_every = 0
+        requests_before = server.request_count
+        run_queries(manifest, pending, digests, endpoint, results)
+        assert server.request_count - requests_before == len(pending)
+        assert results == {number: fake_answer(json.dumps(query)) for number, query in enumerate(QUERIES)}
+
+        resumed = RunManifest(path, "gpt4o", "direct_og")
+        assert resumed.counts() == {COMPLETED: len(QUERIES)}
+        assert resumed.pending(digests, lambda number: number in results) == []
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_changed_input_model_or_strategy_reruns(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    digests = [input_hash(query, "3day") for query in QUERIES[:3]]
+    manifest = RunManifest(path, "gpt4o", "direct_og")
+    for number, digest in enumerate(digests):
+        manifest.mark(number, digest, COMPLETED)
+
+    assert RunManifest(path, "gpt4o", "direct_og").pending(digests) == []
+    changed = [digests[0], input_hash(QUERIES[1], "5day"), digests[2]]
+    assert RunManifest(path, "gpt4o", "direct_og").pending(changed) == [1]
+    assert RunManifest(path, "gpt4o-mini", "direct_og").pending(digests) == [0, 1, 2]
+    assert RunManifest(path, "gpt4o", "react").pending(digests) == [0, 1, 2]
+
+
+def test_atomic_write_leaves_previous_file_on_failure(tmp_path):
+    path = str(tmp_path / "result.json")
+    write_json_atomic(path, [{"plan": 1}])
+    with pytest.raises(TypeError):
+        write_json_atomic(path, [{"plan": object()}])
+    with open(path) as f:
+        assert json.load(f) == [{"plan": 1}]
+    assert os.listdir(str(tmp_path)) == ["result.json"]
+    assert RunManifest(str(tmp_path / "missing.json"), "gpt4o", "direct_og").queries == {}
+    assert not os.path.exists(str(tmp_path / "missing.json"))
+
+
+def test_atomic_write_reports_open_failures(tmp_path, monkeypatch):
+    def refuse(*args, **kwargs):
+        raise PermissionError("read-only output directory")
+
+    # the temporary file never exists, its cleanup must not hide why
+    monkeypatch.setattr("builtins.open", refuse)
+    with pytest.raises(PermissionError):
+        write_json_atomic(str(tmp_path / "result.json"), [{"plan": 1}])
@@ -0,0 +1,106 @@
+import sqlite3
+import time
+
+import pytest
+
+from tools.planner import response_cache
+from tools.planner.response_cache import ResponseCache, cache_key
+
+
+@pytest.fixture
+def open_cache(tmp_path):
+    caches = []
+
+    def open_(**options):
+        cache = ResponseCache(str(tmp_path / "responses.sqlite"), **options)
+        caches.append(cache)
+        return cache
+
+    yield open_
+    for cache in caches:
+        cache.close()
+
+
+def last_used(cache, key):
+    # what another process reading the file sees
+    with sqlite3.connect(cache.path) as conn:
+        return conn.execute("SELECT last_used FROM responses WHERE key = ?", (key,)).fetchone()[0]
+
+
+def stored_bytes(cache):
+    with sqlite3.connect(cache.path) as conn:
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+
+def test_key_covers_model_prompt_and_params():
+    key = cache_key("gpt-4o", "prompt", {"temperature": 0})
+    assert key == cache_key("gpt-4o", "prompt", {"temperature": 0})
+    assert key != cache_key("gpt-4o-mini", "prompt", {"temperature": 0})
+    assert key != cache_key("gpt-4o", "prompt ", {"temperature": 0})
+    assert key != cache_key("gpt-4o", "prompt", {"temperature": 1})
+
+
+def test_hits_write_access_times_in_batches(open_cache, monkeypatch):
+    monkeypatch.setattr(response_cache, "FLUSH_EVERY", 3)
+    cache = open_cache()
+    for key in "abc":
+        cache.put(key, "gpt-4o", f"response {key}")
+    written = {key: last_used(cache, key) for key in "abc"}
+    time.sleep(0.01)
+
+    assert cache.get("a") == "response a" and cache.get("b") == "response b"
+    assert {key: last_used(cache, key) for key in "ab"} == {key: written[key] for key in "ab"}
+    cache.get("c")
+    assert all(last_used(cache, key) > written[key] for key in "abc")
+    assert cache.touched == {}
+
+    cache.get("a")
+    cache.flush()
+    assert last_used(cache, "a") == pytest.approx(cache.conn.execute(
+        "SELECT MAX(last_used) FROM responses").fetchone()[0])
+    assert cache.stats["hits"] == 4
+
+
+def test_evicts_least_recently_used(open_cache):
+    cache = open_cache(max_bytes=30)
+    for key in "abc":
+        cache.put(key, "gpt-4o", "x" * 10)
+    # the hit on a is still pending when d pushes the cache over its cap
+    assert cache.get("a") is not None
+    cache.put("d", "gpt-4o", "x" * 10)
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    assert cache.stats["evictions"] == 1
+    assert cache.total_bytes == stored_bytes(cache) == 30
+
+
+def test_running_total_follows_replacements_and_clear(open_cache):
+    cache = open_cache(max_bytes=100)
+    cache.put("a", "gpt-4o", "x" * 40)
+    cache.put("a", "gpt-4o", "x" * 10)
+    cache.put("b", "gpt-4o", "y" * 50)
+    assert cache.total_bytes == stored_bytes(cache) == 60
+    assert cache.stats["evictions"] == 0
+    cache.put("c", "gpt-4o", "z" * 1000)
+    assert len(cache) == 2
+    cache.clear()
+    assert cache.total_bytes == stored_bytes(cache) == 0 and len(cache) == 0
+
+
+def test_total_counts_other_connections_writes(open_cache):
+    first, second = open_cache(max_bytes=30), open_cache(max_bytes=30)
+    first.put("a", "gpt-4o", "x" * 10)
+    second.put("b", "gpt-4o", "x" * 10)
+    second.put("c", "gpt-4o", "x" * 10)
+    first.put("d", "gpt-4o", "x" * 10)
+    assert first.total_bytes == stored_bytes(first) == 30
+    assert first.get("a") is None
+    assert open_cache().total_bytes == 30
+
+
+def test_bypass_only_stores(open_cache):
+    open_cache().put("a", "gpt-4o", "cached")
+    cache = open_cache(bypass=True)
+    assert cache.get("a") is None
+    cache.put("a", "gpt-4o", "fresh")
+    assert open_cache().get("a") == "fresh"
@@ -1,22 +1,61 @@
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
 from typing import Optional
+from tools.sandbox.snapshot import load_csv
+from tools.sandbox.compact import compact
+from tools.sandbox.index import build_group_index, NameIndex
+from tools.sandbox.cache import cached, clear_cache
+from tools.sandbox.multihot import MultiHotIndex
 # from utils.func import extract_before_parenthesis
 
+
+def _select_columns(data):
+    return compact(data[['name','avg_cost','cuisines','rating','City']].dropna(subset=['name', 'avg_cost', 'cuisines', 'rating', 'City']), 'restaurants')
+
+
+def _drop_incomplete(data):
+    return compact(data.dropna(), 'restaurants (load_db)')
+
+
+SEARCH_ORDERS = ('rating', 'cost')
+
 class Restaurants:
-    def __init__(self, path='/restaurants/cleaned_restaurant_details_2024.csv'):
+    def __init__(self, path='/restaurants/cleaned_restaurant_details_2024.csv', data=None):
         self.path = path
-        self.data = pd.read_csv(self.path)[['name','avg_cost','cuisines','rating','City']].dropna(subset=['name', 'avg_cost', 'cuisines', 'rating', 'City'])
+        self.data = data if data is not None else load_csv(self.path, _select_columns)
+        self.build_indexes()
         print("Restaurants loaded.")
 
     def load_db(self):
-        self.data = pd.read_csv(self.path).dropna()
+        self.data = load_csv(self.path, _drop_incomplete)
+        self.build_indexes()
+        clear_cache(self)
+
+    def build_indexes(self):
+        """
+        City index, cuisine bitsets, and per city its row positions in table order,
+        best rated first and cheapest first.
+        """
+        self.city_index = build_group_index(self.data, "City")
+        self.name_index = None
+        self.cuisine_index = MultiHotIndex(self.data['cuisines'])
+        # sort keys, ascending; missing ratings and costs last
+        self.search_keys = {'rating': -pd.to_numeric(self.data['rating'], errors='coerce').to_numpy(dtype=float),
+                            'cost': pd.to_numeric(self.data['avg_cost'], errors='coerce').to_numpy(dtype=float)}
+        self.city_orders = {}
+        for city, rows in self.data.groupby('City', sort=False, observed=True).indices.items():
+            entry = {None: rows}
+            for order, key in self.search_keys.items():
+                entry[order] = rows[np.argsort(key[rows], kind='stable')]
+            self.city_orders[city] = entry
 
+    @cached("Restaurants.run")
     def run(self,
             city: str,
             ) -> DataFrame:
         """Search for restaurant ."""
-        results = self.data[self.data["City"] == city]
+        results = self.city_index.get(city)
         # results = results[results["date"] == date]
         # if price_order == "asc":
         #     results = results.sort_values(by=["Average Cost"], ascending=True)
@@ -27,10 +66,84 @@ class Restaurants:
         #     results = results.sort_values(by=["Aggregate Rating"], ascending=True)
         # elif rating_order == "desc":
         #     results = results.sort_values(by=["Aggregate Rating"], ascending=False)
-        if len(results) == 0:
+        if results is None:
             return "There is no restaurant in this city."
         return results
 
+    def find_by_name(self, name: str, city: str) -> DataFrame:
+        """Rows of the city whose name contains ``name``, the rows a str.contains(re.escape(name)) scan finds."""
+        return self._names().lookup(name, city)
+
+    def _names(self):
+        # Built on first use, only the evaluation looks names up
+        if self.name_index is None:
+            self.name_index = NameIndex(self.data, "name", "City")
+        return self.name_index
+
+    def cuisines_of(self, name: str, city: str, cuisines) -> list:
+        """
+        The given cuisines found in the cuisines of find_by_name(name, city).iloc[0],
+        an empty list if there is no such restaurant.
+        """
+        positions = self._names().positions(name, city)
+        if len(positions) == 0:
+            return []
+        return self.cuisine_index.terms_in(positions[0], cuisines)
+
+    def search_positions(self,
+            city=None,
+            cuisines=None,
+            match: str = 'any',
+            order_by: Optional[str] = None,
+            k: Optional[int] = None,
+            ) -> np.ndarray:
+        """search() without building the frame: row positions in self.data."""
+        if order_by not in (None,) + SEARCH_ORDERS:
+            raise ValueError("order_by must be one of rating, cost or None")
+        found = []
+        for name in [city] if city is None or isinstance(city, str) else list(city):
+            if name is None:
+                rows = np.arange(len(self.data)) if order_by is None else \
+                    np.argsort(self.search_keys[order_by], kind='stable')
+            else:
+                entry = self.city_orders.get(name)
+                if entry is None:
+                    continue
+                rows = entry[order_by]
+            if cuisines is not None:
+                rows = rows[self.cuisine_index.select(cuisines, rows, match)]
+            found.append(rows if k is None else rows[:k])
+
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        rows = np.concatenate(found)
+        if len(found) > 1 and order_by is not None:
+            # merge the cities' sorted rows; stable keeps the city order among ties
+            rows = rows[np.argsort(self.search_keys[order_by][rows], kind='stable')]
+        return rows if k is None else rows[:k]
+
+    def search(self,
+            city=None,
+            cuisines=None,
+            match: str = 'any',
+            order_by: Optional[str] = None,
+            k: Optional[int] = None,
+            ) -> DataFrame:
+        """
+        Restaurants serving the given cuisines.
+        Parameters:
+            city: City name, list of cities, or None for all of them.
+            cuisines: Cuisine or list of cuisines, matched as substrings of the cuisines
+                column (as ``cuisine in row['cuisines']``); no filter if None.
+            match: 'any' (at least one of the cuisines) or 'all' (every one).
+            order_by: None (table order, city by city), 'rating' (best first) or 'cost'
+                (cheapest first).
+            k: At most this many rows.
+        Returns:
+            The matching rows of the table, with their table index.
+        """
+        return self.data.iloc[self.search_positions(city, cuisines, match, order_by, k)]
+
     def run_for_annotation(self,
             city: str,
             ) -> DataFrame:
@@ -0,0 +1,196 @@
+import math
+from itertools import permutations
+
+import numpy as np
+
+# Leg cost factors, the same ones the evaluation charges (hard_constraint.get_total_cost)
+SELF_DRIVING_SEATS = 5
+TAXI_SEATS = 4
+
+# Transport policies a whole trip can follow. Self-driving can not be mixed with
+# flights or taxis (commonsense is_valid_transportation), flights and taxis can.
+POLICIES = {
+    "flight/taxi": ("flight", "taxi"),
+    "self-driving": ("self-driving",),
+}
+
+
+class RouteOptimizer:
+    """
+    Choose and order the cities of a multi-city (5-day / 7-day) state trip.
+
+    Legs are priced from the flights table (cheapest fare of the route, on the leg's
+    date when dates are given) and the distance table behind GoogleDistanceMatrix
+    (self-driving and taxi). Each loop origin -> c1 -> ... -> cn -> origin is scored
+    per transport policy; small candidate sets are searched exhaustively with
+    vectorized permutations, larger ones with a beam search.
+    """
+
+    def __init__(self, flights, distance_matrix, cities, exact_limit=50000, beam_width=64):
+        """
+        Parameters:
+            flights: Flights tool (uses its route_date_orders buckets).
+            distance_matrix: GoogleDistanceMatrix tool (uses its dense matrices).
+            cities: Cities tool, or a dict state -> list of cities.
+            exact_limit: Largest number of orderings searched exhaustively.
+            beam_width: Partial routes kept per step by the heuristic search.
+        """
+        self.flights = flights
+        self.distance_matrix = distance_matrix
+        self.state_cities = cities.data if hasattr(cities, "data") else cities
+        self.exact_limit = exact_limit
+        self.beam_width = beam_width
+
+        # cheapest flight per (origin, destination, date) and per (origin, destination) over all dates
+        prices = flights.data["Price"].to_numpy(dtype=float)
+        distances = flights.data["Distance"].to_numpy(dtype=float)
+        self.route_date_fares = {}
+        self.route_fares = {}
+        for (origin, destination, date), orders in flights.route_date_orders.items():
+            row = orders[0][0]
+            fare = (prices[row], distances[row])
+            self.route_date_fares[(origin, destination, date)] = fare
+            best = self.route_fares.get((origin, destination))
+            if best is None or fare[0] < best[0]:
+                self.route_fares[(origin, destination)] = fare
+
+    def _flight(self, origin, destination, date):
+        if date is None:
+            return self.route_fares.get((origin, destination))
+        return self.route_date_fares.get((origin, destination, date))
+
+    def _road(self, origin, destination):
+        """Driving distance and duration, None if the pair is missing or takes a day or more."""
+        response = self.distance_matrix.lookup(origin, destination)
+        if response is None or int(response[0]) >= 1440:
+            return None
+        return float(response[1])
+
+    def _leg_options(self, origin, destination, date, people_number, allowed_modes):
+        """mode -> (cost, distance) for every mode that can serve the leg."""
+        options = {}
+        if "flight" in allowed_modes:
+            fare = self._flight(origin, destination, date)
+            if fare is not None:
+                options["flight"] = (fare[0] * people_number, fare[1])
+        if "self-driving" in allowed_modes or "taxi" in allowed_modes:
+            distance = self._road(origin, destination)
+            if distance is not None:
+                if "self-driving" in allowed_modes:
+                    options["self-driving"] = (int(distance * 0.05) * math.ceil(people_number / SELF_DRIVING_SEATS), distance)
+                if "taxi" in allowed_modes:
+                    options["taxi"] = (int(distance) * math.ceil(people_number / TAXI_SEATS), distance)
+        return options
+
+    def _leg_table(self, pairs, date, people_number, modes, objective):
+        """Best (score, cost, distance, mode) per pair under one policy; score is inf when infeasible."""
+        table = []
+        for origin, destination in pairs:
+            options = self._leg_options(origin, destination, date, people_number, modes)
+            if not options:
+                table.append((math.inf, None, None, None))
+                continue
+            key = 0 if objective == "cost" else 1
+            mode, (cost, distance) = min(options.items(), key=lambda item: item[1][key])
+            table.append(((cost, distance)[key], cost, distance, mode))
+        return table
+
+    def optimize(self,
+                 origin: str,
+                 state: str,
+                 visiting_city_number: int,
+                 dates: list = None,
+                 people_number: int = 1,
+                 objective: str = "cost",
+                 transportation: str = None,
+                 k: int = 5,
+                 ) -> list:
+        """
+        Cheapest (or shortest) loops from origin through visiting_city_number cities of state.
+        Parameters:
+            dates: Optional departure date of every leg ('YYYY-MM-DD', visiting_city_number + 1
+                of them). Without dates each flight leg uses the route's cheapest fare on any date.
+            objective: 'cost' or 'distance'.
+            transportation: Query constraint, 'no flight' or 'no self-driving'.
+        Returns:
+            Up to k routes, best first, each a dict with the visiting order, the transport
+            policy, total cost and distance, and a per-leg breakdown.
+        """
+        if objective not in ("cost", "distance"):
+            raise ValueError("objective must be one of cost, distance")
+        if dates is not None and len(dates) != visiting_city_number + 1:
+            raise ValueError("dates must give one departure date per leg")
+        candidates = [city for city in self.state_cities.get(state, []) if city != origin]
+        if len(candidates) < visiting_city_number or visiting_city_number < 1:
+            return []
+        leg_dates = dates if dates is not None else [None] * (visiting_city_number + 1)
+
+        routes = []
+        for policy, modes in POLICIES.items():
+            if transportation == "no flight":
+                modes = tuple(mode for mode in modes if mode != "flight")
+            elif transportation == "no self-driving":
+                modes = tuple(mode for mode in modes if mode != "self-driving")
+            if not modes:
+                continue
+            routes += self._search(origin, candidates, visiting_city_number, leg_dates, people_number, modes, objective, policy, k)
+
+        routes.sort(key=lambda route: route["total_cost"] if objective == "cost" else route["total_distance"])
+        return routes[:k]
+
+    def _search(self, origin, candidates, m, leg_dates, people_number, modes, objective, policy, k):
+        n = len(candidates)
+        # legs[0]: origin -> c, legs[1..m-1]: c -> c', legs[m]: c -> origin
+        legs = [self._leg_table([(origin, c) for c in candidates], leg_dates[0], people_number, modes, objective)]
+        for step in range(1, m):
+            legs.append(self._leg_table([(a, b) for a in candidates for b in candidates], leg_dates[step], people_number, modes, objective))
+        legs.append(self._leg_table([(c, origin) for c in candidates], leg_dates[m], people_number, modes, objective))
+        scores = [np.array([leg[0] for leg in table]) for table in legs]
+        for step in range(1, m):
+            scores[step] = scores[step].reshape(n, n)
+            np.fill_diagonal(scores[step], math.inf)
+
+        if math.perm(n, m) <= self.exact_limit:
+            orders = np.array(list(permutations(range(n), m)), dtype=np.int64).reshape(-1, m)
+            totals = scores[0][orders[:, 0]] + scores[m][orders[:, -1]]
+            for step in range(1, m):
+                totals = totals + scores[step][orders[:, step - 1], orders[:, step]]
+        else:
+            orders, totals = self._beam(scores, n, m)
+
+        feasible = np.flatnonzero(np.isfinite(totals))
+        best = feasible[np.argsort(totals[feasible], kind="stable")[:k]]
+        return [self._describe(origin, candidates, orders[i], legs, leg_dates, policy) for i in best]
+
+    def _beam(self, scores, n, m):
+        """Keep the beam_width best partial routes per step; exact when the beam never overflows."""
+        partial = np.arange(n).reshape(-1, 1)
+        totals = scores[0].copy()
+        for step in range(1, m):
+            extended = totals[:, None] + scores[step][partial[:, -1]]
+            # a city can only be visited once
+            for column in range(partial.shape[1]):
+                extended[np.arange(len(partial)), partial[:, column]] = math.inf
+            flat = np.argsort(extended, axis=None, kind="stable")[:self.beam_width]
+            rows, cities = np.unravel_index(flat, extended.shape)
+            partial = np.hstack([partial[rows], cities.reshape(-1, 1)])
+            totals = extended[rows, cities]
+        return partial, totals + scores[m][partial[:, -1]]
+
+    def _describe(self, origin, candidates, order, legs, leg_dates, policy):
+        n = len(candidates)
+        route = [candidates[i] for i in order]
+        stops = [origin] + route + [origin]
+        positions = [order[0]] + [order[s - 1] * n + order[s] for s in range(1, len(order))] + [order[-1]]
+        breakdown = []
+        for step, position in enumerate(positions):
+            _, cost, distance, mode = legs[step][position]
+            breakdown.append({"from": stops[step], "to": stops[step + 1], "mode": mode, "cost": cost,
+                              "distance": distance, "date": leg_dates[step]})
+        return {
+            "cities": route,
+            "policy": policy,
+            "total_cost": sum(leg["cost"] for leg in breakdown),
+            "total_distance": sum(leg["distance"] for leg in breakdown),
+            "legs": breakdown,
+        }
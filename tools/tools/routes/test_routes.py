@@ -0,0 +1,93 @@
+import math
+from itertools import permutations
+
+import pytest
+
+from tools.routes.apis import POLICIES, RouteOptimizer
+
+STATES = {
+    "Texas": ["Austin", "Dallas", "Houston", "San Antonio"],
+    "California": ["Los Angeles", "San Diego", "Fresno"],
+}
+DATES = ["2024-11-01", "2024-11-02", "2024-11-03", "2024-11-04"]
+
+
+def scan_leg(flights, distances, origin, destination, date, people, modes, objective):
+    """(score, cost) of the best mode for one leg from the raw tables, None if no mode serves it."""
+    options = []
+    if "flight" in modes:
+        fares = flights[(flights["OriginCityName"] == origin) & (flights["DestCityName"] == destination)]
+        if date is not None:
+            fares = fares[fares["FlightDate"] == date]
+        if len(fares):
+            best = fares.sort_values("Price", kind="stable").iloc[0]
+            options.append((float(best["Price"]) * people, float(best["Distance"])))
+    road = distances[(distances["origin"] == origin) & (distances["destination"] == destination)]
+    if len(road) and road["duration_min"].notna().iloc[0] and int(road["duration_min"].iloc[0]) < 1440:
+        distance = float(road["distance_km"].iloc[0])
+        if "self-driving" in modes:
+            options.append((int(distance * 0.05) * math.ceil(people / 5), distance))
+        if "taxi" in modes:
+            options.append((int(distance) * math.ceil(people / 4), distance))
+    if not options:
+        return None
+    key = 0 if objective == "cost" else 1
+    best = min(options, key=lambda option: option[key])
+    return best[key]
+
+
+def brute_force(flights, distances, origin, state, m, dates, people, objective):
+    """Score of every feasible (policy, visiting order), enumerated leg by leg."""
+    leg_dates = dates or [None] * (m + 1)
+    scores = []
+    for modes in POLICIES.values():
+        for route in permutations([city for city in STATES[state] if city != origin], m):
+            stops = [origin, *route, origin]
+            legs = [scan_leg(flights, distances, a, b, leg_dates[step], people, modes, objective)
+                    for step, (a, b) in enumerate(zip(stops, stops[1:]))]
+            if None not in legs:
+                scores.append(sum(legs))
+    return sorted(scores)
+
+
+@pytest.fixture
+def optimizer(sandbox_tools):
+    return RouteOptimizer(sandbox_tools["flights"], sandbox_tools["googleDistanceMatrix"], STATES)
+
+
+@pytest.mark.parametrize("origin, state, m, dates, people, objective", [
+    ("Buffalo", "Texas", 3, None, 1, "cost"),
+    ("Buffalo", "Texas", 3, DATES, 3, "cost"),
+    ("Albany", "California", 2, None, 6, "cost"),
+    ("Albany", "California", 2, DATES[:3], 2, "distance"),
+    ("Austin", "Texas", 2, None, 1, "distance"),
+])
+def test_optimize_matches_brute_force(optimizer, sandbox_tools, origin, state, m, dates, people, objective):
+    k = 1000
+    routes = optimizer.optimize(origin, state, m, dates=dates, people_number=people, objective=objective, k=k)
+    expected = brute_force(sandbox_tools["flights"].data, sandbox_tools["googleDistanceMatrix"].data,
+                           origin, state, m, dates, people, objective)
+    total = "total_cost" if objective == "cost" else "total_distance"
+    assert [route[total] for route in routes] == pytest.approx(expected)
+    for route in routes:
+        assert [leg["from"] for leg in route["legs"]] == [origin, *route["cities"]]
+        assert route[total] == pytest.approx(sum(leg[total.split("_")[1]] for leg in route["legs"]))
+        assert {leg["mode"] for leg in route["legs"]} <= set(POLICIES[route["policy"]])
+
+
+def test_beam_search_matches_exhaustive(sandbox_tools, optimizer):
+    beam = RouteOptimizer(sandbox_tools["flights"], sandbox_tools["googleDistanceMatrix"], STATES,
+                          exact_limit=0, beam_width=1000)
+    exact = optimizer.optimize("Buffalo", "Texas", 3, k=5)
+    assert [route["total_cost"] for route in beam.optimize("Buffalo", "Texas", 3, k=5)] == \
+        [route["total_cost"] for route in exact]
+
+
+def test_transportation_constraints(optimizer):
+    for route in optimizer.optimize("Buffalo", "Texas", 2, transportation="no flight", k=50):
+        assert all(leg["mode"] != "flight" for leg in route["legs"])
+    for route in optimizer.optimize("Buffalo", "Texas", 2, transportation="no self-driving", k=50):
+        assert all(leg["mode"] != "self-driving" for leg in route["legs"])
+    assert optimizer.optimize("Buffalo", "Texas", 5) == []
+    with pytest.raises(ValueError):
+        optimizer.optimize("Buffalo", "Texas", 2, dates=DATES)
@@ -0,0 +1,282 @@
+import os
+import sys
+import re
+import json
+import pandas as pd
+import argparse
+import timeit
+import random
+import multiprocessing
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from tools.accommodations.apis import Accommodations
+from tools.restaurants.apis import Restaurants
+from tools.attractions.apis import Attractions
+from tools.events.apis import Events
+from tools.flights.apis import Flights
+from tools.sandbox import cache, database
+from tools.sandbox.memory import peak_rss_mib
+
+
+def report(name, scan_seconds, index_seconds, calls):
+    print(f"{name:<16} scan {scan_seconds / calls * 1e6:9.1f} us/call   "
+          f"index {index_seconds / calls * 1e6:9.1f} us/call   "
+          f"speedup {scan_seconds / index_seconds:7.1f}x")
+
+
+def bench_city_index(args):
+    """Per-city index lookups of run() against the boolean scan they replaced."""
+    tools = []
+    if args.accommodations:
+        tools.append(("Accommodations", Accommodations(args.accommodations), False))
+    if args.restaurants:
+        tools.append(("Restaurants", Restaurants(args.restaurants), False))
+    if args.attractions:
+        tools.append(("Attractions", Attractions(args.attractions), True))
+
+    for name, tool, reset in tools:
+        cities = list(tool.city_index)
+
+        def scan():
+            for city in cities:
+                results = tool.data[tool.data["City"] == city]
+                if reset:
+                    results = results.reset_index(drop=True)
+
+        def index():
+            # the index path of run(), whose result cache would answer every repeat after the first
+            for city in cities:
+                tool.city_index.get(city)
+
+        calls = len(cities) * args.repeat
+        report(name, timeit.timeit(scan, number=args.repeat), timeit.timeit(index, number=args.repeat), calls)
+
+
+def bench_result_cache(args):
+    """Cost of a result cache hit (LRU lookup plus the copy handed out) against the index lookup of a miss."""
+    tools = []
+    if args.accommodations:
+        tools.append(("Accommodations", Accommodations(args.accommodations)))
+    if args.restaurants:
+        tools.append(("Restaurants", Restaurants(args.restaurants)))
+    if args.attractions:
+        tools.append(("Attractions", Attractions(args.attractions)))
+
+    for name, tool in tools:
+        cities = list(tool.city_index)
+        results = [tool.run(city) for city in cities]
+
+        def lookup():
+            for city in cities:
+                tool.city_index.get(city)
+
+        def hit():
+            for city in cities:
+                tool.run(city)
+
+        def copy():
+            for frame in results:
+                frame.copy()
+
+        calls = len(cities) * args.repeat
+        rows = sum(map(len, results)) / len(results)
+        print(f"{name:<16} {rows:7.0f} rows/result   "
+              + "   ".join(f"{label} {timeit.timeit(f, number=args.repeat) / calls * 1e6:8.1f} us/call"
+                           for label, f in (("index lookup", lookup), ("cache hit", hit), ("copy", copy))))
+
+
+def plan_lookups(path):
+    """(kind, name, city) of every restaurant, attraction, accommodation and event named in a plan file."""
+    def name_city(info):
+        # utils.func.get_valid_name_city
+        parts = info.rsplit(',', 1)
+        if len(parts) != 2:
+            return "-", "-"
+        city = parts[1].strip()
+        match = re.search(r'^(.*?)\([^)]*\)', city)
+        return parts[0].strip(), (match.group(1) if match else city).strip()
+
+    lookups = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f.read().strip().split('\n'):
+            plan = json.loads(line).get("plan") or []
+            for unit in plan:
+                if not isinstance(unit, dict):
+                    continue
+                for meal in ("breakfast", "lunch", "dinner"):
+                    if unit.get(meal) and unit[meal] != '-':
+                        lookups.append(("restaurants", *name_city(unit[meal])))
+                if unit.get("accommodation") and unit["accommodation"] != '-':
+                    lookups.append(("accommodations", *name_city(unit["accommodation"])))
+                if unit.get("attraction") and unit["attraction"] != '-':
+                    lookups += [("attractions", *name_city(x)) for x in unit["attraction"].split(';')]
+                if unit.get("event") and unit["event"] != '-':
+                    lookups += [("events", *name_city(x)) for x in unit["event"].split(';')]
+    return lookups
+
+
+def bench_name_index(args):
+    """find_by_name() against the str.contains scan the evaluation used, over the names of a plan file."""
+    tools = {}
+    if args.accommodations:
+        tools["accommodations"] = (Accommodations(args.accommodations), "City")
+    if args.restaurants:
+        tools["restaurants"] = (Restaurants(args.restaurants), "City")
+    if args.attractions:
+        tools["attractions"] = (Attractions(args.attractions), "City")
+    if args.events:
+        tools["events"] = (Events(args.events), "city")
+
+    lookups = plan_lookups(args.plans)
+    for kind, (tool, city_column) in tools.items():
+        queries = [(name, city) for k, name, city in lookups if k == kind]
+        if not queries:
+            continue
+
+        def scan():
+            for name, city in queries:
+                data = tool.data
+                data[(data['name'].astype(str).str.contains(re.escape(name))) & (data[city_column] == city)]
+
+        def index():
+            for name, city in queries:
+                tool.find_by_name(name, city)
+
+        start = timeit.default_timer()
+        index()
+        print(f"{kind}: {len(queries)} lookups, index built in {timeit.default_timer() - start:.3f}s")
+        for name, city in queries:
+            data = tool.data
+            expected = data[(data['name'].astype(str).str.contains(re.escape(name))) & (data[city_column] == city)]
+            assert expected.index.equals(tool.find_by_name(name, city).index), (kind, name, city)
+
+        calls = len(queries) * args.repeat
+        report(kind, timeit.timeit(scan, number=args.repeat), timeit.timeit(index, number=args.repeat), calls)
+
+
+def _open_backend(backend, paths):
+    """Table name -> tool with run(), from the CSVs (pandas) or the compiled file (sqlite)."""
+    if backend == "pandas":
+        classes = {"flights": Flights, "accommodations": Accommodations, "restaurants": Restaurants,
+                   "attractions": Attractions, "events": Events}
+        return {name: classes[name](path) for name, path in paths.items() if name != "database"}
+    db = database.SandboxDatabase(paths["database"])
+    classes = {"flights": database.DatabaseFlights, "accommodations": database.DatabaseAccommodations,
+               "restaurants": database.DatabaseRestaurants, "attractions": database.DatabaseAttractions,
+               "events": database.DatabaseEvents}
+    return {name: classes[name](db) for name in paths if name != "database"}
+
+
+def _measure_backend(backend, paths, queries, results):
+    # runs in its own process, so the peak RSS is this backend's alone; the queries repeat,
+    # without turning the result cache off they would time its hits rather than the backend
+    os.environ[cache.SIZE_ENV] = "0"
+    baseline = peak_rss_mib()
+    start = timeit.default_timer()
+    tools = _open_backend(backend, paths)
+    load_seconds = timeit.default_timer() - start
+    latencies = {}
+    for name, tool_queries in queries.items():
+        timings = []
+        for query in tool_queries:
+            start = timeit.default_timer()
+            tools[name].run(*query)
+            timings.append(timeit.default_timer() - start)
+        latencies[name] = timings
+    rss = peak_rss_mib()
+    results.put((backend, load_seconds, rss - baseline, rss, latencies))
+
+
+def bench_sqlite(args):
+    """Load time, peak RSS and run() latency of the pandas tools against the SQLite backend."""
+    paths = {name: getattr(args, name) for name in ("flights", "accommodations", "restaurants", "attractions", "events")
+             if getattr(args, name)}
+    tools = _open_backend("pandas", paths)
+    if args.compile or not os.path.exists(args.database):
+        database.compile_database(tools, args.database)
+    paths["database"] = args.database
+
+    # run() arguments drawn from the tables themselves, plus a few that match nothing
+    rng = random.Random(0)
+    queries = {}
+    for name, tool in tools.items():
+        data = tool.data
+        if name == "flights":
+            keys = data[["OriginCityName", "DestCityName", "FlightDate"]].astype(str).drop_duplicates().values.tolist()
+        elif name == "events":
+            dates = data["dateTitle"].dt.strftime("%Y-%m-%d")
+            keys = [[city, [day, day]] for city, day in zip(data["city"].astype(str), dates)]
+        else:
+            keys = [[city] for city in data["City"].astype(str).unique()]
+        queries[name] = [tuple(key) for key in rng.choices(keys, k=args.queries)] + [("Nowhere",) * (3 if name == "flights" else 1)]
+        if name == "events":
+            queries[name][-1] = ("Nowhere", ["2024-11-01", "2024-11-02"])
+
+    # both backends must hand back the same frames
+    db_tools = _open_backend("sqlite", paths)
+    for name, tool_queries in queries.items():
+        for query in tool_queries:
+            expected, got = tools[name].run(*query), db_tools[name].run(*query)
+            if isinstance(expected, str):
+                assert expected == got, (name, query)
+            else:
+                pd.testing.assert_frame_equal(expected, got)
+    print(f"Outputs match on {sum(map(len, queries.values()))} queries")
+    del tools, db_tools
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    for backend in ("pandas", "sqlite"):
+        process = context.Process(target=_measure_backend, args=(backend, paths, queries, results))
+        process.start()
+        backend, load_seconds, rss_delta, rss, latencies = results.get()
+        process.join()
+        print(f"{backend:<7} load {load_seconds:8.3f}s   peak RSS +{rss_delta:7.1f} MiB ({rss:7.1f} MiB total)")
+        for name, timings in latencies.items():
+            timings = sorted(timings)
+            print(f"    {name:<16} p50 {timings[len(timings) // 2] * 1e6:9.1f} us   "
+                  f"p95 {timings[int(len(timings) * 0.95)] * 1e6:9.1f} us   "
+                  f"mean {sum(timings) / len(timings) * 1e6:9.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    city_parser = subparsers.add_parser("city-index", help="Accommodations/Restaurants/Attractions.run")
+    city_parser.add_argument("--accommodations", type=str, default=None)
+    city_parser.add_argument("--restaurants", type=str, default=None)
+    city_parser.add_argument("--attractions", type=str, default=None)
+    city_parser.add_argument("--repeat", type=int, default=20)
+    city_parser.set_defaults(func=bench_city_index)
+
+    cache_parser = subparsers.add_parser("result-cache", help="run() cache hits against the index lookups they save")
+    cache_parser.add_argument("--accommodations", type=str, default=None)
+    cache_parser.add_argument("--restaurants", type=str, default=None)
+    cache_parser.add_argument("--attractions", type=str, default=None)
+    cache_parser.add_argument("--repeat", type=int, default=20)
+    cache_parser.set_defaults(func=bench_result_cache)
+
+    name_parser = subparsers.add_parser("name-index", help="find_by_name over the entities of a plan file")
+    name_parser.add_argument("--plans", type=str, required=True, help="Plan jsonl file, as given to evaluation/eval.py")
+    name_parser.add_argument("--accommodations", type=str, default=None)
+    name_parser.add_argument("--restaurants", type=str, default=None)
+    name_parser.add_argument("--attractions", type=str, default=None)
+    name_parser.add_argument("--events", type=str, default=None)
+    name_parser.add_argument("--repeat", type=int, default=3)
+    name_parser.set_defaults(func=bench_name_index)
+
+    sqlite_parser = subparsers.add_parser("sqlite", help="run() from the pandas tools against the SQLite backend")
+    sqlite_parser.add_argument("--database", type=str, required=True, help="Compiled database, written if missing")
+    sqlite_parser.add_argument("--compile", action="store_true", help="Rewrite the database even if it exists")
+    sqlite_parser.add_argument("--flights", type=str, default=None)
+    sqlite_parser.add_argument("--accommodations", type=str, default=None)
+    sqlite_parser.add_argument("--restaurants", type=str, default=None)
+    sqlite_parser.add_argument("--attractions", type=str, default=None)
+    sqlite_parser.add_argument("--events", type=str, default=None)
+    sqlite_parser.add_argument("--queries", type=int, default=500, help="run() calls per table")
+    sqlite_parser.set_defaults(func=bench_sqlite)
+
+    args = parser.parse_args()
+    args.func(args)
@@ -0,0 +1,152 @@
+"""
+Bounded LRU memo of tool lookups, with hit/miss/eviction counters.
+
+    class Events:
+        @cached("Events.run")
+        def run(self, city, date_range): ...
+
+Every tool instance keeps its own entries (load_db() calls clear_cache(self)); the
+counters are kept per name across instances. Cached frames never leave the cache:
+every call gets its own copy, so callers can add columns or write values without
+changing later results. Arrow string columns share their immutable buffers, so the
+copy only duplicates the numeric blocks: ``benchmark.py result-cache`` measures a hit
+(copy included) at 30-65 us against 140-540 us for the city index lookup it saves, on
+the test tables at 30 to 800 rows a result. Read-only frames would not be cheaper: a
+shallow copy shares the Arrow arrays, whose writes are not caught, and rebuilding them
+per hit costs more than the copy. Dicts come back as copies, strings as they are.
+
+TRIPTIDE_RESULT_CACHE_SIZE sets the entries per cache (0 turns caching off) and
+TRIPTIDE_RESULT_CACHE_STATS names a JSON file the counters are written to at exit.
+"""
+import atexit
+import functools
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from pandas import DataFrame
+
+SIZE_ENV = "TRIPTIDE_RESULT_CACHE_SIZE"
+STATS_ENV = "TRIPTIDE_RESULT_CACHE_STATS"
+DEFAULT_SIZE = 4096
+
+# name -> {"hits", "misses", "evictions", "maxsize"}
+cache_stats = {}
+_stats_lock = threading.Lock()
+
+
+def cache_size():
+    return int(os.environ.get(SIZE_ENV, DEFAULT_SIZE))
+
+
+def _key(value):
+    # date ranges and other lists are passed as lists, which can not be hashed
+    if isinstance(value, (list, tuple)):
+        return tuple(_key(v) for v in value)
+    return value
+
+
+def _hand_out(value):
+    # a shallow copy would share Arrow-backed arrays, whose __setitem__ swaps the data
+    # under every frame holding them
+    if isinstance(value, DataFrame):
+        return value.copy()
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+class ResultCache:
+    """One tool instance's LRU entries for one method."""
+
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        with _stats_lock:
+            self.stats = cache_stats.setdefault(name, {"hits": 0, "misses": 0, "evictions": 0, "maxsize": maxsize})
+
+    def get(self, key, compute):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return _hand_out(self.entries[key])
+        value = compute()
+        with self.lock:
+            self.stats["misses"] += 1
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return _hand_out(value)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def cached(name=None, maxsize=None):
+    """
+    Memoize a tool method on its positional and keyword arguments.
+    Parameters:
+        name: Counter name, '<class>.<method>' of the instance if None.
+        maxsize: Entries kept per instance; TRIPTIDE_RESULT_CACHE_SIZE (default 4096) if None.
+    """
+    def decorate(method):
+        attribute = f"_cache_{method.__name__}"
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = self.__dict__.get(attribute)
+            if cache is None:
+                size = cache_size() if maxsize is None else maxsize
+                if size <= 0:
+                    return _hand_out(method(self, *args, **kwargs))
+                cache = self.__dict__.setdefault(
+                    attribute, ResultCache(name or f"{type(self).__name__}.{method.__name__}", size))
+            key = (_key(args), _key(tuple(sorted(kwargs.items()))))
+            try:
+                hash(key)
+            except TypeError:
+                # unhashable arguments: answer without caching
+                return _hand_out(method(self, *args, **kwargs))
+            return cache.get(key, lambda: method(self, *args, **kwargs))
+        return wrapper
+    return decorate
+
+
+def clear_cache(tool):
+    """Drop every cached result of a tool instance, for when its table changes."""
+    for value in vars(tool).values():
+        if isinstance(value, ResultCache):
+            value.clear()
+
+
+def report():
+    """Counters of every cache, with hit rates."""
+    summary = {}
+    with _stats_lock:
+        for name, stats in cache_stats.items():
+            calls = stats["hits"] + stats["misses"]
+            summary[name] = dict(stats, hit_rate=stats["hits"] / calls if calls else 0.0)
+    return summary
+
+
+def dump_stats(path=None):
+    """Print the counters and, with a path, write them there as JSON."""
+    summary = report()
+    for name, stats in summary.items():
+        print(f"{name:<36} hits {stats['hits']:>9}  misses {stats['misses']:>8}  "
+              f"evictions {stats['evictions']:>8}  hit rate {stats['hit_rate']:6.1%}")
+    if path:
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2)
+    return summary
+
+
+if os.environ.get(STATS_ENV):
+    atexit.register(lambda: dump_stats(os.environ[STATS_ENV]))
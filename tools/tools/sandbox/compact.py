@@ -0,0 +1,54 @@
+import pandas as pd
+from pandas.api.types import infer_dtype, is_integer_dtype
+
+# String columns with at most this ratio of distinct values become categoricals
+CATEGORY_RATIO = 0.5
+
+# One entry per compacted table: {"before", "after"} in bytes (deep memory usage)
+compaction_stats = {}
+
+
+def _memory(data):
+    return int(data.memory_usage(deep=True).sum())
+
+
+def _compact_column(series, category_ratio, categorical=True):
+    if series.dtype == object and infer_dtype(series, skipna=True) == "string":
+        if categorical and series.nunique(dropna=True) <= category_ratio * len(series):
+            # City, roomType, house_rules, cuisines, ...: one shared copy of every distinct value
+            return series.astype("category")
+        if not series.isna().any():
+            # names, urls, addresses: Arrow string storage instead of one Python object per row
+            return series.astype(pd.StringDtype("pyarrow"))
+        return series
+    if is_integer_dtype(series.dtype) and series.dtype.itemsize > 4 and len(series):
+        # int32, never narrower, so per-row arithmetic in the evaluation can not overflow
+        if series.min() >= -2 ** 31 and series.max() < 2 ** 31:
+            return series.astype("int32")
+    # floats stay float64: float32 would change costs computed from them
+    return series
+
+
+def compact(data, name=None, category_ratio=CATEGORY_RATIO, text_columns=()):
+    """
+    Shrink a sandbox table without changing its values.
+    Parameters:
+        data: Prepared tool table.
+        name: Table name for the memory report.
+        category_ratio: String columns with at most this ratio of distinct values per row
+            become categoricals, other complete string columns Arrow strings.
+        text_columns: Columns never made categorical, for strings compared with < and >
+            (unordered categoricals only support == and !=).
+    Returns:
+        The compacted copy of data; same columns, index and values.
+    """
+    before = _memory(data)
+    data = data.copy()
+    # by position, load_db() tables can carry duplicate column names
+    for i in range(data.shape[1]):
+        data.isetitem(i, _compact_column(data.iloc[:, i], category_ratio, data.columns[i] not in text_columns))
+    after = _memory(data)
+    if name is not None:
+        compaction_stats[name] = {"before": before, "after": after}
+        print(f"{name}: compacted {before / 2 ** 20:.1f} MiB -> {after / 2 ** 20:.1f} MiB")
+    return data
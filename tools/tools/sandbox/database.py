@@ -0,0 +1,315 @@
+"""
+SQLite query backend for the sandbox tools.
+
+compile_database() writes the prepared tool tables (the frames load_csv() hands the
+tools) into one indexed SQLite file. The Database* tools answer run() from that file
+through a small pool of read-only connections instead of holding the tables in pandas,
+and return the same frames the pandas tools do: same rows, order, index, columns and
+dtypes.
+
+    # once
+    compile_database({"flights": Flights(), "events": Events()}, "sandbox.sqlite")
+
+    # per process
+    os.environ[BACKEND_ENV] = "sqlite"
+    os.environ[DATABASE_ENV] = "sandbox.sqlite"
+    flight = registry.proxy("flights", backend=backend())   # now a DatabaseFlights
+
+Only run() (and Flights.get_by_number) are served this way, so only callers limited to
+those ask the registry for this backend; the evaluation needs the tables and in-memory
+indexes of the pandas tools and always gets them.
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_datetime64_dtype, is_float_dtype, is_integer_dtype
+
+from tools.sandbox.cache import cached
+
+# Backend for the callers that opt in: "pandas" (default) or "sqlite", and the database file for the latter
+BACKEND_ENV = "TRIPTIDE_SANDBOX_BACKEND"
+DATABASE_ENV = "TRIPTIDE_SANDBOX_DB"
+
+# Row position and original index label of every row, next to the table's own columns
+ROW = "_row"
+INDEX = "_index"
+
+# Table -> column groups indexed, one per query shape the Database* tools run
+INDEXES = {
+    "flights": [("OriginCityName", "DestCityName", "FlightDate"), ("Flight Number",)],
+    "accommodations": [("City",)],
+    "restaurants": [("City",)],
+    "attractions": [("City",)],
+    "events": [("city", "dateTitle")],
+}
+
+NAT = np.iinfo(np.int64).min
+NS_PER_DAY = 86400 * 10 ** 9
+# datetime.toordinal() of 1970-01-01
+EPOCH_ORDINAL = 719163
+
+
+def backend():
+    return os.environ.get(BACKEND_ENV, "pandas")
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _column_kind(series):
+    """How a column is stored and restored, with what restoring needs."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return {"kind": "category", "categories": dtype.categories.tolist(), "ordered": bool(dtype.ordered)}
+    if isinstance(dtype, pd.StringDtype):
+        return {"kind": "string", "storage": dtype.storage}
+    if is_datetime64_dtype(dtype):
+        return {"kind": "datetime", "dtype": str(dtype)}
+    if is_bool_dtype(dtype):
+        return {"kind": "bool"}
+    if is_integer_dtype(dtype) and isinstance(dtype, np.dtype):
+        return {"kind": "int", "dtype": str(dtype)}
+    if is_float_dtype(dtype) and isinstance(dtype, np.dtype):
+        return {"kind": "float", "dtype": str(dtype)}
+    return {"kind": "object"}
+
+
+def _to_sql_values(series, kind):
+    if kind["kind"] == "datetime":
+        # nanoseconds since the epoch, NULL for NaT
+        values = series.to_numpy().astype("datetime64[ns]").astype(np.int64)
+        return [None if v == NAT else v for v in values.tolist()]
+    if kind["kind"] == "bool":
+        return series.astype(int).tolist()
+    if kind["kind"] in ("category", "string"):
+        return [None if pd.isna(v) else str(v) for v in series.tolist()]
+    return [None if isinstance(v, float) and np.isnan(v) else v for v in series.tolist()]
+
+
+def _from_sql_values(values, kind):
+    if kind["kind"] in ("category", "string"):
+        return pd.array(values, dtype=kind["pandas_dtype"])
+    if kind["kind"] == "datetime":
+        return np.array([NAT if v is None else v for v in values], dtype=np.int64).view("datetime64[ns]")
+    if kind["kind"] == "bool":
+        return np.array(values, dtype=bool)
+    if kind["kind"] == "int":
+        return np.array(values, dtype=kind["dtype"])
+    if kind["kind"] == "float":
+        # None (NULL, how SQLite stores NaN) becomes NaN
+        return np.array(values, dtype=kind["dtype"])
+    return np.array([np.nan if v is None else v for v in values], dtype=object)
+
+
+def compile_database(tables, path):
+    """
+    Write tables into one SQLite file, replacing it if it exists.
+    Parameters:
+        tables: Dict name -> DataFrame, or -> tool instance (its ``data`` is written).
+        path: Database file.
+    Returns:
+        path.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("CREATE TABLE _tables (name TEXT PRIMARY KEY, meta TEXT)")
+        for name, data in tables.items():
+            data = getattr(data, "data", data)
+            if data.columns.duplicated().any():
+                raise ValueError(f"Can not compile table {name}: duplicate column names")
+            kinds = {column: _column_kind(data[column]) for column in data.columns}
+            meta = {"columns": [[column, kinds[column]] for column in data.columns],
+                    "index_name": data.index.name, "index_dtype": str(data.index.dtype)}
+            columns = [ROW, INDEX] + list(data.columns)
+            conn.execute(f"CREATE TABLE {_quote(name)} ({ROW} INTEGER PRIMARY KEY, "
+                         + ", ".join(_quote(column) for column in columns[1:]) + ")")
+            values = [range(len(data)), data.index.tolist()] + [_to_sql_values(data[column], kinds[column]) for column in data.columns]
+            conn.executemany(f"INSERT INTO {_quote(name)} VALUES ({', '.join('?' * len(columns))})", zip(*values))
+            for i, group in enumerate(INDEXES.get(name, [])):
+                if all(column in data.columns for column in group):
+                    conn.execute(f"CREATE INDEX {_quote(f'{name}_{i}')} ON {_quote(name)} "
+                                 f"({', '.join(_quote(column) for column in group)}, {ROW})")
+            conn.execute("INSERT INTO _tables VALUES (?, ?)", (name, json.dumps(meta)))
+            print(f"Compiled {name}: {len(data)} rows")
+        conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+class SandboxDatabase:
+    """Pooled read-only connections to a compiled database, with the table metadata."""
+
+    def __init__(self, path, pool_size=4):
+        """
+        Parameters:
+            path: File written by compile_database().
+            pool_size: Connections kept open for reuse; more are opened while all are busy.
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No sandbox database at {path}")
+        self.path = path
+        self.pool_size = pool_size
+        self.lock = threading.Lock()
+        self.pool = queue.LifoQueue()
+        self.pid = os.getpid()
+        with self.connection() as conn:
+            self.tables = {name: json.loads(meta) for name, meta in conn.execute("SELECT name, meta FROM _tables")}
+        # pandas dtypes built once, categories can be long
+        for meta in self.tables.values():
+            for column, kind in meta["columns"]:
+                if kind["kind"] == "category":
+                    kind["pandas_dtype"] = pd.CategoricalDtype(kind["categories"], kind["ordered"])
+                elif kind["kind"] == "string":
+                    kind["pandas_dtype"] = pd.StringDtype(kind["storage"])
+
+    def _connect(self):
+        conn = sqlite3.connect(f"file:{quote(os.path.abspath(self.path))}?mode=ro", uri=True,
+                               check_same_thread=False, cached_statements=256)
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {1 << 30}")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        with self.lock:
+            if self.pid != os.getpid():
+                # connections must not cross a fork, the child starts its own pool
+                self.pool = queue.LifoQueue()
+                self.pid = os.getpid()
+        try:
+            conn = self.pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if self.pool.qsize() < self.pool_size:
+                self.pool.put(conn)
+            else:
+                conn.close()
+
+    def select(self, table, where="", params=(), limit=None, reset_index=False):
+        """
+        Rows of a compiled table, in table order, as the DataFrame pandas would hold.
+        Parameters:
+            table: Table name.
+            where: SQL condition (with ? placeholders), every row if empty.
+            params: Values for the placeholders.
+            limit: At most this many rows.
+            reset_index: Give the frame a fresh RangeIndex instead of the original labels.
+        """
+        meta = self.tables[table]
+        sql = f"SELECT * FROM {_quote(table)}"
+        if where:
+            sql += f" WHERE {where}"
+        sql += f" ORDER BY {ROW}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        # the statement text is fixed per call site, so every connection reuses its prepared statement
+        with self.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        columns = list(zip(*rows)) if rows else [()] * (len(meta["columns"]) + 2)
+        data = pd.DataFrame({column: _from_sql_values(list(values), kind)
+                             for (column, kind), values in zip(meta["columns"], columns[2:])})
+        if reset_index:
+            return data
+        data.index = pd.Index(list(columns[1]), dtype=meta["index_dtype"], name=meta["index_name"])
+        return data
+
+    def close(self):
+        while True:
+            try:
+                self.pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class DatabaseFlights:
+    def __init__(self, database):
+        self.database = database
+        print("Flights API loaded (sqlite).")
+
+    @cached("DatabaseFlights.run")
+    def run(self, origin: str, destination: str, departure_date: str):
+        """Search for flights by origin, destination, and departure date."""
+        results = self.database.select(
+            "flights", '"OriginCityName" = ? AND "DestCityName" = ? AND "FlightDate" = ?',
+            (origin, destination, departure_date))
+        if len(results) == 0:
+            return "There is no flight from {} to {} on {}.".format(origin, destination, departure_date)
+        return results
+
+    @cached("DatabaseFlights.get_by_number")
+    def get_by_number(self, flight_number: str, origin=None, destination=None):
+        """Rows of a flight number in table order, only those flying origin/destination if given."""
+        where, params = '"Flight Number" = ?', [flight_number]
+        if origin is not None:
+            where, params = where + ' AND "OriginCityName" = ?', params + [origin]
+        if destination is not None:
+            where, params = where + ' AND "DestCityName" = ?', params + [destination]
+        return self.database.select("flights", where, tuple(params))
+
+
+class _DatabaseCityTool:
+    table = None
+    message = None
+    reset_index = False
+
+    def __init__(self, database):
+        self.database = database
+        print(f"{self.table.capitalize()} loaded (sqlite).")
+
+    @cached()
+    def run(self, city: str):
+        results = self.database.select(self.table, '"City" = ?', (city,), reset_index=self.reset_index)
+        if len(results) == 0:
+            return self.message
+        return results
+
+
+class DatabaseAccommodations(_DatabaseCityTool):
+    table = "accommodations"
+    message = "There is no attraction in this city."
+
+
+class DatabaseRestaurants(_DatabaseCityTool):
+    table = "restaurants"
+    message = "There is no restaurant in this city."
+
+
+class DatabaseAttractions(_DatabaseCityTool):
+    table = "attractions"
+    message = "There is no attraction in this city."
+    reset_index = True
+
+
+class DatabaseEvents:
+    def __init__(self, database):
+        self.database = database
+        print("Events loaded (sqlite).")
+
+    @cached("DatabaseEvents.run")
+    def run(self, city: str, date_range: list):
+        """Search for Events by city and date range ('yyyy-mm-dd' strings, both days included)."""
+        start = datetime.strptime(date_range[0], '%Y-%m-%d').toordinal() - EPOCH_ORDINAL
+        end = datetime.strptime(date_range[-1], '%Y-%m-%d').toordinal() - EPOCH_ORDINAL + 1
+        results = self.database.select("events", '"city" = ? AND "dateTitle" >= ? AND "dateTitle" < ?',
+                                       (city, start * NS_PER_DAY, end * NS_PER_DAY), reset_index=True)
+        if len(results) == 0:
+            return "There are no events in this city for the given date range."
+        return results
@@ -0,0 +1,147 @@
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between points given in degrees; numpy arrays broadcast."""
+    lat1, lon1, lat2, lon2 = (np.radians(x) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex:
+    """
+    Uniform latitude/longitude grid over a set of points, for k-nearest and radius
+    queries with haversine distances.
+
+    Cells are ``cell_km`` tall and at least ``cell_km`` wide over the latitude band of
+    the points, so a point r rings of cells away from the query cell is at least about
+    r * cell_km away. Nearest searches widen ring by ring until that bound passes the
+    k-th best distance; once the rings cover more cells than the grid has, all points
+    are checked directly.
+    """
+
+    def __init__(self, latitudes, longitudes, cell_km=1.0):
+        """
+        Parameters:
+            latitudes, longitudes: Point coordinates in degrees; points with missing
+                coordinates are left out of the grid.
+            cell_km: Cell size, about the typical query radius works well.
+        """
+        self.lat = np.asarray(latitudes, dtype=float)
+        self.lon = np.asarray(longitudes, dtype=float)
+        self.cell_km = cell_km
+        valid = np.isfinite(self.lat) & np.isfinite(self.lon)
+        self.points = np.flatnonzero(valid)
+        self.band = min(float(np.abs(self.lat[valid]).max()), 89.0) if len(self.points) else 0.0
+        self.dlat = cell_km / KM_PER_DEGREE
+        self.dlon = self.dlat / math.cos(math.radians(self.band))
+
+        # (row, column) -> point ids in that cell
+        self.cells = {}
+        rows = np.floor(self.lat[self.points] / self.dlat).astype(np.int64)
+        cols = np.floor(self.lon[self.points] / self.dlon).astype(np.int64)
+        order = np.lexsort((cols, rows))
+        keys = list(zip(rows[order].tolist(), cols[order].tolist()))
+        start = 0
+        for end in range(1, len(order) + 1):
+            if end == len(order) or keys[end] != keys[start]:
+                self.cells[keys[start]] = self.points[order[start:end]]
+                start = end
+        if self.cells:
+            self.row_range = (int(rows.min()), int(rows.max()))
+            self.col_range = (int(cols.min()), int(cols.max()))
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.dlat), math.floor(lon / self.dlon)
+
+    def _scale(self, lat):
+        # cells are narrower than cell_km north (or south) of the band the grid was sized for;
+        # 0.99 covers the great circle being slightly shorter than the parallel
+        return 0.99 * min(1.0, math.cos(math.radians(min(max(abs(lat), self.band), 89.0))) / math.cos(math.radians(self.band)))
+
+    def _ring(self, row, col, r):
+        if r == 0:
+            ids = self.cells.get((row, col))
+            return [ids] if ids is not None else []
+        found = []
+        for c in range(col - r, col + r + 1):
+            for rr in (row - r, row + r):
+                ids = self.cells.get((rr, c))
+                if ids is not None:
+                    found.append(ids)
+        for rr in range(row - r + 1, row + r):
+            for c in (col - r, col + r):
+                ids = self.cells.get((rr, c))
+                if ids is not None:
+                    found.append(ids)
+        return found
+
+    def _all(self, lat, lon):
+        return self.points, haversine_km(lat, lon, self.lat[self.points], self.lon[self.points])
+
+    def nearest(self, lat, lon, k=1):
+        """
+        The k points closest to (lat, lon).
+        Returns:
+            (ids, distances_km), both sorted by distance; fewer than k when the grid is smaller.
+        """
+        if not self.cells or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        row, col = self._cell(lat, lon)
+        max_r = max(abs(row - self.row_range[0]), abs(row - self.row_range[1]),
+                    abs(col - self.col_range[0]), abs(col - self.col_range[1]))
+        scale = self._scale(lat)
+        ids_found, dist_found = [], []
+        count = 0
+        for r in range(max_r + 1):
+            if (2 * r + 1) ** 2 > len(self.cells):
+                # sparse surroundings: checking every point is cheaper than walking more rings
+                ids, distances = self._all(lat, lon)
+                ids_found, dist_found = [ids], [distances]
+                break
+            for ids in self._ring(row, col, r):
+                ids_found.append(ids)
+                dist_found.append(haversine_km(lat, lon, self.lat[ids], self.lon[ids]))
+                count += len(ids)
+            # everything beyond ring r is at least r cells away
+            if count >= k and np.partition(np.concatenate(dist_found), k - 1)[k - 1] <= r * self.cell_km * scale:
+                break
+        ids = np.concatenate(ids_found)
+        distances = np.concatenate(dist_found)
+        order = np.argsort(distances, kind="stable")[:k]
+        return ids[order], distances[order]
+
+    def within(self, lat, lon, radius_km):
+        """
+        Points within radius_km of (lat, lon).
+        Returns:
+            (ids, distances_km), sorted by distance.
+        """
+        if not self.cells:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        row, col = self._cell(lat, lon)
+        reach_rows = math.ceil(radius_km / self.cell_km)
+        reach_cols = math.ceil(radius_km / (self.cell_km * self._scale(lat)))
+        if (2 * reach_rows + 1) * (2 * reach_cols + 1) > len(self.cells):
+            ids, distances = self._all(lat, lon)
+        else:
+            found = [self.cells[(r, c)]
+                     for r in range(row - reach_rows, row + reach_rows + 1)
+                     for c in range(col - reach_cols, col + reach_cols + 1)
+                     if (r, c) in self.cells]
+            if not found:
+                return np.empty(0, dtype=np.int64), np.empty(0)
+            ids = np.concatenate(found)
+            distances = haversine_km(lat, lon, self.lat[ids], self.lon[ids])
+        keep = distances <= radius_km
+        ids, distances = ids[keep], distances[keep]
+        order = np.argsort(distances, kind="stable")
+        return ids[order], distances[order]
@@ -0,0 +1,108 @@
+import numpy as np
+
+
+class GroupIndex:
+    """
+    Row positions of every value of a column; get() slices the rows on lookup, so the
+    index holds no copy of the table (tables attached from a shared store stay shared).
+    """
+
+    def __init__(self, data, column, reset_index=False):
+        """
+        Parameters:
+            data: DataFrame to index.
+            column: Column, or list of columns, to group by (e.g. 'City').
+            reset_index: Reset the index of every slice, for tools whose run() returns reset frames.
+        """
+        self.data = data
+        self.reset_index = reset_index
+        # value -> row positions, ascending
+        self.rows = data.groupby(column, sort=False, observed=True).indices
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def positions(self, key):
+        """Row positions of key in table order, None if it has no rows."""
+        return self.rows.get(key)
+
+    def get(self, key, default=None):
+        """
+        The rows of key in their original order, the same frame a ``data[data[column] == key]``
+        scan would produce; default if it has no rows.
+        """
+        rows = self.rows.get(key)
+        if rows is None:
+            return default
+        results = self.data.iloc[rows]
+        return results.reset_index(drop=True) if self.reset_index else results
+
+
+def build_group_index(data, column, reset_index=False):
+    """GroupIndex over ``column`` of ``data``, see GroupIndex."""
+    return GroupIndex(data, column, reset_index)
+
+
+class NameIndex:
+    """
+    Per-city trigram index over a name column, answering "rows of city X whose name
+    contains S" with the same rows as
+    ``data[data[name_column].astype(str).str.contains(re.escape(S)) & (data[city_column] == X)]``.
+
+    Every name of a city is split into its distinct n-grams; a query only verifies
+    the names listed under the rarest n-gram of S, so the index can not miss a match
+    and the ``in`` check keeps it exact. Substrings shorter than n are checked
+    against every name of the city.
+    """
+
+    def __init__(self, data, name_column="name", city_column="City", n=3):
+        """
+        Parameters:
+            data: DataFrame to index; lookups return rows of this frame.
+            name_column: Column matched against the substring.
+            city_column: Column the lookups are restricted by.
+            n: Gram length.
+        """
+        self.data = data
+        self.n = n
+        names = data[name_column].astype(str).tolist()
+        # city -> (row positions, names of those rows, gram -> local positions in ascending order)
+        self.cities = {}
+        for city, rows in data.groupby(city_column, sort=False, observed=True).indices.items():
+            city_names = [names[row] for row in rows]
+            postings = {}
+            for local, name in enumerate(city_names):
+                for gram in {name[i:i + n] for i in range(len(name) - n + 1)}:
+                    postings.setdefault(gram, []).append(local)
+            self.cities[city] = (rows, city_names, postings)
+
+    def positions(self, substring, city):
+        """Row positions (ascending) of the city's rows whose name contains substring."""
+        entry = self.cities.get(city)
+        if entry is None:
+            return np.empty(0, dtype=np.int64)
+        rows, names, postings = entry
+        substring = str(substring)
+        n = self.n
+        if len(substring) < n:
+            candidates = range(len(names))
+        else:
+            candidates = None
+            for i in range(len(substring) - n + 1):
+                posting = postings.get(substring[i:i + n])
+                if posting is None:
+                    return np.empty(0, dtype=np.int64)
+                if candidates is None or len(posting) < len(candidates):
+                    candidates = posting
+        hits = [local for local in candidates if substring in names[local]]
+        return rows[hits]
+
+    def lookup(self, substring, city):
+        """Rows of the city whose name contains substring, in table order (an empty frame if none)."""
+        return self.data.iloc[self.positions(substring, city)]
@@ -0,0 +1,14 @@
+import resource
+
+
+def peak_rss_mib():
+    """Peak resident set size of this process in MiB, for benchmarks measuring one configuration per process."""
+    # VmHWM starts over with the new process image, ru_maxrss keeps the peak of the parent that forked it
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
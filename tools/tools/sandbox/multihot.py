@@ -0,0 +1,87 @@
+import re
+
+import numpy as np
+
+# Characters of a list-like cell ("['Bakery', 'Desserts']") that separate its terms
+SEPARATORS = "[]'\","
+_SPLIT = re.compile("[" + re.escape(SEPARATORS) + "]")
+
+
+class MultiHotIndex:
+    """
+    Multi-hot bitsets over a list-like text column such as cuisines or subcategories.
+
+    Every cell is split at SEPARATORS into its pieces, the distinct pieces of the column
+    form the vocabulary and every row gets one bit per vocabulary piece, packed into
+    uint64 words. A query term answers ``term in cell`` exactly like the substring
+    check the evaluation does: a term without separator characters can only lie inside
+    one piece, so its rows are the rows having any piece that contains it. Terms with
+    separator characters fall back to checking the cells themselves.
+    """
+
+    def __init__(self, values):
+        """
+        Parameters:
+            values: The column (or any sequence of cells); missing cells match nothing.
+        """
+        self.values = [value if isinstance(value, str) else None for value in values]
+        self.vocabulary = {}
+        rows, ids = [], []
+        for row, value in enumerate(self.values):
+            for piece in set() if value is None else {piece for piece in _SPLIT.split(value) if piece}:
+                rows.append(row)
+                ids.append(self.vocabulary.setdefault(piece, len(self.vocabulary)))
+        self.words = max(1, (len(self.vocabulary) + 63) // 64)
+        self.bits = np.zeros((len(self.values), self.words), dtype=np.uint64)
+        ids = np.array(ids, dtype=np.int64)
+        np.bitwise_or.at(self.bits, (np.array(rows, dtype=np.int64), ids // 64),
+                         np.left_shift(np.uint64(1), (ids % 64).astype(np.uint64)))
+        # term -> words of the vocabulary pieces containing it
+        self.masks = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def mask(self, term):
+        """Bit words of the vocabulary pieces containing term, None for empty terms and terms with separator characters."""
+        if term not in self.masks:
+            if not term or any(c in SEPARATORS for c in term):
+                self.masks[term] = None
+            else:
+                mask = np.zeros(self.words, dtype=np.uint64)
+                for piece, bit in self.vocabulary.items():
+                    if term in piece:
+                        mask[bit // 64] |= np.uint64(1 << (bit % 64))
+                self.masks[term] = mask
+        return self.masks[term]
+
+    def matches(self, term, rows=None):
+        """Boolean array: whether term is a substring of each cell (of rows, all rows by default)."""
+        mask = self.mask(term)
+        if mask is None:
+            values = self.values if rows is None else [self.values[row] for row in rows]
+            return np.array([value is not None and term in value for value in values], dtype=bool)
+        bits = self.bits if rows is None else self.bits[rows]
+        return (bits & mask).any(axis=1)
+
+    def select(self, terms, rows=None, match="any"):
+        """
+        Parameters:
+            terms: Term or list of terms.
+            rows: Row positions to check, all rows by default.
+            match: 'any' (a cell containing at least one term) or 'all' (every term).
+        Returns:
+            Boolean array over rows.
+        """
+        if match not in ("any", "all"):
+            raise ValueError("match must be one of any, all")
+        terms = [terms] if isinstance(terms, str) else list(terms)
+        combine = np.logical_or if match == "any" else np.logical_and
+        result = np.full(len(self.values) if rows is None else len(rows), match == "all")
+        for term in terms:
+            result = combine(result, self.matches(term, rows))
+        return result
+
+    def terms_in(self, row, terms):
+        """The terms that are substrings of one row's cell, in the given order."""
+        return [term for term in terms if self.matches(term, [row])[0]]
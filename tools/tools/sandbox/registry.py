@@ -0,0 +1,192 @@
+"""
+Process-wide registry of the sandbox tools.
+
+Modules that used to build their own tools at import time take lazy stand-ins instead:
+
+    flight = registry.proxy("flights")
+
+The tool is built on the first attribute access of any stand-in with that name, once
+per process, and every module shares the instance. When TRIPTIDE_SHARED_SANDBOX names a
+store made by publish(), the tables are attached from it instead of loaded from disk.
+
+Callers that only use run() (and Flights.get_by_number) can ask for the sqlite backend,
+served from the TRIPTIDE_SANDBOX_DB file (see sandbox/database.py):
+
+    flight = registry.proxy("flights", backend=database.backend())
+
+database.backend() is "sqlite" with TRIPTIDE_SANDBOX_BACKEND=sqlite. Stand-ins made
+without a backend always get the pandas tools, whatever the environment says: the
+evaluation and budget estimation need their tables and in-memory indexes.
+"""
+import os
+import threading
+import time
+
+from pandas import DataFrame
+
+from tools.sandbox import database, shared
+from tools.flights.apis import Flights
+from tools.accommodations.apis import Accommodations
+from tools.restaurants.apis import Restaurants
+from tools.attractions.apis import Attractions
+from tools.events.apis import Events
+from tools.googleDistanceMatrix.apis import GoogleDistanceMatrix
+from tools.transit.apis import Transit
+
+PANDAS = "pandas"
+SQLITE = "sqlite"
+
+
+class LazyTool:
+    """Stand-in for a registered tool; attribute access (and indexing, for tables) goes to the shared instance."""
+
+    def __init__(self, registry, name, backend=PANDAS):
+        object.__setattr__(self, "_registry", registry)
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_backend", backend)
+
+    def _tool(self):
+        return self._registry.get(self._name, self._backend)
+
+    def __getattr__(self, attr):
+        return getattr(self._tool(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._tool(), attr, value)
+
+    def __getitem__(self, key):
+        return self._tool()[key]
+
+    def __len__(self):
+        return len(self._tool())
+
+    def __repr__(self):
+        state = "loaded" if self._registry.is_loaded(self._name, self._backend) else "not loaded"
+        return f"<LazyTool {self._name} {self._backend} ({state})>"
+
+
+class SandboxRegistry:
+    def __init__(self):
+        self.factories = {}
+        self.database_factories = {}
+        # (name, backend) -> tool
+        self.instances = {}
+        # name (name:sqlite for the database variant) -> {"seconds": build time, "source": "shared", "disk" or "sqlite"}
+        self.stats = {}
+        self.lock = threading.RLock()
+        self.shared_tables = None
+        self.database = None
+
+    def register(self, name, factory, database_factory=None):
+        """
+        Parameters:
+            name: Registry name, also the table name in a shared store and a compiled database.
+            factory: Function taking the shared table (None without a store) and returning the tool.
+            database_factory: Optional function taking a SandboxDatabase and returning the tool,
+                used for callers asking for the sqlite backend.
+        """
+        with self.lock:
+            self.factories[name] = factory
+            if database_factory is not None:
+                self.database_factories[name] = database_factory
+
+    def proxy(self, name, backend=PANDAS):
+        """
+        Lazy stand-in for the tool registered under name.
+        Parameters:
+            backend: PANDAS, or SQLITE for callers that only use run() (and
+                Flights.get_by_number); tools without a database variant stay pandas.
+        """
+        if name not in self.factories:
+            raise KeyError(f"Unknown sandbox tool {name}")
+        if backend not in (PANDAS, SQLITE):
+            raise ValueError(f"backend must be {PANDAS} or {SQLITE}")
+        return LazyTool(self, name, backend)
+
+    def _backend(self, name, backend):
+        return SQLITE if backend == SQLITE and name in self.database_factories else PANDAS
+
+    def is_loaded(self, name, backend=PANDAS):
+        return (name, self._backend(name, backend)) in self.instances
+
+    def _shared_table(self, name):
+        if self.shared_tables is None:
+            self.shared_tables = shared.attach() if os.environ.get(shared.STORE_ENV) else {}
+        return self.shared_tables.get(name)
+
+    def _database(self):
+        if self.database is None:
+            path = os.environ.get(database.DATABASE_ENV)
+            if not path:
+                raise ValueError(f"The sqlite sandbox backend needs {database.DATABASE_ENV} set to a compiled database")
+            self.database = database.SandboxDatabase(path)
+        return self.database
+
+    def get(self, name, backend=PANDAS):
+        """The tool registered under name for backend (see proxy()), built on the first call."""
+        key = (name, self._backend(name, backend))
+        instance = self.instances.get(key)
+        if instance is not None:
+            return instance
+        with self.lock:
+            # another thread may have built it while this one waited
+            if key in self.instances:
+                return self.instances[key]
+            start = time.perf_counter()
+            if key[1] == SQLITE:
+                instance = self.database_factories[name](self._database())
+                self.stats[f"{name}:{SQLITE}"] = {"seconds": time.perf_counter() - start, "source": SQLITE}
+            else:
+                table = self._shared_table(name)
+                instance = self.factories[name](table)
+                self.stats[name] = {"seconds": time.perf_counter() - start,
+                                    "source": "shared" if table is not None else "disk"}
+            self.instances[key] = instance
+            return instance
+
+    def memory_footprint(self, name):
+        """Bytes held by the pandas tool's table (deep, so strings are counted), None if it is not loaded."""
+        instance = self.instances.get((name, PANDAS))
+        if instance is None:
+            return None
+        data = instance if isinstance(instance, DataFrame) else getattr(instance, "data", None)
+        if not isinstance(data, DataFrame):
+            return None
+        return int(data.memory_usage(deep=True).sum())
+
+    def report(self):
+        """Print build time, source and table memory of every loaded tool."""
+        for name, stats in self.stats.items():
+            footprint = self.memory_footprint(name)
+            memory = "-" if footprint is None else f"{footprint / 2 ** 20:.1f} MiB"
+            print(f"{name:<20} {stats['seconds']:8.3f}s  {stats['source']:<6}  {memory}")
+
+    def publish(self, names=None, directory=None):
+        """Load the named tools (all registered ones by default) and publish their tables to a shared store."""
+        names = list(self.factories) if names is None else names
+        return shared.publish({name: self.get(name) for name in names}, directory)
+
+    def compile_database(self, path, names=None):
+        """Load the named tools (all with a database variant by default) and compile their tables into path."""
+        names = list(self.database_factories) if names is None else names
+        return database.compile_database({name: self.factories[name](None) for name in names}, path)
+
+
+def _flights_db(data):
+    # budget estimation works on the load_db() variant of the flights table
+    if data is not None:
+        return Flights(data=data)
+    flights = Flights()
+    flights.load_db()
+    return flights
+
+
+registry = SandboxRegistry()
+registry.register("flights", lambda data: Flights(data=data), database.DatabaseFlights)
+registry.register("flights_db", _flights_db)
+registry.register("accommodations", lambda data: Accommodations(data=data), database.DatabaseAccommodations)
+registry.register("restaurants", lambda data: Restaurants(data=data), database.DatabaseRestaurants)
+registry.register("attractions", lambda data: Attractions(data=data), database.DatabaseAttractions)
+registry.register("events", lambda data: Events(data=data), database.DatabaseEvents)
+registry.register("googleDistanceMatrix", lambda data: GoogleDistanceMatrix(data=data))
+registry.register("transit", lambda data: Transit(data=data))
@@ -0,0 +1,138 @@
+"""
+Read-only sandbox tables shared between worker processes.
+
+The parent loads the tool tables once and publishes them as uncompressed Arrow IPC
+files (in /dev/shm when available). Workers attach by memory-mapping those files:
+numeric and date columns come back as numpy views of the mapping, long string columns
+as Arrow-backed pandas strings over the same buffers, and low-cardinality string
+columns as categoricals over one interned dictionary. Every worker therefore shares
+one copy of the data instead of loading its own.
+
+    # parent
+    store = publish({"flights": Flights(), "accommodations": Accommodations()})
+    os.environ[STORE_ENV] = store
+
+    # worker
+    tables = attach()
+    flights = Flights(data=tables["flights"])
+"""
+import json
+import os
+import shutil
+import tempfile
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+    import pandas as pd
+except ImportError:  # pyarrow is optional, without it every worker loads its own tables
+    pa = None
+
+# Workers find the store through this variable when attach() is called without a directory
+STORE_ENV = "TRIPTIDE_SHARED_SANDBOX"
+MANIFEST = "manifest.json"
+
+# String columns with at most this ratio of distinct values are stored dictionary-encoded
+DICTIONARY_RATIO = 0.5
+
+
+def default_store_root():
+    """/dev/shm on Linux, so the published files never touch a disk; the temp directory otherwise."""
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+    return tempfile.gettempdir()
+
+
+def _is_string(arrow_type):
+    # pandas >= 2.2 stores string[pyarrow] columns as large_string
+    return pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type)
+
+
+def _to_arrow(data):
+    table = pa.Table.from_pandas(data, preserve_index=True)
+    columns = []
+    for column in table.columns:
+        if _is_string(column.type) and len(column):
+            distinct = pc.count_distinct(column, mode="all").as_py()
+            if distinct <= DICTIONARY_RATIO * len(column):
+                column = column.dictionary_encode()
+        columns.append(column)
+    # the pandas metadata restores the index and column order on the worker side
+    return pa.Table.from_arrays(columns, names=table.schema.names).replace_schema_metadata(table.schema.metadata)
+
+
+def publish(tables, directory=None):
+    """
+    Write tables into a shared store.
+    Parameters:
+        tables: Dict name -> DataFrame, or -> tool instance (its ``data`` is published).
+        directory: Store directory, created under default_store_root() if not given.
+    Returns:
+        The store directory, to be passed to attach() (or set as STORE_ENV) in workers.
+    """
+    if pa is None:
+        raise ImportError("pyarrow is required for a shared sandbox store")
+    if directory is None:
+        directory = tempfile.mkdtemp(prefix="triptide-sandbox-", dir=default_store_root())
+    os.makedirs(directory, exist_ok=True)
+
+    manifest = {"tables": {}}
+    for name, data in tables.items():
+        data = getattr(data, "data", data)
+        try:
+            table = _to_arrow(data)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise ValueError(f"Can not share table {name}: {e}")
+        file_name = f"{name}.arrow"
+        with pa.OSFile(os.path.join(directory, file_name), "wb") as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        size = os.path.getsize(os.path.join(directory, file_name))
+        manifest["tables"][name] = {"file": file_name, "rows": table.num_rows, "bytes": size}
+        print(f"Published {name}: {table.num_rows} rows, {size / 2 ** 20:.1f} MiB")
+
+    # the manifest goes last, so a worker never attaches to a half-written store
+    tmp_path = os.path.join(directory, f"{MANIFEST}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST))
+    return directory
+
+
+def _pandas_type(arrow_type):
+    # plain strings stay in the mapped Arrow buffers instead of becoming Python objects,
+    # with the dtype compact() gives them, so attached and loaded tables look the same
+    if _is_string(arrow_type):
+        return pd.StringDtype("pyarrow")
+    return None
+
+
+def attach(directory=None):
+    """
+    Map the tables of a published store.
+    Parameters:
+        directory: Store directory returned by publish(); defaults to the STORE_ENV variable.
+    Returns:
+        Dict name -> read-only DataFrame backed by the shared files.
+    """
+    if pa is None:
+        raise ImportError("pyarrow is required for a shared sandbox store")
+    directory = directory or os.environ.get(STORE_ENV)
+    if not directory:
+        raise ValueError(f"No shared sandbox store given and {STORE_ENV} is not set")
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+
+    tables = {}
+    for name, entry in manifest["tables"].items():
+        source = pa.memory_map(os.path.join(directory, entry["file"]), "r")
+        table = ipc.open_file(source).read_all()
+        # split_blocks keeps every column its own block, so pandas does not consolidate (copy) them
+        tables[name] = table.to_pandas(split_blocks=True, types_mapper=_pandas_type)
+    return tables
+
+
+def release(directory):
+    """Delete a store. Workers that still have it attached keep their mappings until they exit."""
+    shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,141 @@
+import functools
+import hashlib
+import inspect
+import os
+import sys
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional, without it every load parses the CSV
+    pa = None
+    feather = None
+
+# Snapshots live outside the database directory, so a read-only sandbox is fine.
+SNAPSHOT_DIR = os.environ.get(
+    "TRIPTIDE_SNAPSHOT_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "triptide", "snapshots"),
+)
+# Bump when the snapshot file layout changes
+SNAPSHOT_FORMAT_VERSION = "3"
+
+# module-level settings a prepare function reads (column lists, ratios) go into its fingerprint
+_CONFIG_TYPES = (str, int, float, bool, tuple, list, dict, frozenset)
+
+# One entry per loaded table: {"rows", "seconds", "source", "snapshot"}
+load_stats = {}
+
+
+def snapshot_enabled():
+    return feather is not None and os.environ.get("TRIPTIDE_SNAPSHOT", "1") != "0"
+
+
+@functools.lru_cache(maxsize=None)
+def _module_fingerprint(module_name):
+    """Hash of a module's source, empty if it cannot be read (e.g. only bytecode shipped)."""
+    module = sys.modules.get(module_name)
+    try:
+        source = inspect.getsource(module)
+    except (OSError, TypeError):
+        return ""
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+
+def _prepare_fingerprint(prepare):
+    """
+    Identify the preparation step, so changing it invalidates old snapshots: its own code,
+    the module-level settings it reads (e.g. TEXT_COLUMNS) and the source of the modules
+    of other functions it calls (e.g. sandbox/compact.py).
+    """
+    if prepare is None:
+        return "raw"
+    code = prepare.__code__
+    parts = [prepare.__module__, prepare.__qualname__, code.co_code.hex(), repr(code.co_consts), repr(code.co_names)]
+    for name in sorted(set(code.co_names)):
+        value = prepare.__globals__.get(name)
+        if isinstance(value, _CONFIG_TYPES):
+            parts.append(f"{name}={value!r}")
+        elif inspect.isfunction(value) and value.__module__ != prepare.__module__:
+            parts.append(f"{value.__module__}:{_module_fingerprint(value.__module__)}")
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def snapshot_path(path, prepare=None):
+    """Snapshot file for ``path`` keyed by its absolute path, mtime, size and preparation step."""
+    stat = os.stat(path)
+    key = "|".join([
+        os.path.abspath(path),
+        str(stat.st_mtime_ns),
+        str(stat.st_size),
+        _prepare_fingerprint(prepare),
+        SNAPSHOT_FORMAT_VERSION,
+    ])
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(SNAPSHOT_DIR, f"{name}-{digest}.feather")
+
+
+def _read_snapshot(snapshot):
+    # Memory-mapping spares reading the file into an intermediate buffer, but
+    # to_pandas() still copies every column into pandas' own blocks.
+    table = feather.read_table(snapshot, memory_map=True)
+    # compacted string columns are recorded as "string", keep them Arrow-backed
+    with pd.option_context("mode.string_storage", "pyarrow"):
+        return table.to_pandas()
+
+
+def _write_snapshot(data, snapshot):
+    os.makedirs(os.path.dirname(snapshot), exist_ok=True)
+    table = pa.Table.from_pandas(data, preserve_index=True)
+    tmp_path = f"{snapshot}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, snapshot)
+
+
+def load_csv(path, prepare=None):
+    """
+    Load a sandbox CSV through the snapshot cache.
+
+    Parameters:
+        path: CSV file to read.
+        prepare: Optional function taking the raw ``pd.read_csv`` frame and returning
+            the frame to keep (column subset, dropna, dtype conversions). The snapshot
+            stores the prepared frame, so later loads skip both parsing and preparation.
+    Returns:
+        The prepared DataFrame, identical (columns, dtypes and index) to what
+        ``prepare(pd.read_csv(path))`` returns.
+    """
+    start = time.perf_counter()
+    snapshot = snapshot_path(path, prepare) if snapshot_enabled() else None
+    source = "csv"
+    data = None
+
+    if snapshot is not None and os.path.exists(snapshot):
+        try:
+            data = _read_snapshot(snapshot)
+            source = "snapshot"
+        except Exception as e:
+            print(f"Ignoring unreadable snapshot {snapshot}: {e}")
+
+    if data is None:
+        data = pd.read_csv(path)
+        if prepare is not None:
+            data = prepare(data)
+        if snapshot is not None:
+            try:
+                _write_snapshot(data, snapshot)
+            except Exception as e:
+                print(f"Could not write snapshot for {path}: {e}")
+
+    elapsed = time.perf_counter() - start
+    load_stats[os.path.abspath(path)] = {
+        "rows": len(data),
+        "seconds": elapsed,
+        "source": source,
+        "snapshot": snapshot,
+    }
+    print(f"{os.path.basename(path)}: {len(data)} rows from {source} in {elapsed:.3f}s")
+    return data
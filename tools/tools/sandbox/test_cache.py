@@ -0,0 +1,89 @@
+import pandas as pd
+import pytest
+
+from tools.sandbox import cache
+from tools.sandbox.cache import cached, clear_cache
+
+QUERIES = {
+    "accommodations": ("Austin",),
+    "restaurants": ("Austin",),
+    "attractions": ("Austin",),
+    "events": ("Austin", ["2024-11-01", "2024-11-30"]),
+}
+
+
+def query(tools, name):
+    if name == "flights":
+        # the route and date with most flights
+        data = tools["flights"].data
+        return data.groupby(["OriginCityName", "DestCityName", "FlightDate"], observed=True).size().idxmax()
+    return QUERIES.get(name, ("Austin", "Dallas"))
+
+
+def mutate(results):
+    """What a careless caller might do to a result frame."""
+    results.iloc[0, 0] = "changed" if results.dtypes.iloc[0] != float else -1.0
+    for column in results.columns:
+        if isinstance(results[column].dtype, pd.StringDtype):
+            results.loc[results.index[0], column] = "changed"
+    results["added"] = 1
+    results.drop(results.index[-1], inplace=True)
+
+
+@pytest.mark.parametrize("size", ["4096", "0"])
+@pytest.mark.parametrize("name", ["flights"] + list(QUERIES))
+def test_mutating_results_leaves_later_lookups_alone(sandbox_tools, monkeypatch, name, size):
+    monkeypatch.setenv(cache.SIZE_ENV, size)
+    tool = sandbox_tools[name]
+    args = query(sandbox_tools, name)
+    first = tool.run(*args)
+    assert isinstance(first, pd.DataFrame) and len(first) > 1
+    expected = first.copy(deep=True)
+    mutate(first)
+    pd.testing.assert_frame_equal(tool.run(*args), expected)
+    # the table itself is untouched too
+    assert "changed" not in tool.data.astype(str).values
+
+
+def test_run_counters(sandbox_tools):
+    before = cache.report()
+    for name in ("flights", "accommodations", "restaurants", "attractions", "googleDistanceMatrix"):
+        tool = sandbox_tools[name]
+        args = query(sandbox_tools, name)
+        tool.run(*args)
+        tool.run(*args)
+    after = cache.report()
+    for counter in ("Flights.run", "Accommodations.run", "Restaurants.run", "Attractions.run", "GoogleDistanceMatrix.run"):
+        old = before.get(counter, {"hits": 0, "misses": 0})
+        assert after[counter]["misses"] - old["misses"] == 1
+        assert after[counter]["hits"] - old["hits"] == 1
+
+
+class Lookup:
+    def __init__(self):
+        self.calls = 0
+
+    @cached("test.Lookup.run", maxsize=2)
+    def run(self, key, options=None):
+        self.calls += 1
+        return {"key": key, "calls": self.calls}
+
+
+def test_lru_eviction_and_clear():
+    lookup = Lookup()
+    lookup.run("a")
+    lookup.run("b")
+    lookup.run("a")
+    lookup.run("c")  # evicts b, the least recently used
+    assert lookup.calls == 3
+    lookup.run("a")
+    assert lookup.calls == 3
+    lookup.run("b")
+    assert lookup.calls == 4
+    # lists are keyed as tuples, results handed out as copies
+    result = lookup.run("d", options=["x"])
+    result["key"] = "changed"
+    assert lookup.run("d", options=["x"])["key"] == "d"
+    clear_cache(lookup)
+    lookup.run("d", options=["x"])
+    assert lookup.calls == 6
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import sample_tables
+from tools.sandbox.compact import compact, compaction_stats
+from tools.sandbox.index import GroupIndex, NameIndex
+from tools.accommodations.apis import Accommodations
+from tools.restaurants.apis import Restaurants
+from tools.attractions.apis import Attractions
+from tools.events.apis import Events
+from tools.flights.apis import Flights
+from tools.transit.apis import Transit
+
+
+def assert_same_values(compacted, original):
+    assert list(compacted.columns) == list(original.columns)
+    pd.testing.assert_index_equal(compacted.index, original.index)
+    for i in range(original.shape[1]):
+        before, after = original.iloc[:, i], compacted.iloc[:, i]
+        assert after.isna().tolist() == before.isna().tolist()
+        assert after.dropna().astype(object).tolist() == before.dropna().tolist()
+
+
+@pytest.mark.parametrize("name", ["flights", "accommodations", "restaurants", "attractions", "events",
+                                  "googleDistanceMatrix"])
+def test_compact_keeps_values(name):
+    original = sample_tables()[name]
+    compacted = compact(original, f"test {name}")
+    assert_same_values(compacted, original)
+    assert compaction_stats[f"test {name}"]["after"] <= compaction_stats[f"test {name}"]["before"]
+
+
+def test_column_types():
+    data = pd.DataFrame({"city": ["Austin", "Dallas"] * 50, "name": [f"Place {i}" for i in range(100)],
+                         "note": [None, "x"] + [f"n{i}" for i in range(98)], "count": np.arange(100, dtype=np.int64),
+                         "big": np.arange(100, dtype=np.int64) * 2 ** 40, "price": np.linspace(0, 1, 100)})
+    compacted = compact(data, text_columns=("city",))
+    assert compacted["city"].dtype == pd.StringDtype("pyarrow")
+    assert compact(data)["city"].dtype == "category"
+    assert compacted["name"].dtype == pd.StringDtype("pyarrow")
+    # missing values keep object strings, so comparisons still see None
+    assert compacted["note"].dtype == object
+    assert compacted["count"].dtype == np.int32
+    assert compacted["big"].dtype == np.int64
+    assert compacted["price"].dtype == np.float64
+    assert data["count"].dtype == np.int64
+    assert_same_values(compacted, data)
+
+
+def test_duplicate_column_names():
+    data = pd.DataFrame([["F1", 1, "F1"], ["F2", 2, "F2"]], columns=["Flight Number", "Price", "Flight Number"])
+    compacted = compact(data)
+    assert list(compacted.columns) == ["Flight Number", "Price", "Flight Number"]
+    assert_same_values(compacted, data)
+
+
+def test_subset_of_compacted_table_knows_no_dropped_city(sandbox_tools):
+    # categorical columns keep every category after filtering, the indexes must only list cities with rows
+    for name, cls in [("accommodations", Accommodations), ("restaurants", Restaurants), ("attractions", Attractions)]:
+        data = sandbox_tools[name].data
+        assert data["City"].dtype == "category"
+        subset = data[data["City"] != "Austin"]
+        assert "Austin" not in GroupIndex(subset, "City") and "Austin" not in NameIndex(subset).cities
+        tool = cls(data=subset)
+        assert isinstance(tool.run("Austin"), str)
+        assert not isinstance(tool.run("Dallas"), str)
+
+    data = sandbox_tools["events"].data
+    events = Events(data=data[data["city"] != "Austin"].iloc[::2])
+    assert "Austin" not in events.city_dates
+    assert events.run("Austin", ["2024-11-01", "2024-11-30"]) == \
+        "There are no events in this city for the given date range."
+    assert events.count_by_segment("Austin", ["2024-11-01", "2024-11-30"]) == {}
+
+    data = sandbox_tools["flights"].data
+    flights = Flights(data=data[data["OriginCityName"] != "Austin"])
+    assert all(len(orders[0]) for orders in flights.route_date_orders.values())
+    assert isinstance(flights.run("Austin", "Dallas", "2024-11-01"), str)
+    assert flights.top_k("Austin", "Dallas", "2024-11-01").empty
+
+
+def test_subset_of_compacted_transit_table():
+    pois = pd.DataFrame({"PoI": [f"Place {i}" for i in range(40)], "City": ["Austin", "Dallas"] * 20,
+                         "latitude": np.linspace(30.2, 30.4, 40), "longitude": np.linspace(-97.9, -97.6, 40),
+                         "nearest_stop_name": [f"Stop {i % 5}" for i in range(40)],
+                         "nearest_stop_latitude": 30.3, "nearest_stop_longitude": -97.7,
+                         "nearest_stop_distance": 100.0})
+    data = compact(pois, category_ratio=1.0)
+    assert data["PoI"].dtype == "category" and data["City"].dtype == "category"
+    transit = Transit(data=data[data["City"] == "Dallas"])
+    assert all(len(rows) for rows in transit.poi_index.values())
+    assert transit.poi_stop("Place 0", "Austin") is None
+    assert transit.nearest_to_poi("Place 0", "Austin") == []
+    assert transit.poi_stop("Place 1", "Dallas") == ("Stop 1", 100.0)
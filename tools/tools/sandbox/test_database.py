@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+from tools.sandbox import database
+from tools.sandbox.registry import SandboxRegistry, PANDAS, SQLITE
+
+
+@pytest.fixture
+def compiled(sandbox_tools, tmp_path):
+    names = ("flights", "accommodations", "restaurants", "attractions", "events")
+    path = database.compile_database({name: sandbox_tools[name] for name in names}, str(tmp_path / "sandbox.sqlite"))
+    db = database.SandboxDatabase(path)
+    yield path, db
+    db.close()
+
+
+def test_city_tools_match_pandas(sandbox_tools, compiled):
+    _, db = compiled
+    for name, cls in [("accommodations", database.DatabaseAccommodations), ("restaurants", database.DatabaseRestaurants),
+                      ("attractions", database.DatabaseAttractions)]:
+        tool = cls(db)
+        for city in ["Austin", "Albany", "Atlantis"]:
+            expected = sandbox_tools[name].run(city)
+            if isinstance(expected, str):
+                assert tool.run(city) == expected
+            else:
+                pd.testing.assert_frame_equal(tool.run(city), expected)
+
+
+def test_flights_and_events_match_pandas(sandbox_tools, compiled):
+    _, db = compiled
+    flights, db_flights = sandbox_tools["flights"], database.DatabaseFlights(db)
+    for key in list(flights.route_date_index)[:10]:
+        pd.testing.assert_frame_equal(db_flights.run(*key), flights.run(*key))
+    events, db_events = sandbox_tools["events"], database.DatabaseEvents(db)
+    for city in ["Austin", "Fresno"]:
+        pd.testing.assert_frame_equal(db_events.run(city, ["2024-11-05", "2024-11-20"]),
+                                      events.run(city, ["2024-11-05", "2024-11-20"]))
+
+
+def test_get_by_number_matches_pandas(sandbox_tools, compiled):
+    _, db = compiled
+    flights, db_flights = sandbox_tools["flights"], database.DatabaseFlights(db)
+    # the sample table reuses its first 200 flight numbers on other routes
+    repeated = flights.data["Flight Number"].value_counts()
+    number = repeated.index[repeated > 1][0]
+    row = flights.get_by_number(number).iloc[-1]
+    for origin, destination in [(None, None), (row["OriginCityName"], None), (None, row["DestCityName"]),
+                                (row["OriginCityName"], row["DestCityName"]), ("Atlantis", None)]:
+        expected = flights.get_by_number(number, origin, destination)
+        pd.testing.assert_frame_equal(db_flights.get_by_number(number, origin, destination), expected)
+    assert len(db_flights.get_by_number(number)) > 1
+
+
+def test_backend_only_for_callers_asking(sandbox_tools, compiled, monkeypatch):
+    path, _ = compiled
+    monkeypatch.setenv(database.BACKEND_ENV, "sqlite")
+    monkeypatch.setenv(database.DATABASE_ENV, path)
+    registry = SandboxRegistry()
+    registry.register("flights", lambda data: sandbox_tools["flights"], database.DatabaseFlights)
+    registry.register("googleDistanceMatrix", lambda data: sandbox_tools["googleDistanceMatrix"])
+
+    # the environment alone does not switch a stand-in to the database variant
+    assert registry.proxy("flights").data is sandbox_tools["flights"].data
+    assert isinstance(registry.get("flights", backend=database.backend()), database.DatabaseFlights)
+    # no database variant: the pandas tool, for either backend
+    assert registry.get("googleDistanceMatrix", SQLITE) is registry.get("googleDistanceMatrix", PANDAS)
+    assert registry.is_loaded("flights", SQLITE) and registry.is_loaded("flights")
+    with pytest.raises(ValueError):
+        registry.proxy("flights", backend="postgres")
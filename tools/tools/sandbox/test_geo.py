@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from tools.sandbox.geo import GridIndex, haversine_km
+
+
+def random_points(seed, n, lat_range, lon_range, missing=0.0):
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(*lat_range, n)
+    lon = rng.uniform(*lon_range, n)
+    lat[rng.random(n) < missing] = np.nan
+    return lat, lon
+
+
+def brute_nearest(lat, lon, qlat, qlon, k):
+    distances = haversine_km(qlat, qlon, lat, lon)
+    distances = distances[np.isfinite(distances)]
+    return np.sort(distances)[:k]
+
+
+# a city, a state, and points far north where grid cells narrow
+AREAS = [((30.2, 30.4), (-97.9, -97.6)), ((26.0, 36.0), (-106.0, -94.0)), ((60.0, 70.0), (-150.0, -140.0))]
+
+
+@pytest.mark.parametrize("area", AREAS)
+@pytest.mark.parametrize("cell_km", [0.5, 5.0])
+def test_nearest_matches_brute_force(area, cell_km):
+    lat, lon = random_points(0, 2000, *area, missing=0.02)
+    grid = GridIndex(lat, lon, cell_km)
+    assert len(grid) == np.isfinite(lat).sum()
+    queries = zip(*random_points(1, 50, (area[0][0] - 1, area[0][1] + 1), (area[1][0] - 1, area[1][1] + 1)))
+    for qlat, qlon in queries:
+        for k in (1, 5, 40):
+            ids, distances = grid.nearest(qlat, qlon, k)
+            np.testing.assert_allclose(distances, brute_nearest(lat, lon, qlat, qlon, k))
+            np.testing.assert_allclose(distances, haversine_km(qlat, qlon, lat[ids], lon[ids]))
+
+
+@pytest.mark.parametrize("area", AREAS)
+@pytest.mark.parametrize("radius_km", [0.3, 2.0, 50.0])
+def test_within_matches_brute_force(area, radius_km):
+    lat, lon = random_points(2, 2000, *area, missing=0.02)
+    grid = GridIndex(lat, lon, 1.0)
+    for qlat, qlon in zip(*random_points(3, 30, *area)):
+        ids, distances = grid.within(qlat, qlon, radius_km)
+        all_distances = haversine_km(qlat, qlon, lat, lon)
+        expected = np.flatnonzero(all_distances <= radius_km)
+        assert sorted(ids.tolist()) == expected.tolist()
+        assert np.all(np.diff(distances) >= 0)
+
+
+def test_empty_and_oversized_queries():
+    grid = GridIndex([np.nan], [np.nan])
+    assert len(grid) == 0
+    assert grid.nearest(30.0, -97.0, 3)[0].size == 0
+    assert grid.within(30.0, -97.0, 10.0)[0].size == 0
+    lat, lon = random_points(4, 10, *AREAS[0])
+    ids, _ = GridIndex(lat, lon).nearest(30.3, -97.7, k=50)
+    assert sorted(ids.tolist()) == list(range(10))
@@ -0,0 +1,89 @@
+import re
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from tools.sandbox import shared
+from tools.sandbox.index import GroupIndex, NameIndex
+from tools.accommodations.apis import Accommodations
+from tools.restaurants.apis import Restaurants
+from tools.attractions.apis import Attractions
+from tools.events.apis import Events
+from tools.flights.apis import Flights
+
+
+def test_group_index_matches_scan(sandbox_tools):
+    data = sandbox_tools["restaurants"].data
+    index = GroupIndex(data, "City")
+    assert set(index) == set(data["City"].unique())
+    for city in index:
+        pd.testing.assert_frame_equal(index.get(city), data[data["City"] == city])
+    assert index.get("Atlantis") is None
+    reset = GroupIndex(data, "City", reset_index=True)
+    pd.testing.assert_frame_equal(reset.get("Austin"), data[data["City"] == "Austin"].reset_index(drop=True))
+
+
+def test_group_index_multiple_columns(sandbox_tools):
+    data = sandbox_tools["flights"].data
+    index = GroupIndex(data, ["OriginCityName", "DestCityName", "FlightDate"])
+    for key in list(index)[:20]:
+        origin, destination, date = key
+        expected = data[(data["OriginCityName"] == origin) & (data["DestCityName"] == destination)
+                        & (data["FlightDate"] == date)]
+        pd.testing.assert_frame_equal(index.get(key), expected)
+
+
+@pytest.mark.parametrize("substring", ["Resto 1", "sto 2", "7", "Resto 3999", ""])
+def test_name_index_matches_scan(sandbox_tools, substring):
+    data = sandbox_tools["restaurants"].data
+    index = NameIndex(data, "name", "City")
+    for city in ["Austin", "Fresno", "Atlantis"]:
+        expected = data[data["name"].astype(str).str.contains(re.escape(substring)) & (data["City"] == city)]
+        pd.testing.assert_frame_equal(index.lookup(substring, city), expected)
+
+
+def test_tool_runs_match_scans(sandbox_tools):
+    for name in ("accommodations", "restaurants", "attractions"):
+        tool = sandbox_tools[name]
+        for city in ["Austin", "Buffalo", "San Diego"]:
+            expected = tool.data[tool.data["City"] == city]
+            if name == "attractions":
+                expected = expected.reset_index(drop=True)
+            pd.testing.assert_frame_equal(tool.run(city), expected)
+        assert isinstance(tool.run("Atlantis"), str)
+
+
+def test_events_run_matches_scan(sandbox_tools):
+    events = sandbox_tools["events"]
+    data = events.data
+    for city, date_range in [("Austin", ["2024-11-03", "2024-11-12"]), ("Albany", ["2024-11-01", "2024-11-30"])]:
+        expected = data[(data["city"] == city) & (data["dateTitle"] >= date_range[0])
+                        & (data["dateTitle"] <= date_range[1])].reset_index(drop=True)
+        pd.testing.assert_frame_equal(events.run(city, date_range), expected)
+    assert isinstance(events.run("Austin", ["2025-01-01", "2025-01-02"]), str)
+
+
+def test_attached_tables_keep_compact_dtypes(sandbox_tools, tmp_path):
+    tables = {name: sandbox_tools[name].data for name in ("restaurants", "events")}
+    attached = shared.attach(shared.publish(tables, str(tmp_path / "store")))
+    for name, data in tables.items():
+        for column in data.columns:
+            if data[column].dtype == pd.StringDtype("pyarrow"):
+                assert attached[name][column].dtype == pd.StringDtype("pyarrow")
+        pd.testing.assert_frame_equal(attached[name], data, check_categorical=False)
+
+
+def test_tools_on_attached_tables_copy_nothing(sandbox_tools, tmp_path):
+    classes = {"flights": Flights, "accommodations": Accommodations, "restaurants": Restaurants,
+               "attractions": Attractions, "events": Events}
+    tables = {name: sandbox_tools[name].data for name in classes}
+    attached = shared.attach(shared.publish(tables, str(tmp_path / "store")))
+    for name, cls in classes.items():
+        before = pa.total_allocated_bytes()
+        tool = cls(data=attached[name])
+        # the per-city indexes hold row positions, not slices of the mapped table
+        assert pa.total_allocated_bytes() == before, name
+        for value in vars(tool).values():
+            if isinstance(value, dict):
+                assert not any(isinstance(entry, pd.DataFrame) for entry in value.values()), name
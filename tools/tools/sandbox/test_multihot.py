@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.sandbox.multihot import MultiHotIndex
+
+CELLS = ["['Bakery', 'Desserts']", "['Italian', 'Pizza', 'Fast Food']", "['Chinese']", np.nan, "",
+         "Cafe, Desserts", "['Fine Dining', 'Italian']", None, "['Seafood', 'Mediterranean']"] * 9 + \
+        [str([f"Cuisine {i}", f"Style {i % 7}"]) for i in range(150)]
+TERMS = ["Italian", "Dessert", "Pizza", "Fast Food", "a", "Cuisine 1", "Cuisine 149", "Style 3", "Sushi",
+         "'Bakery'", "Bakery, Desserts", "Cafe, D", "[", ""]
+
+
+def scan(cells, term):
+    return np.array([isinstance(cell, str) and term in cell for cell in cells])
+
+
+@pytest.fixture(scope="module")
+def index():
+    return MultiHotIndex(CELLS)
+
+
+def test_vocabulary_spans_several_words(index):
+    assert len(index.vocabulary) > 64 and index.words > 1
+
+
+@pytest.mark.parametrize("term", TERMS)
+def test_matches_substring_check(index, term):
+    np.testing.assert_array_equal(index.matches(term), scan(CELLS, term))
+    rows = np.arange(0, len(CELLS), 3)
+    np.testing.assert_array_equal(index.matches(term, rows), scan([CELLS[row] for row in rows], term))
+
+
+@pytest.mark.parametrize("terms", [["Italian", "Pizza"], ["Dessert", "Sushi"], "Chinese", ["Style 3", "Cuisine 10"]])
+def test_select_any_and_all(index, terms):
+    listed = [terms] if isinstance(terms, str) else terms
+    checks = np.array([scan(CELLS, term) for term in listed])
+    np.testing.assert_array_equal(index.select(terms), checks.any(axis=0))
+    np.testing.assert_array_equal(index.select(terms, match="all"), checks.all(axis=0))
+    with pytest.raises(ValueError):
+        index.select(terms, match="most")
+
+
+def test_terms_in(index):
+    assert index.terms_in(1, ["Pizza", "Sushi", "Italian"]) == ["Pizza", "Italian"]
+    assert index.terms_in(3, ["Pizza"]) == []
+
+
+def test_tool_searches_match_scan(sandbox_tools):
+    restaurants, attractions = sandbox_tools["restaurants"], sandbox_tools["attractions"]
+    data = restaurants.data
+    for cuisines in (["Pizza", "Cafe"], ["Dessert"], ["Indian", "BBQ"]):
+        any_rows = data[np.array([any(c in value for c in cuisines) for value in data["cuisines"]])]
+        pd.testing.assert_frame_equal(restaurants.search(cuisines=cuisines), any_rows)
+        city_rows = data[(data["City"] == "Austin")
+                         & np.array([all(c in value for c in cuisines) for value in data["cuisines"]])]
+        pd.testing.assert_frame_equal(restaurants.search("Austin", cuisines, match="all"), city_rows)
+    # what the evaluation did: the cuisines found in the first restaurant the name matches
+    terms = ["Pizza", "Italian", "Cafe", "Seafood"]
+    for row in data.head(20).itertuples(index=False):
+        first = restaurants.find_by_name(row.name, row.City).iloc[0]
+        assert restaurants.cuisines_of(row.name, row.City, terms) == [c for c in terms if c in first["cuisines"]]
+
+    sights = attractions.data
+    expected = sights[(sights["City"] == "Dallas") & sights["subcategories"].str.contains("Parks", regex=False)]
+    pd.testing.assert_frame_equal(attractions.search("Dallas", "Parks"), expected)
+    assert attractions.subcategories_of("Atlantis", "Dallas", ["Parks"]) == []
@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+from tools.sandbox.registry import LazyTool, SandboxRegistry
+from tools.flights.apis import Flights
+from tools.restaurants.apis import Restaurants
+
+
+@pytest.fixture
+def sandbox(sandbox_csvs):
+    registry = SandboxRegistry()
+    builds = []
+
+    def factory(cls, name):
+        def build(data):
+            builds.append(name)
+            return cls(sandbox_csvs[name]) if data is None else cls(data=data)
+        return build
+
+    registry.register("flights", factory(Flights, "flights"))
+    registry.register("restaurants", factory(Restaurants, "restaurants"))
+    return registry, builds
+
+
+def test_tools_are_built_on_first_use(sandbox):
+    registry, builds = sandbox
+    flight, other = registry.proxy("flights"), registry.proxy("flights")
+    assert isinstance(flight, LazyTool) and builds == []
+    assert "not loaded" in repr(flight)
+    assert len(flight.data) == 800
+    assert other.data is flight.data
+    assert builds == ["flights"] and registry.is_loaded("flights") and not registry.is_loaded("restaurants")
+    assert registry.get("flights") is registry.instances[("flights", "pandas")]
+    assert registry.stats["flights"]["source"] == "disk"
+    assert registry.memory_footprint("flights") == int(flight.data.memory_usage(deep=True).sum())
+    assert registry.memory_footprint("restaurants") is None
+
+
+def test_attribute_writes_reach_the_shared_tool(sandbox):
+    registry, _ = sandbox
+    restaurants = registry.proxy("restaurants")
+    restaurants.note = "set through the stand-in"
+    assert registry.get("restaurants").note == "set through the stand-in"
+
+
+def test_concurrent_first_use_builds_once(sandbox):
+    registry, builds = sandbox
+    proxies = [registry.proxy("restaurants") for _ in range(8)]
+    barrier = threading.Barrier(len(proxies))
+    tools = []
+
+    def use(proxy):
+        barrier.wait()
+        tools.append(proxy._tool())
+
+    threads = [threading.Thread(target=use, args=(proxy,)) for proxy in proxies]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert builds == ["restaurants"]
+    assert all(tool is tools[0] for tool in tools)
+
+
+def test_unknown_names_and_backends(sandbox):
+    registry, builds = sandbox
+    with pytest.raises(KeyError):
+        registry.proxy("hotels")
+    with pytest.raises(ValueError):
+        registry.proxy("flights", backend="duckdb")
+    # no database variant registered: the sqlite backend falls back to pandas
+    assert registry.proxy("restaurants", backend="sqlite")._tool() is registry.get("restaurants")
+    assert builds == ["restaurants"]
@@ -0,0 +1,62 @@
+import os
+
+import pandas as pd
+import pytest
+
+from tools.sandbox import snapshot
+from tools.sandbox.compact import compact
+
+TEXT_COLUMNS = ("Date",)
+
+
+def prepare(data):
+    return compact(data.dropna(), "test", text_columns=TEXT_COLUMNS)
+
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("TRIPTIDE_SNAPSHOT", "1")
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    path = tmp_path / "table.csv"
+    pd.DataFrame({
+        "City": ["Austin", "Denver", "Austin", None],
+        "Date": ["2024-11-01", "2024-11-02", "2024-11-03", "2024-11-04"],
+        "Price": [10, 20, 30, 40],
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def test_second_load_reads_snapshot(csv_path):
+    first = snapshot.load_csv(csv_path, prepare)
+    assert snapshot.load_stats[os.path.abspath(csv_path)]["source"] == "csv"
+    second = snapshot.load_csv(csv_path, prepare)
+    assert snapshot.load_stats[os.path.abspath(csv_path)]["source"] == "snapshot"
+    pd.testing.assert_frame_equal(first, second)
+    pd.testing.assert_frame_equal(second, prepare(pd.read_csv(csv_path)))
+
+
+def test_changed_csv_invalidates(csv_path):
+    before = snapshot.snapshot_path(csv_path, prepare)
+    with open(csv_path, "a") as f:
+        f.write("Boston,2024-11-05,50\n")
+    assert snapshot.snapshot_path(csv_path, prepare) != before
+    assert len(snapshot.load_csv(csv_path, prepare)) == 4
+
+
+def test_changed_column_config_invalidates(csv_path, monkeypatch):
+    before = snapshot.snapshot_path(csv_path, prepare)
+    monkeypatch.setitem(prepare.__globals__, "TEXT_COLUMNS", ("Date", "City"))
+    assert snapshot.snapshot_path(csv_path, prepare) != before
+
+
+def test_changed_compact_source_invalidates(csv_path, monkeypatch):
+    before = snapshot.snapshot_path(csv_path, prepare)
+    getsource = snapshot.inspect.getsource
+    with monkeypatch.context() as patch:
+        patch.setattr(snapshot.inspect, "getsource", lambda module: getsource(module) + "\n# changed\n")
+        snapshot._module_fingerprint.cache_clear()
+        try:
+            assert snapshot.snapshot_path(csv_path, prepare) != before
+        finally:
+            snapshot._module_fingerprint.cache_clear()
+    assert snapshot.snapshot_path(csv_path, prepare) == before
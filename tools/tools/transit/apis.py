@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from tools.sandbox.snapshot import load_csv
+from tools.sandbox.compact import compact
+from tools.sandbox.geo import GridIndex
+
+
+def _compact(data):
+    return compact(data, 'transit')
+
+
+class Transit:
+    """
+    Nearest transit stops around points of interest.
+
+    Stops are the distinct nearest_stop_* entries of the POI table, put in a uniform
+    grid so the closest stops to any coordinate come back without a scan. A plan's
+    claim is checked against the table's own POI -> nearest stop records, or, with
+    verify(recompute=True), against the stop coordinates through the grid.
+    """
+
+    def __init__(self, path='/ATP_database/all_poi_nearest_stops.csv', data=None, cell_km=0.5):
+        self.path = path
+        self.data = data if data is not None else load_csv(self.path, _compact)
+        self.cell_km = cell_km
+        self.build_index()
+        print("Transit loaded.")
+
+    def build_index(self):
+        """Stop grid plus (PoI, City) -> rows of the POI table."""
+        stops = self.data[['nearest_stop_name', 'nearest_stop_latitude', 'nearest_stop_longitude']].drop_duplicates()
+        self.stop_names = stops['nearest_stop_name'].astype(str).tolist()
+        self.stop_lat = stops['nearest_stop_latitude'].to_numpy(dtype=float)
+        self.stop_lon = stops['nearest_stop_longitude'].to_numpy(dtype=float)
+        self.stop_named = stops['nearest_stop_name'].notna().to_numpy()
+        self.grid = GridIndex(self.stop_lat, self.stop_lon, self.cell_km)
+
+        self.poi_index = self.data.groupby(['PoI', 'City'], sort=False, observed=True).indices
+        self.poi_stop_names = self.data['nearest_stop_name'].astype(str).tolist()
+        self.poi_stop_distance = self.data['nearest_stop_distance'].to_numpy(dtype=float)
+        self.poi_lat = self.data['latitude'].to_numpy(dtype=float)
+        self.poi_lon = self.data['longitude'].to_numpy(dtype=float)
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1) -> list:
+        """
+        The k stops closest to a coordinate.
+        Returns:
+            List of (stop name, latitude, longitude, distance in meters), closest first.
+        """
+        ids, distances = self.grid.nearest(latitude, longitude, k)
+        return [(self.stop_names[i], self.stop_lat[i], self.stop_lon[i], float(d) * 1000)
+                for i, d in zip(ids.tolist(), distances.tolist())]
+
+    def nearest_many(self, latitudes, longitudes) -> DataFrame:
+        """Closest stop for every coordinate pair; rows without a stop (or coordinates) get NaN/None."""
+        names, lats, lons, meters = [], [], [], []
+        for latitude, longitude in zip(np.asarray(latitudes, dtype=float), np.asarray(longitudes, dtype=float)):
+            found = self.nearest(latitude, longitude) if np.isfinite(latitude) and np.isfinite(longitude) else []
+            name, lat, lon, distance = found[0] if found else (None, np.nan, np.nan, np.nan)
+            names.append(name)
+            lats.append(lat)
+            lons.append(lon)
+            meters.append(distance)
+        return pd.DataFrame({'stop_name': names, 'stop_latitude': lats, 'stop_longitude': lons, 'distance': meters})
+
+    def nearest_to_poi(self, poi: str, city: str, k: int = 1) -> list:
+        """nearest() around a known POI's coordinates, an empty list if the POI is unknown."""
+        rows = self.poi_index.get((poi, city))
+        if rows is None or not np.isfinite(self.poi_lat[rows[0]]):
+            return []
+        return self.nearest(self.poi_lat[rows[0]], self.poi_lon[rows[0]], k)
+
+    def poi_stop(self, poi: str, city: str):
+        """(stop name, distance) recorded for a POI in the table, None if the POI is unknown."""
+        rows = self.poi_index.get((poi, city))
+        if rows is None:
+            return None
+        return self.poi_stop_names[rows[0]], self.poi_stop_distance[rows[0]]
+
+    def verify(self, poi: str, city: str, stop: str, distance: float, tolerance: float = 5,
+               recompute: bool = False) -> bool:
+        """
+        Whether a plan's "nearest transit: <stop>, <distance>m away" holds for a POI.
+
+        By default: whether the table records a nearest stop for the POI whose name contains
+        ``stop`` at ``distance`` meters, give or take tolerance; the same answer as the
+        str.contains(re.escape(stop)) scan over the POI table the evaluation ran, so its
+        scores do not move. With recompute=True the recorded distances are not trusted: the
+        grid finds the stops around the POI's coordinates and a stop whose name contains
+        ``stop`` has to be ``distance`` meters (haversine) away, give or take tolerance.
+        """
+        rows = self.poi_index.get((poi, city))
+        if rows is None:
+            return False
+        if recompute:
+            return any(self._stop_at(self.poi_lat[row], self.poi_lon[row], stop, distance, tolerance) for row in rows)
+        return any(stop in self.poi_stop_names[row] and abs(self.poi_stop_distance[row] - distance) <= tolerance
+                   for row in rows)
+
+    def _stop_at(self, latitude, longitude, stop, distance, tolerance):
+        """Whether a stop whose name contains ``stop`` lies distance +- tolerance meters from a coordinate."""
+        if not (np.isfinite(latitude) and np.isfinite(longitude)):
+            return False
+        ids, km = self.grid.within(latitude, longitude, (distance + tolerance) / 1000)
+        return any(self.stop_named[i] and stop in self.stop_names[i] and abs(d * 1000 - distance) <= tolerance
+                   for i, d in zip(ids.tolist(), km.tolist()))
+
+    def run(self, poi: str, city: str) -> str:
+        """Nearest transit of a POI as plans write it."""
+        recorded = self.poi_stop(poi, city)
+        if recorded is None:
+            return "There is no such point of interest in this city."
+        name, distance = recorded
+        return f"{poi}, nearest transit: {name}, {distance:.2f}m away"
@@ -0,0 +1,100 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.sandbox.geo import haversine_km
+from tools.transit.apis import Transit
+
+
+def make_pois(seed=0):
+    rng = np.random.default_rng(seed)
+    stops = pd.DataFrame({"nearest_stop_name": [f"Stop {i} (Line {i % 3})" for i in range(60)],
+                          "nearest_stop_latitude": rng.uniform(30.2, 30.4, 60),
+                          "nearest_stop_longitude": rng.uniform(-97.9, -97.6, 60)})
+    rows = []
+    for i in range(200):
+        stop = stops.iloc[int(rng.integers(0, len(stops)))]
+        rows.append({"PoI": f"Place {i % 150}", "City": "Austin" if i % 4 else "Dallas",
+                     "latitude": rng.uniform(30.2, 30.4), "longitude": rng.uniform(-97.9, -97.6),
+                     "nearest_stop_name": stop["nearest_stop_name"] if i % 50 else np.nan,
+                     "nearest_stop_latitude": stop["nearest_stop_latitude"],
+                     "nearest_stop_longitude": stop["nearest_stop_longitude"],
+                     "nearest_stop_distance": float(rng.integers(10, 900))})
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def transit():
+    return Transit(data=make_pois())
+
+
+def scan_verify(pois, poi, city, stop, distance):
+    """The check the evaluation ran over the POI table before the index."""
+    return len(pois[(pois["nearest_stop_name"].astype(str).str.contains(re.escape(stop))) & (pois["PoI"] == poi)
+                    & (pois["City"] == city) & (abs(pois["nearest_stop_distance"] - distance) <= 5)]) > 0
+
+
+def test_verify_matches_scan(transit):
+    pois = transit.data
+    for row in pois.head(80).itertuples(index=False):
+        stop = str(row.nearest_stop_name)
+        for name in (stop, stop.split(" (")[0], "(Line", "Stop 99", "nan"):
+            for distance in (row.nearest_stop_distance, row.nearest_stop_distance + 5, row.nearest_stop_distance + 6):
+                for city in ("Austin", "Dallas"):
+                    assert transit.verify(row.PoI, city, name, distance) == scan_verify(pois, row.PoI, city, name, distance)
+    assert not transit.verify("Nowhere", "Austin", "Stop 1", 100)
+
+
+def test_verify_recompute_matches_brute_force(transit):
+    pois = transit.data
+    stops = pois.dropna(subset=["nearest_stop_name"]).drop_duplicates(
+        ["nearest_stop_name", "nearest_stop_latitude", "nearest_stop_longitude"])
+    names = stops["nearest_stop_name"].astype(str).tolist()
+
+    def brute_force(poi, city, stop, distance):
+        rows = pois[(pois["PoI"] == poi) & (pois["City"] == city)]
+        for lat, lon in zip(rows["latitude"], rows["longitude"]):
+            meters = haversine_km(lat, lon, stops["nearest_stop_latitude"].to_numpy(),
+                                  stops["nearest_stop_longitude"].to_numpy()) * 1000
+            if any(stop in name and abs(m - distance) <= 5 for name, m in zip(names, meters)):
+                return True
+        return False
+
+    checked = 0
+    for row in pois.head(60).itertuples(index=False):
+        # the true distance to the recorded stop, and claims just inside and outside the tolerance
+        true = float(haversine_km(row.latitude, row.longitude, row.nearest_stop_latitude, row.nearest_stop_longitude) * 1000)
+        stop = str(row.nearest_stop_name)
+        for name in (stop, stop.split(" (")[0], "Stop 99", "nan"):
+            for distance in (true, true + 4.9, true + 5.1, row.nearest_stop_distance):
+                expected = brute_force(row.PoI, row.City, name, distance)
+                assert transit.verify(row.PoI, row.City, name, distance, recompute=True) == expected
+                checked += expected
+    assert checked > 0
+    assert not transit.verify("Nowhere", "Austin", "Stop 1", 100, recompute=True)
+
+
+def test_nearest_matches_brute_force(transit):
+    stops = transit.data.drop_duplicates(["nearest_stop_name", "nearest_stop_latitude", "nearest_stop_longitude"])
+    rng = np.random.default_rng(1)
+    for lat, lon in zip(rng.uniform(30.1, 30.5, 40), rng.uniform(-98.0, -97.5, 40)):
+        meters = haversine_km(lat, lon, stops["nearest_stop_latitude"].to_numpy(),
+                              stops["nearest_stop_longitude"].to_numpy()) * 1000
+        found = transit.nearest(lat, lon, k=3)
+        np.testing.assert_allclose([distance for *_, distance in found], np.sort(meters)[:3])
+        closest = transit.nearest_many([lat], [lon]).iloc[0]
+        assert closest["distance"] == pytest.approx(meters.min())
+
+
+def test_poi_lookups(transit):
+    pois = transit.data
+    first = pois[(pois["PoI"] == "Place 1") & (pois["City"] == "Austin")].iloc[0]
+    assert transit.poi_stop("Place 1", "Austin") == (str(first["nearest_stop_name"]), first["nearest_stop_distance"])
+    assert transit.run("Place 1", "Austin").startswith(f"Place 1, nearest transit: {first['nearest_stop_name']}, ")
+    assert transit.poi_stop("Place 1", "Atlantis") is None
+    assert transit.nearest_to_poi("Place 1", "Atlantis") == []
+    assert len(transit.nearest_to_poi("Place 1", "Austin", k=2)) == 2
+    missing = transit.nearest_many([np.nan, 30.3], [-97.7, np.nan])
+    assert missing["stop_name"].isna().all() and missing["distance"].isna().all()
@@ -1,19 +1,27 @@
-from tools.accommodations.apis import Accommodations
-from tools.flights.apis import Flights
-from tools.restaurants.apis import Restaurants
-from tools.googleDistanceMatrix.apis import GoogleDistanceMatrix
-from tools.attractions.apis import Attractions
-from tools.events.apis import Events
+from tools.sandbox.registry import registry
+from tools.accommodations.apis import HOUSE_RULES
 import pandas as pd
 import json
 
-hotel = Accommodations()
-flight = Flights()
-flight.load_db()
-restaurant = Restaurants()
-distanceMatrix = GoogleDistanceMatrix()
-attraction = Attractions()
-event = Events()
+hotel = registry.proxy("accommodations")
+flight = registry.proxy("flights_db")
+restaurant = registry.proxy("restaurants")
+distanceMatrix = registry.proxy("googleDistanceMatrix")
+attraction = registry.proxy("attractions")
+event = registry.proxy("events")
+
+# city<TAB>state lines of the cities a state-grain trip can visit
+CITY_SET_PATH = '/home/mtech/ATP_database/background/citySet_with_states_140.txt'
+# the flight columns the budget needs; connecting_flight_data() rows have only these
+FLIGHT_COLUMNS = ["Price", "FlightDate", "Distance"]
+
+# room type constraint -> roomType values that satisfy it
+ROOM_TYPE_CONSTRAINTS = {
+    'shared room': ['shared_room'],
+    'not shared room': ['private_room', 'entire_home'],
+    'private room': ['private_room'],
+    'entire room': ['entire_home'],
+}
 
 
 def estimate_budget(data, mode):
@@ -65,6 +73,19 @@ def estimate_budget_hotel(data, mode):
         raise ValueError("Invalid mode specified. Use 'lowest', 'highest', or 'average'.")
 
 
+def connecting_flight_data(org, dest, date: list, k=5):
+    """
+    Stand-in for the flight rows of a route without direct flights.
+    One row per cheapest connecting itinerary on each date, with the total Price,
+    the FlightDate and the summed Distance of its legs.
+    """
+    rows = []
+    for day in date:
+        for itinerary in flight.search_connections(org, dest, str(day)[:10], k=k):
+            rows.append({"Price": itinerary["total_price"], "FlightDate": day, "Distance": itinerary["legs"]["Distance"].sum()})
+    return pd.DataFrame(rows, columns=FLIGHT_COLUMNS)
+
+
 def budget_calc(org, dest, days, date:list , people_number=None, local_constraint = None):
     """
     Calculate the estimated budget for all three modes: lowest, highest, average.
@@ -86,21 +107,19 @@ def budget_calc(org, dest, days, date:list , people_number=None, local_constrain
     }
     
     if grain == "city":
-        hotel_data = hotel.run(dest)
-        restaurant_data = restaurant.run(dest)
-        attraction_data = attraction.run(dest)
+        candidate_cities = [dest]
         event_data = event.run(dest,date)
         flight_data = flight.data[(flight.data["DestCityName"] == dest) & (flight.data["OriginCityName"] == org)]
+        if len(flight_data) == 0:
+            flight_data = connecting_flight_data(org, dest, date)
         # print("checkpt-1")
 
 
     elif grain == "state":
-        city_set = open('/home/mtech/ATP_database/background/citySet_with_states_140.txt').read().strip().split('\n')
+        city_set = open(CITY_SET_PATH).read().strip().split('\n')
         
-        all_hotel_data = []
-        all_restaurant_data = []
+        candidate_cities = []
         all_flight_data = []
-        all_attraction_data = []
         all_event_data = []
         city_counter = 0
         
@@ -112,6 +131,12 @@ def budget_calc(org, dest, days, date:list , people_number=None, local_constrain
                 current_hotel_data = hotel.run(candidate_city)
                 current_restaurant_data = restaurant.run(candidate_city)
                 current_flight_data = flight.data[(flight.data["DestCityName"] == candidate_city) & (flight.data["OriginCityName"] == org)]
+                if len(current_flight_data) == 0:
+                    current_flight_data = connecting_flight_data(org, candidate_city, date)
+                else:
+                    # the load_db() table has two 'Flight Number' columns, which can not be
+                    # concatenated with the connecting rows
+                    current_flight_data = current_flight_data[FLIGHT_COLUMNS]
                 current_attraction_data = attraction.run(candidate_city)
                 current_event_data = event.run(candidate_city,date)
 
@@ -120,9 +145,7 @@ def budget_calc(org, dest, days, date:list , people_number=None, local_constrain
                 all_flight_data.append(current_flight_data)
                 if (type(current_restaurant_data)!=type("str") and type(current_hotel_data)!=type("str")
                 and type(current_attraction_data)!=type("str") and type(current_event_data)!=type("str")):
-                    all_restaurant_data.append(current_restaurant_data)
-                    all_hotel_data.append(current_hotel_data)
-                    all_attraction_data.append(current_attraction_data)
+                    candidate_cities.append(candidate_city)
                     all_event_data.append(current_event_data)
                     city_counter = city_counter + 1
                 else:
@@ -140,17 +163,15 @@ def budget_calc(org, dest, days, date:list , people_number=None, local_constrain
                 raise ValueError(f"Less number of available cities which has all constraints")
         
         # Use concat to combine all dataframes in the lists
-        hotel_data = pd.concat(all_hotel_data, axis=0)
-        restaurant_data = pd.concat(all_restaurant_data, axis=0)
         flight_data = pd.concat(all_flight_data, axis=0)
-        attraction_data = pd.concat(all_attraction_data, axis=0)
         event_data = pd.concat(all_event_data, axis=0)
         # flight_data should be in the range of supported date
         flight_data = flight_data[flight_data['FlightDate'].isin(date)]
 
-    if people_number:
-        hotel_data = hotel_data[hotel_data['max_occupancy'] >= people_number]
-        # print("checkpt-2")
+    # hotels are filtered through hotel.search_positions(), the filters pile up in these
+    hotel_filters = {"min_occupancy": people_number or None}
+    hotel_rows = hotel.search_positions(candidate_cities, **hotel_filters)
+    restaurant_rows = restaurant.search_positions(candidate_cities)
 
     if local_constraint:
 
@@ -175,46 +196,34 @@ def budget_calc(org, dest, days, date:list , people_number=None, local_constrain
         #         flight_data = flight_data[flight_data['DepTime'] >= '18:00']
 
         if local_constraint['room type']:
-            if local_constraint['room type'] == 'shared room':
-                hotel_data = hotel_data[hotel_data['roomType'] == 'shared_room']
-            elif local_constraint['room type'] == 'not shared room':
-                hotel_data = hotel_data[(hotel_data['roomType'] == 'private_room') | (hotel_data['roomType'] == 'entire_home')]
-            elif local_constraint['room type'] == 'private room':
-                hotel_data = hotel_data[hotel_data['roomType'] == 'private_room']
-            elif local_constraint['room type'] == 'entire room':
-                hotel_data = hotel_data[hotel_data['roomType'] == 'entire_home']
+            if local_constraint['room type'] in ROOM_TYPE_CONSTRAINTS:
+                hotel_filters["room_type"] = ROOM_TYPE_CONSTRAINTS[local_constraint['room type']]
+                hotel_rows = hotel.search_positions(candidate_cities, **hotel_filters)
 
             if days == 3:
-                if type(hotel_data)==type("str") or len(hotel_data) < 3:
+                if len(hotel_rows) < 3:
                     raise ValueError("No hotel data available for the given constraints.")
             elif days == 5:
-                if type(hotel_data)==type("str") or len(hotel_data) < 5:
+                if len(hotel_rows) < 5:
                     raise ValueError("No hotel data available for the given constraints.")
             elif days == 7:
-                if type(hotel_data)==type("str") or len(hotel_data) < 7:
+                if len(hotel_rows) < 7:
                     raise ValueError("No hotel data available for the given constraints.")
         
         if local_constraint['house rule']:
-            if local_constraint['house rule'] == 'parties':
-                # the house rule should not contain 'parties'
-                hotel_data = hotel_data[~hotel_data['house_rules'].str.contains('No parties')]
-            elif local_constraint['house rule'] == 'smoking':
-                hotel_data = hotel_data[~hotel_data['house_rules'].str.contains('No smoking')]
-            elif local_constraint['house rule'] == 'children under 10':
-                hotel_data = hotel_data[~hotel_data['house_rules'].str.contains('No children under 10')]
-            elif local_constraint['house rule'] == 'pets':
-                hotel_data = hotel_data[~hotel_data['house_rules'].str.contains('No pets')]
-            elif local_constraint['house rule'] == 'visitors':
-                hotel_data = hotel_data[~hotel_data['house_rules'].str.contains('No visitors')]
+            # the house rules should not contain 'No <rule>'
+            if local_constraint['house rule'] in HOUSE_RULES:
+                hotel_filters["allowed_rules"] = [local_constraint['house rule']]
+                hotel_rows = hotel.search_positions(candidate_cities, **hotel_filters)
         
             if days == 3:
-                if type(hotel_data)==type("str") or len(hotel_data) < 3:
+                if len(hotel_rows) < 3:
                     raise ValueError("No hotel data available for the given constraints.")
             elif days == 5:
-                if type(hotel_data)==type("str") or len(hotel_data) < 5:
+                if len(hotel_rows) < 5:
                     raise ValueError("No hotel data available for the given constraints.")
             elif days == 7:
-                if type(hotel_data)==type("str") or len(hotel_data) < 7:
+                if len(hotel_rows) < 7:
                     raise ValueError("No hotel data available for the given constraints.")
 
         if local_constraint['event']:
@@ -238,35 +247,26 @@ def budget_calc(org, dest, days, date:list , people_number=None, local_constrain
         if local_constraint['cuisine']:
             # judge whether the cuisine is in the cuisine list
             # restaurant_data = restaurant_data[restaurant_data['Cuisines'].str.contains('|'.join(local_constraint['cuisine']))]
-            try:
-                restaurant_data = restaurant_data[restaurant_data['cuisines'].apply(lambda x: any(cuisine in x for cuisine in local_constraint['cuisine']))]
-            except:
-                raise ValueError(f"No restaurants available for the given constraints")
+            restaurant_rows = restaurant.search_positions(candidate_cities, local_constraint['cuisine'])
 
             if days == 3:
-                if len(restaurant_data) < 3:
+                if len(restaurant_rows) < 3:
                     raise ValueError("No restaurant data available for the given constraints.")
             elif days == 5:
-                if len(restaurant_data) < 5:
+                if len(restaurant_rows) < 5:
                     raise ValueError("No restaurant data available for the given constraints.")
             elif days == 7:
-                if len(restaurant_data) < 7:
+                if len(restaurant_rows) < 7:
                     raise ValueError("No restaurant data available for the given constraints.")
 
         if local_constraint['attraction']:
             # Filter based on attraction type
             attraction_types = local_constraint['attraction']
-            # print(attraction_data)
-            try:
-                attraction_data = attraction_data[attraction_data['subcategories'].apply(
-                    lambda x: any(attraction in x for attraction in attraction_types)
-                )]
-            except:
-                raise ValueError(f"No attraction data available for the given constraints")
+            attraction_rows = attraction.search_positions(candidate_cities, attraction_types)
 
             # Check if sufficient attractions are available based on `days`
             if days in [3, 5, 7]:
-                if len(attraction_data) < days:
+                if len(attraction_rows) < days:
                     raise ValueError(f"No attraction data available for the given constraints and duration of {days} days.")
 
 
@@ -282,11 +282,10 @@ def budget_calc(org, dest, days, date:list , people_number=None, local_constrain
             
 
         # print("f_budget:",flight_budget)
-        hotel_budget = estimate_budget_hotel(hotel_data["pricing"].tolist(), mode) * multipliers[days]["hotel"]
+        hotel_budget = estimate_budget_hotel(hotel.data["pricing"].iloc[hotel_rows].tolist(), mode) * multipliers[days]["hotel"]
         # print("checkpt-5")
-        # print(type(restaurant_data),len(restaurant_data), restaurant_data)
         try:
-            restaurant_budget = estimate_budget(restaurant_data["avg_cost"].tolist(), mode) * multipliers[days]["restaurant"]
+            restaurant_budget = estimate_budget(restaurant.data["avg_cost"].iloc[restaurant_rows].tolist(), mode) * multipliers[days]["restaurant"]
         except:
             raise ValueError("No restaurant data available for the constraint s")
         total_budget = flight_budget + hotel_budget + restaurant_budget
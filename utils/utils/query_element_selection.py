@@ -7,10 +7,10 @@ import random
 from utils.budget_estimation import budget_calc
 import json
 from datetime import datetime, timedelta
-from tools.googleDistanceMatrix.apis import GoogleDistanceMatrix
+from tools.sandbox.registry import registry
 import numpy as np
 
-google_distance = GoogleDistanceMatrix()
+google_distance = registry.proxy("googleDistanceMatrix")
 
 city_set = open('/ATP_database/background/citySet_with_states_140.txt').read().strip().split('\n')
 
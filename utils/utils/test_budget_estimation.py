@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+
+from tools.flights.apis import Flights
+from tools.sandbox.registry import registry
+from utils import budget_estimation
+
+
+@pytest.fixture
+def flights_db(sandbox_tools, monkeypatch):
+    monkeypatch.setitem(registry.factories, "flights_db", lambda data: sandbox_tools["flights_db"])
+    monkeypatch.setattr(registry, "instances", {})
+    return sandbox_tools["flights_db"]
+
+
+def connected_routes(flights, date):
+    """(origin, destination) pairs of the sample table reachable with connections on date."""
+    cities = sorted(set(flights.data["OriginCityName"]) | set(flights.data["DestCityName"]))
+    for origin in cities:
+        for destination in cities:
+            if origin != destination and flights.search_connections(origin, destination, date, k=1):
+                yield origin, destination
+
+
+def test_connecting_flight_data_on_load_db_table(flights_db, sandbox_tools):
+    # load_db() keeps the CSV's index column renamed to a second 'Flight Number'
+    assert isinstance(flights_db.data["Flight Number"], pd.DataFrame)
+    date = "2024-11-02"
+    origin, destination = next(connected_routes(flights_db, date))
+
+    itineraries = flights_db.search_connections(origin, destination, date, k=5)
+    for itinerary in itineraries:
+        assert all(isinstance(number, str) for number in itinerary["flight_numbers"])
+        assert itinerary["legs"].columns.is_unique
+    # the same itineraries as on the run() table, which has a single 'Flight Number' column
+    expected = sandbox_tools["flights"].search_connections(origin, destination, date, k=5)
+    assert [i["flight_numbers"] for i in itineraries] == [i["flight_numbers"] for i in expected]
+
+    rows = budget_estimation.connecting_flight_data(origin, destination, [date])
+    assert list(rows.columns) == ["Price", "FlightDate", "Distance"]
+    assert rows["Price"].tolist() == [i["total_price"] for i in itineraries]
+    assert rows["Distance"].tolist() == [i["legs"]["Distance"].sum() for i in itineraries]
+
+
+def test_state_budget_mixes_direct_and_connecting_cities(sandbox_tools, sandbox_csvs, monkeypatch, tmp_path):
+    origin, direct, connecting = "Austin", "Dallas", "Houston"
+    dates = ["2024-11-02", "2024-11-03", "2024-11-04"]
+    # the sample table flies every pair directly; without Austin -> Houston that city needs connections
+    flights = pd.read_csv(sandbox_csvs["flights"])
+    flights = flights[(flights["OriginCityName"] != origin) | (flights["DestCityName"] != connecting)]
+    flights.to_csv(tmp_path / "flights.csv", index=False)
+    flights_db = Flights(str(tmp_path / "flights.csv"))
+    flights_db.load_db()
+
+    tools = dict(sandbox_tools, flights_db=flights_db)
+    for name in ("flights_db", "accommodations", "restaurants", "attractions", "events"):
+        monkeypatch.setitem(registry.factories, name, lambda data, tool=tools[name]: tool)
+    monkeypatch.setattr(registry, "instances", {})
+    state_file = tmp_path / "cities.txt"
+    state_file.write_text(f"{direct}\tMixed\n{connecting}\tMixed\n")
+    monkeypatch.setattr(budget_estimation, "CITY_SET_PATH", str(state_file))
+
+    assert isinstance(flights_db.data["Flight Number"], pd.DataFrame)
+    assert budget_estimation.connecting_flight_data(origin, connecting, dates).shape[0] > 0
+    budgets = budget_estimation.budget_calc(origin, "Mixed", 5, dates)
+    assert budgets["lowest"] <= budgets["average"] <= budgets["highest"]